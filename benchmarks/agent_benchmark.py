@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+智能体基准测试
+对比 ReAct 文本解析与原生工具调用两种模式的每轮 LLM 调用次数和延迟
+
+用法: python -m benchmarks.agent_benchmark [--rounds 3]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from core.assistant import VoiceAssistant
+
+QUERIES = [
+    "北京今天天气怎么样",
+    "帮我算一下 12 乘以 34 等于多少",
+    "今天有什么安排",
+    "现在几点了",
+    "给我讲一个简短的笑话"
+]
+
+
+class LLMCallCounter(BaseCallbackHandler):
+    """统计 LLM 调用次数"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.calls += 1
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.calls += 1
+
+
+async def run_mode(assistant: VoiceAssistant, mode: str, rounds: int) -> dict:
+    """运行指定模式的基准测试"""
+    agent = assistant._create_agent(mode)
+    calls, latencies, failures = [], [], 0
+
+    for _ in range(rounds):
+        for query in QUERIES:
+            assistant.memory.clear()
+            counter = LLMCallCounter()
+            start = time.perf_counter()
+            try:
+                await agent.ainvoke({"input": query}, config={"callbacks": [counter]})
+            except Exception as e:
+                failures += 1
+                print(f"[{mode}] {query} 失败: {e}")
+            latencies.append(time.perf_counter() - start)
+            calls.append(counter.calls)
+
+    return {
+        "mode": mode,
+        "turns": len(latencies),
+        "failures": failures,
+        "llm_calls_per_turn": statistics.mean(calls),
+        "latency_mean": statistics.mean(latencies),
+        "latency_p95": sorted(latencies)[int(len(latencies) * 0.95) - 1]
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="智能体模式基准测试")
+    parser.add_argument("--rounds", type=int, default=3, help="每条查询重复次数")
+    args = parser.parse_args()
+
+    assistant = VoiceAssistant()
+    results = [await run_mode(assistant, mode, args.rounds) for mode in ("react", "function_calling")]
+
+    print(f"\n{'模式':<18}{'轮数':>6}{'失败':>6}{'LLM调用/轮':>12}{'平均延迟(s)':>14}{'P95延迟(s)':>12}")
+    for r in results:
+        print(f"{r['mode']:<18}{r['turns']:>6}{r['failures']:>6}{r['llm_calls_per_turn']:>12.2f}"
+              f"{r['latency_mean']:>14.2f}{r['latency_p95']:>12.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
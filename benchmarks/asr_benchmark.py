@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+"""
+语音识别后端基准测试
+在中文测试集上对比各后端的实时率（RTF）、内存占用和字错误率（CER）
+
+测试集目录包含 manifest.jsonl（每行 {"id", "audio", "text"}，audio 为目录内的 WAV 路径）和对应音频。
+仓库只附带 benchmarks/data/asr_zh 的标注文本，音频需要自备：用 --data-dir 指定真人录音
+（如从 AISHELL、Common Voice 中文子集挑选并转换为 16kHz 单声道 WAV）的目录，
+或用 --synthesize 通过 pyttsx3 合成缺失的音频。合成语音发音规整、没有噪声和口音，
+在其上测得的 RTF 和 CER 只能用于冒烟测试和后端之间的粗略比较，不代表真人语音上的表现。
+
+用法: python -m benchmarks.asr_benchmark [--engines whisper faster_whisper] [--data-dir 目录] [--synthesize]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import resource
+import time
+from math import gcd
+
+import numpy as np
+import scipy.io.wavfile
+import scipy.signal
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data", "asr_zh")
+SAMPLE_RATE = 16000
+# 记录由 --synthesize 生成的音频，结果中据此提示
+SYNTHESIZED_LIST = "synthesized.txt"
+
+
+def load_manifest(data_dir: str) -> list:
+    with open(os.path.join(data_dir, "manifest.jsonl"), encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def load_synthesized(data_dir: str) -> set:
+    path = os.path.join(data_dir, SYNTHESIZED_LIST)
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def load_audio(path: str) -> np.ndarray:
+    """读取 WAV 并转换为 16kHz 单声道 int16"""
+    rate, audio = scipy.io.wavfile.read(path)
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    if audio.dtype != np.int16:
+        peak = np.abs(audio).max() or 1
+        audio = audio / peak * 32767 if audio.dtype.kind == "f" or peak > 32767 else audio
+    if rate != SAMPLE_RATE:
+        divisor = gcd(rate, SAMPLE_RATE)
+        audio = scipy.signal.resample_poly(audio, SAMPLE_RATE // divisor, rate // divisor)
+    return np.clip(audio, -32768, 32767).astype(np.int16)
+
+
+def synthesize(samples: list, data_dir: str):
+    """使用 pyttsx3 生成缺失的测试音频"""
+    import pyttsx3
+
+    engine = pyttsx3.init()
+    for voice in engine.getProperty("voices"):
+        if "zh" in voice.id.lower() or "chinese" in voice.name.lower():
+            engine.setProperty("voice", voice.id)
+            break
+
+    pending = []
+    for sample in samples:
+        path = os.path.join(data_dir, sample["audio"])
+        if not os.path.exists(path):
+            engine.save_to_file(sample["text"], path)
+            pending.append(sample["audio"])
+    engine.runAndWait()
+
+    for audio in pending:
+        path = os.path.join(data_dir, audio)
+        scipy.io.wavfile.write(path, SAMPLE_RATE, load_audio(path))
+    if pending:
+        with open(os.path.join(data_dir, SYNTHESIZED_LIST), "a", encoding="utf-8") as f:
+            f.writelines(f"{audio}\n" for audio in pending)
+    print(f"已生成 {len(pending)} 条测试音频")
+
+
+def normalize(text: str) -> str:
+    """去除标点和空白后比较"""
+    return re.sub(r"[\s\W_]+", "", text)
+
+
+def edit_distance(reference: str, hypothesis: str) -> int:
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_char in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_char in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_char != hyp_char)))
+        previous = current
+    return previous[-1]
+
+
+def current_rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def run_engine(engine: str, samples: list, data_dir: str, queue: multiprocessing.Queue):
+    """在独立进程中测试一个后端，避免模型内存互相影响"""
+    from core.asr_backend import get_asr_backend
+
+    baseline_rss = current_rss_mb()
+    start = time.perf_counter()
+    backend = get_asr_backend(engine)
+    load_time = time.perf_counter() - start
+    loaded_rss = current_rss_mb()
+
+    audio_seconds = transcribe_seconds = 0.0
+    errors = characters = 0
+    for sample in samples:
+        audio = load_audio(os.path.join(data_dir, sample["audio"]))
+        start = time.perf_counter()
+        hypothesis = backend.transcribe(audio)
+        transcribe_seconds += time.perf_counter() - start
+        audio_seconds += len(audio) / SAMPLE_RATE
+
+        reference = normalize(sample["text"])
+        errors += edit_distance(reference, normalize(hypothesis))
+        characters += len(reference)
+
+    queue.put({
+        "engine": engine,
+        "load_time": load_time,
+        "rtf": transcribe_seconds / audio_seconds,
+        "model_rss_mb": loaded_rss - baseline_rss,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "cer": errors / characters
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="语音识别后端基准测试")
+    parser.add_argument("--engines", nargs="+", default=["whisper", "faster_whisper"])
+    parser.add_argument("--data-dir", default=DATA_DIR, help="包含 manifest.jsonl 和 WAV 音频的测试集目录")
+    parser.add_argument("--synthesize", action="store_true", help="用 pyttsx3 生成缺失的测试音频（结果不具代表性）")
+    args = parser.parse_args()
+
+    samples = load_manifest(args.data_dir)
+    if args.synthesize:
+        synthesize(samples, args.data_dir)
+    missing = [s["audio"] for s in samples if not os.path.exists(os.path.join(args.data_dir, s["audio"]))]
+    if missing:
+        raise SystemExit(f"缺少 {len(missing)} 条测试音频，请用 --data-dir 指定真人录音目录或使用 --synthesize 生成")
+    synthesized = load_synthesized(args.data_dir).intersection(s["audio"] for s in samples)
+
+    results = []
+    for engine in args.engines:
+        queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=run_engine, args=(engine, samples, args.data_dir, queue))
+        process.start()
+        process.join()
+        if process.exitcode == 0:
+            results.append(queue.get())
+        else:
+            print(f"{engine} 测试失败（退出码 {process.exitcode}）")
+
+    print(f"\n{'后端':<16}{'加载(s)':>9}{'RTF':>8}{'模型内存(MB)':>14}{'峰值内存(MB)':>14}{'CER':>8}")
+    for r in results:
+        print(f"{r['engine']:<16}{r['load_time']:>9.2f}{r['rtf']:>8.3f}{r['model_rss_mb']:>14.0f}"
+              f"{r['peak_rss_mb']:>14.0f}{r['cer']:>8.2%}")
+    if synthesized:
+        print(f"\n注意: {len(synthesized)}/{len(samples)} 条音频由 TTS 合成，RTF 和 CER 不代表真人语音上的表现")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""
+计算器求值基准测试
+比较原先的字符检查 + eval 与 AST 求值（首次解析 / 命中解析缓存）的耗时，
+并测量超限算式被拒绝的耗时
+
+用法: python -m benchmarks.calculator_benchmark [--repeat 2000]
+"""
+
+import argparse
+import time
+
+from tools.calculator_engine import CalculationError, Evaluator, extract, parse
+
+EXPRESSIONS = ["3+5", "(1.5+2.5)*4-6/3", "2**10", "sqrt(144)+17%5", "(3*10000)/12"]
+QUERIES = ["计算3加5等于多少", "三点五乘以两百", "百分之二十乘以三千五", "2的10次方", "帮我算一下12乘以12是多少"]
+BOMBS = ["9**9**9", "2**100000", "10**999*10**999", "+".join(["9"] * 150)]
+
+
+def legacy_eval(expression: str):
+    """原 safe_eval 的实现"""
+    expression = expression.replace('×', '*').replace('÷', '/').replace(' ', '')
+    allowed_chars = set('0123456789.+-*/^() ')
+    if not all(char in allowed_chars for char in expression):
+        raise ValueError("表达式包含不安全字符")
+    return eval(expression, {"__builtins__": None}, {})
+
+
+def timed(fn, items, repeat: int) -> float:
+    """每次调用的平均耗时（us）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            fn(item)
+    return (time.perf_counter() - start) / (repeat * len(items)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="计算器求值基准测试")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    evaluator = Evaluator()
+    legacy = [expression for expression in EXPRESSIONS if "%" not in expression and "sqrt" not in expression]
+
+    def cold(expression):
+        parse.cache_clear()
+        return evaluator.evaluate(expression)
+
+    print(f"eval（原实现）       {timed(legacy_eval, legacy, args.repeat):8.1f} us")
+    print(f"AST 首次解析         {timed(cold, EXPRESSIONS, args.repeat):8.1f} us")
+    print(f"AST 命中解析缓存     {timed(evaluator.evaluate, EXPRESSIONS, args.repeat):8.1f} us")
+    print(f"中文查询提取算式     {timed(extract, QUERIES, args.repeat):8.1f} us")
+
+    print("超限算式:")
+    for expression in BOMBS:
+        start = time.perf_counter()
+        try:
+            evaluator.evaluate(expression)
+            outcome = "未拒绝"
+        except CalculationError as e:
+            outcome = str(e)
+        print(f"  {expression[:24]:<26}{(time.perf_counter() - start) * 1e6:8.1f} us  {outcome}")
+
+    # 原实现没有限制，用较小的指数演示其耗时（9**9**9 会耗尽 CPU 和内存）
+    start = time.perf_counter()
+    legacy_eval("9**9**6")
+    print(f"eval 计算 9**9**6（原实现）: {(time.perf_counter() - start) * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
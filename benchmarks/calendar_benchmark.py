@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""
+日历存储基准测试
+生成 N 个事件，对比旧的整文件 JSON 存储与 SQLite 存储的
+加载、查询今天、查询一周范围和添加事件的耗时
+
+用法: python -m benchmarks.calendar_benchmark [--events 100000]
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from tools.calendar_store import CalendarStore
+
+
+def generate_events(count: int, days: int) -> list:
+    """在今天前后 days 天内随机生成事件"""
+    rng = random.Random(0)
+    start = date.today() - timedelta(days=days // 2)
+    return [
+        {
+            "date": (start + timedelta(days=rng.randrange(days))).isoformat(),
+            "time": f"{rng.randrange(8, 20):02d}:{rng.choice(['00', '30'])}",
+            "title": f"事件{index}",
+            "description": "基准测试生成的事件"
+        }
+        for index in range(count)
+    ]
+
+
+def timed(fn, repeat: int = 1) -> float:
+    """平均耗时（毫秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def bench_json(path: str, events: list, today: str, week_end: str, repeat: int) -> dict:
+    """旧实现：整文件加载、线性过滤、每次添加整文件重写"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(events, f, ensure_ascii=False, indent=2)
+
+    def load():
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    loaded = load()
+
+    def add():
+        loaded.append({"date": today, "time": "10:00", "title": "新事件", "description": ""})
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(loaded, f, ensure_ascii=False, indent=2)
+
+    return {
+        "load": timed(load),
+        "today": timed(lambda: sorted((e for e in loaded if e["date"] == today), key=lambda e: e["time"]), repeat),
+        "week": timed(lambda: sorted((e for e in loaded if today <= e["date"] <= week_end),
+                                     key=lambda e: (e["date"], e["time"])), repeat),
+        "add": timed(add, max(1, repeat // 20))
+    }
+
+
+def bench_sqlite(path: str, legacy_json: str, today: str, week_end: str, repeat: int, series: int) -> dict:
+    """新实现：首次打开时从 JSON 迁移，之后按日期索引查询"""
+    migrate = timed(lambda: CalendarStore(path, legacy_json=legacy_json))
+    store = CalendarStore(path)
+    # 长期重复事件（如每周例会）只保存规则，查询时在窗口内展开
+    rng = random.Random(1)
+    for index in range(series):
+        store.add_series({
+            "dtstart": (date.today() - timedelta(days=rng.randrange(3650))).isoformat(),
+            "freq": rng.choice(["daily", "weekly", "monthly"]),
+            "interval": rng.randrange(1, 3),
+            "time": "09:00",
+            "title": f"重复事件{index}"
+        })
+    return {
+        "load": timed(lambda: CalendarStore(path)),
+        "migrate": migrate,
+        "today": timed(lambda: store.on(today), repeat),
+        "week": timed(lambda: store.between(today, week_end), repeat),
+        "add": timed(lambda: store.add({"date": today, "time": "10:00", "title": "新事件"}), repeat)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日历存储基准测试")
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--days", type=int, default=3650, help="事件分布的天数")
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--series", type=int, default=100, help="SQLite 存储中额外添加的重复事件数")
+    args = parser.parse_args()
+
+    events = generate_events(args.events, args.days)
+    today = date.today().isoformat()
+    week_end = (date.today() + timedelta(days=6)).isoformat()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        json_path = os.path.join(workdir, "calendar_events.json")
+        legacy = bench_json(json_path, events, today, week_end, args.repeat)
+        sqlite = bench_sqlite(os.path.join(workdir, "calendar.db"), json_path, today, week_end,
+                              args.repeat, args.series)
+
+    print(f"{args.events} 个事件，分布在 {args.days} 天内（单位：毫秒）")
+    print(f"{'操作':<10}{'JSON':>12}{'SQLite':>12}")
+    for key in ("load", "today", "week", "add"):
+        print(f"{key:<10}{legacy[key]:>12.3f}{sqlite[key]:>12.3f}")
+    print(f"首次打开并迁移 JSON: {sqlite['migrate']:.1f} ms")
+    print(f"SQLite 的 today/week 查询包含 {args.series} 条重复事件规则的展开")
+
+
+if __name__ == "__main__":
+    main()
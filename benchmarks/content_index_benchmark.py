@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+文件内容索引基准测试
+生成 N 篇中英文混合的文档，测量建立索引的耗时和磁盘占用、修改少量文件后的增量更新耗时、
+查询延迟，以及查询时进程常驻内存的变化
+
+用法: python -m benchmarks.content_index_benchmark [--docs 5000]
+"""
+
+import argparse
+import os
+import random
+import resource
+import statistics
+import tempfile
+import time
+
+from tools.content_index import ContentIndex
+
+VOCABULARY = ["季度报告", "销售额", "同比增长", "市场部", "预算", "审批", "合同", "供应商", "项目进度", "风险",
+              "客户反馈", "会议纪要", "人力资源", "招聘计划", "年度目标", "产品发布", "用户增长", "成本控制",
+              "revenue", "quarterly", "roadmap", "budget", "deadline", "invoice", "meeting", "review"]
+CHARACTERS = ("的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面"
+              "而方后多定行学法所民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把性"
+              "好应开它合还因由其些然前外天政四日那社义事平形相全表间样与关各重新线内数正心反你明看原又么利比或但质气第向道"
+              "命此变条只没结解问意建月公无系军很情者最立代想已通并提直题党程展五果料象员革位入常文总次品式活设及管特件长求")
+
+
+def make_vocabulary(rng: random.Random, size: int) -> list:
+    """业务词汇加上随机组合的词，按 Zipf 分布取词"""
+    words = VOCABULARY + ["".join(rng.choice(CHARACTERS) for _ in range(rng.randrange(2, 5)))
+                          for _ in range(size)]
+    rng.shuffle(words)
+    return words
+
+
+def generate_docs(root: str, count: int, words: int, rng: random.Random):
+    vocabulary = make_vocabulary(rng, 20000)
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    for index in range(count):
+        directory = os.path.join(root, f"dir{index // 500}")
+        os.makedirs(directory, exist_ok=True)
+        parts = rng.choices(vocabulary, weights, k=words)
+        with open(os.path.join(directory, f"doc{index}.txt"), "w", encoding="utf-8") as f:
+            f.write("，".join(parts) + "。")
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS"):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文件内容索引基准测试")
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--words", type=int, default=400, help="每篇文档的词数")
+    parser.add_argument("--segment-docs", type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as workdir:
+        root = os.path.join(workdir, "docs")
+        generate_docs(root, args.docs, args.words, rng)
+        data_size = sum(os.path.getsize(os.path.join(d, name)) for d, _, names in os.walk(root) for name in names)
+
+        index = ContentIndex(os.path.join(workdir, "index"), [root], segment_docs=args.segment_docs)
+        build = index.update()
+        info = index.get_stats()
+        print(f"{args.docs} 篇文档，共 {data_size / 1024 / 1024:.1f} MB")
+        print(f"建立索引: {build['seconds']:.2f} 秒，{info['segments']} 个段，"
+              f"索引 {info['bytes'] / 1024 / 1024:.1f} MB")
+
+        for path in rng.sample([os.path.join(root, "dir0", name) for name in os.listdir(os.path.join(root, "dir0"))], 10):
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("新增的风险评估内容。")
+        os.remove(os.path.join(root, "dir1", "doc500.txt"))
+        incremental = index.update()
+        print(f"修改 10 篇、删除 1 篇后增量更新: {incremental['seconds'] * 1000:.1f} ms"
+              f"（更新 {incremental['updated']}，删除 {incremental['removed']}）")
+
+        queries = ["季度报告", "同比增长的销售额", "供应商合同审批", "quarterly revenue", "风险评估", "招聘计划 年度目标"]
+        before = rss_mb()
+        samples = []
+        for _ in range(10):
+            for query in queries:
+                start = time.perf_counter()
+                index._search(query, 10)
+                samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        print(f"查询延迟（不含摘要）: 中位数 {statistics.median(samples):.1f} ms，"
+              f"p99 {samples[int(len(samples) * 0.99)]:.1f} ms")
+        print(f"查询期间常驻内存变化: {rss_mb() - before:+.1f} MB")
+
+        for hit in index.search("风险评估", 3):
+            print(f"  {hit.score:.2f} {os.path.relpath(hit.path, root)} {hit.snippet}")
+
+        start = time.perf_counter()
+        index.merge()
+        print(f"合并为 1 个段: {(time.perf_counter() - start):.2f} 秒，"
+              f"索引 {index.get_stats()['bytes'] / 1024 / 1024:.1f} MB")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""
+文件名索引基准测试
+生成包含中英文文件名的目录树，测量首次建立索引、无变化重新扫描和少量变化后增量扫描的耗时，
+索引大小，以及前缀、子串和模糊查询的延迟
+
+用法: python -m benchmarks.file_index_benchmark [--files 100000]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from tools.file_index import FileIndex
+
+WORDS = ["季度报告", "会议纪要", "项目计划", "合同", "发票", "简历", "预算", "周报", "设计稿", "用户调研",
+         "report", "invoice", "meeting-notes", "budget", "resume", "design", "roadmap", "readme", "draft", "final"]
+EXTENSIONS = [".docx", ".xlsx", ".pdf", ".txt", ".pptx", ".md"]
+
+
+def generate_tree(root: str, files: int, per_dir: int, rng: random.Random) -> int:
+    """生成 files 个文件，每个目录 per_dir 个，目录两级嵌套"""
+    created = 0
+    while created < files:
+        directory = os.path.join(root, f"部门{created // (per_dir * 20)}", f"project_{created // per_dir}")
+        os.makedirs(directory, exist_ok=True)
+        for _ in range(min(per_dir, files - created)):
+            name = f"{rng.choice(WORDS)}_{rng.choice(WORDS)}_{created}{rng.choice(EXTENSIONS)}"
+            open(os.path.join(directory, name), "w").close()
+            created += 1
+    return created
+
+
+def latency(fn, terms, repeat: int = 20) -> tuple:
+    """查询延迟的中位数和 p99（毫秒）"""
+    samples = []
+    for _ in range(repeat):
+        for term in terms:
+            start = time.perf_counter()
+            fn(term)
+            samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文件名索引基准测试")
+    parser.add_argument("--files", type=int, default=100000)
+    parser.add_argument("--per-dir", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as workdir:
+        root = os.path.join(workdir, "home")
+        generate_tree(root, args.files, args.per_dir, rng)
+        index = FileIndex(os.path.join(workdir, "file_index.db"), [root])
+
+        build = index.scan()
+        info = index.get_stats()
+        rescan = index.scan()
+        time.sleep(0.01)
+        touched = os.path.join(root, "部门0", "project_0")
+        open(os.path.join(touched, "新建的季度报告.docx"), "w").close()
+        os.remove(os.path.join(touched, sorted(os.listdir(touched))[0]))
+        incremental = index.scan()
+
+        print(f"{info['files']} 个文件、{info['dirs']} 个目录")
+        print(f"首次建立索引: {build['seconds']:.2f} 秒，数据库 {info['bytes'] / 1024 / 1024:.1f} MB "
+              f"（{info['bytes'] / max(1, info['files'] + info['dirs']):.0f} 字节/项）")
+        print(f"无变化重新扫描: {rescan['seconds'] * 1000:.1f} ms（列出 {rescan['changed']} 个目录）")
+        print(f"一个目录变化后扫描: {incremental['seconds'] * 1000:.1f} ms（列出 {incremental['changed']} 个目录，"
+              f"新增 {incremental['added']}，删除 {incremental['removed']}）")
+
+        print(f"{'查询':<10}{'中位数 ms':>12}{'p99 ms':>12}")
+        for label, fn, terms in (
+            ("前缀", index.prefix, ["季度", "report", "会议纪", "bud"]),
+            ("子串", index.substring, ["报告", "纪要_预算", "notes", "调研"]),
+            ("模糊", index.fuzzy, ["reprot", "meting notes", "季度报表", "budjet"]),
+            ("综合", index.search, ["季度报告", "invoice", "设计", "roadmp"]),
+        ):
+            median, p99 = latency(fn, terms)
+            print(f"{label:<10}{median:>12.3f}{p99:>12.3f}")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
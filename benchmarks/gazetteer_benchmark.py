@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""
+离线行政区划索引基准测试
+检查标注样本（同名地名消歧、"和""与""、"连接的多个地名、省略作为限定的上级、
+景区和台湾城市别名、不支持的境外地名）的解析结果，
+有不一致时以非零状态退出，并测量单次查询耗时
+
+用法: python -m benchmarks.gazetteer_benchmark [--cases benchmarks/data/gazetteer_zh/cases.jsonl]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from external_services.gazetteer import get_gazetteer
+
+DEFAULT_CASES = os.path.join(os.path.dirname(__file__), "data", "gazetteer_zh", "cases.jsonl")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线行政区划索引基准测试")
+    parser.add_argument("--cases", default=DEFAULT_CASES)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(args.cases, "r", encoding="utf-8") as f:
+        samples = [json.loads(line) for line in f if line.strip()]
+
+    start = time.perf_counter()
+    gazetteer = get_gazetteer()
+    print(f"加载索引: {(time.perf_counter() - start) * 1000:.0f} ms，{len(gazetteer.places)} 个行政区划")
+
+    failed = 0
+    for sample in samples:
+        actual = [place.adcode for place in gazetteer.find_all(sample["text"])]
+        unsupported = gazetteer.find_unsupported(sample["text"])
+        if actual != sample["expect"] or unsupported != sample.get("unsupported", []):
+            failed += 1
+            print(f"不一致: {sample['text']}  期望 {sample['expect']} {sample.get('unsupported', [])}"
+                  f"  实际 {actual} {unsupported}")
+    print(f"{len(samples)} 条样本，正确 {len(samples) - failed} 条")
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for sample in samples:
+            gazetteer.find_all(sample["text"])
+    elapsed = time.perf_counter() - start
+    print(f"平均查询耗时: {elapsed / (args.repeat * len(samples)) * 1e6:.1f} us")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""
+音乐库索引基准测试
+生成 "歌手/专辑/01 歌名.mp3" 结构的合成音乐库，测量首次建立索引、无变化重新扫描和少量变化后
+增量扫描的耗时，索引大小，以及按歌手、歌名、同音字、拼音首字母和模糊歌名查找的延迟
+
+用法: python -m benchmarks.music_library_benchmark [--tracks 100000]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from tools.music_library import MusicLibrary, pinyin_keys, pinyin_mode
+
+# GB2312 一级汉字中的常用字，未安装 pypinyin 时也能得到首字母
+CHARS = "安白北春大东风光海红花火佳金蓝乐林流明南年青晴秋山声时天田星雪夜月云长中周杰伦王菲陈李张刘杨黄吴"
+WORDS = ["love", "blue", "night", "rain", "star", "dream", "city", "summer", "heart", "road"]
+
+
+def make_name(rng: random.Random, low: int, high: int) -> str:
+    if rng.random() < 0.15:
+        return " ".join(rng.choice(WORDS).title() for _ in range(rng.randint(1, 3)))
+    return "".join(rng.choice(CHARS) for _ in range(rng.randint(low, high)))
+
+
+def generate_library(root: str, tracks: int, rng: random.Random):
+    """每位歌手 10 张专辑、每张 5 首；返回 [(歌手, 歌名)]"""
+    created, catalog, artists = 0, [], set()
+    while created < tracks:
+        artist = make_name(rng, 2, 3)
+        if artist in artists:
+            continue
+        artists.add(artist)
+        for album_no in range(10):
+            album = os.path.join(root, artist, f"{make_name(rng, 2, 4)}_{album_no}")
+            os.makedirs(album, exist_ok=True)
+            for track_no in range(1, 6):
+                if created >= tracks:
+                    break
+                title = make_name(rng, 2, 5)
+                open(os.path.join(album, f"{track_no:02d} {title}.mp3"), "w").close()
+                catalog.append((artist, title))
+                created += 1
+    return catalog
+
+
+def homophone(name: str) -> str:
+    """替换最后一个字为拼音首字母相同的另一个字（未安装 pypinyin 时按首字母匹配）"""
+    last = name[-1]
+    for char in CHARS:
+        if char != last and pinyin_keys(char) == pinyin_keys(last):
+            return name[:-1] + char
+    return name
+
+
+def latency(fn, terms, repeat: int = 20) -> tuple:
+    """查询延迟的中位数和 p99（毫秒）"""
+    samples = []
+    for _ in range(repeat):
+        for term in terms:
+            start = time.perf_counter()
+            fn(term)
+            samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="音乐库索引基准测试")
+    parser.add_argument("--tracks", type=int, default=100000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as workdir:
+        root = os.path.join(workdir, "Music")
+        catalog = generate_library(root, args.tracks, rng)
+        library = MusicLibrary(os.path.join(workdir, "music_library.db"), [root])
+
+        build = library.scan()
+        info = library.get_stats()
+        rescan = library.scan()
+        time.sleep(0.01)
+        album = os.path.join(root, catalog[0][0], sorted(os.listdir(os.path.join(root, catalog[0][0])))[0])
+        files = sorted(os.listdir(album))
+        os.remove(os.path.join(album, files[0]))
+        with open(os.path.join(album, files[1]), "w") as f:
+            f.write("retagged")
+        open(os.path.join(album, "06 新歌.mp3"), "w").close()
+        incremental = library.scan()
+
+        print(f"拼音: {pinyin_mode()}")
+        print(f"{info['tracks']} 首歌、{info['artists']} 位歌手、{info['albums']} 张专辑")
+        print(f"首次建立索引: {build['seconds']:.2f} 秒，数据库 {info['bytes'] / 1024 / 1024:.1f} MB "
+              f"（{info['bytes'] / max(1, info['tracks']):.0f} 字节/首）")
+        print(f"无变化重新扫描: {rescan['seconds'] * 1000:.0f} ms")
+        print(f"少量变化后扫描: {incremental['seconds'] * 1000:.0f} ms（新增 {incremental['added']}，"
+              f"更新 {incremental['updated']}，删除 {incremental['removed']}）")
+
+        samples = rng.sample(catalog, 20)
+        chinese = [(artist, title) for artist, title in samples if not artist.isascii()] or samples
+        print(f"{'查询':<14}{'中位数 ms':>12}{'p99 ms':>12}")
+        for label, terms in (
+            ("歌手", [artist for artist, _ in samples]),
+            ("歌名", [title for _, title in samples]),
+            ("歌手的歌名", [f"{artist}的{title}" for artist, title in samples]),
+            ("同音字歌手", [homophone(artist) for artist, _ in chinese]),
+            ("拼音首字母", [pinyin_keys(artist)[1] for artist, _ in chinese]),
+            ("歌名子串", [title[1:] for _, title in samples if len(title) > 3]),
+            ("模糊歌名", [title[:-1] + "啊" for _, title in samples if len(title) > 3]),
+        ):
+            median, p99 = latency(library.lookup, terms)
+            found = sum(library.lookup(term) is not None for term in terms)
+            print(f"{label:<14}{median:>12.3f}{p99:>12.3f}    找到 {found}/{len(terms)}")
+        library.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+"""
+预派生多进程内存基准测试
+比较 N 个各自加载模型的独立进程、主进程加载后 fork 的 worker、以及 fork 前 gc.freeze() 的 worker
+三种方式的内存占用（RSS、PSS、私有内存），worker 启动后分配少量私有数据并执行几次垃圾回收。
+默认用合成数据模拟模型权重（大块缓冲区）和 Python 对象（词表等），--asr 时加载配置的语音识别模型
+
+用法: python -m benchmarks.prefork_benchmark [--workers 4] [--weights-mb 200] [--objects 500000] [--asr]
+"""
+
+import argparse
+import gc
+import multiprocessing
+import os
+import signal
+import time
+
+from core.prefork import MB, memory_usage, shared_saving
+
+_mp_context = multiprocessing.get_context("spawn")
+
+
+def load_payload(args):
+    if args.asr:
+        from core.asr_backend import get_asr_backend
+        return get_asr_backend()
+    weights = bytearray(b"\x01") * (args.weights_mb * MB)
+    vocab = {f"token{i}": [i, str(i)] for i in range(args.objects)}
+    return weights, vocab
+
+
+def serve_requests():
+    """模拟 worker 的稳定运行：少量私有分配和周期性的垃圾回收"""
+    buffers = [bytearray(64 * 1024) for _ in range(16)]
+    for _ in range(3):
+        gc.collect()
+    return buffers
+
+
+def _independent_worker(args, conn):
+    payload = load_payload(args)
+    buffers = serve_requests()
+    conn.send(os.getpid())
+    conn.recv()
+    del payload, buffers
+
+
+def run_independent(args, conn):
+    """每个进程各自加载"""
+    pipes, processes = [], []
+    for _ in range(args.workers):
+        parent, child = _mp_context.Pipe()
+        process = _mp_context.Process(target=_independent_worker, args=(args, child))
+        process.start()
+        pipes.append(parent)
+        processes.append(process)
+    pids = [pipe.recv() for pipe in pipes]
+    conn.send({"master": None, "workers": [memory_usage(pid) for pid in pids]})
+    for pipe, process in zip(pipes, processes):
+        pipe.send(None)
+        process.join()
+
+
+def run_prefork(args, conn, freeze: bool):
+    """主进程加载后 fork"""
+    if freeze:
+        gc.disable()
+    payload = load_payload(args)
+    if freeze:
+        gc.freeze()
+
+    ready_r, ready_w = os.pipe()
+    pids = []
+    for _ in range(args.workers):
+        pid = os.fork()
+        if pid == 0:
+            gc.enable()
+            buffers = serve_requests()
+            os.write(ready_w, b"x")
+            time.sleep(3600)
+            del buffers
+            os._exit(0)
+        pids.append(pid)
+    for _ in pids:
+        os.read(ready_r, 1)
+
+    conn.send({"master": memory_usage(os.getpid()), "workers": [memory_usage(pid) for pid in pids]})
+    for pid in pids:
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+    del payload
+
+
+def measure(target, *extra):
+    """在新的解释器中运行一种方式，避免前一种方式的内存影响结果"""
+    parent, child = _mp_context.Pipe()
+    process = _mp_context.Process(target=target, args=extra[:1] + (child,) + extra[1:])
+    process.start()
+    result = parent.recv()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="预派生多进程内存基准测试")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--weights-mb", type=int, default=200)
+    parser.add_argument("--objects", type=int, default=500000)
+    parser.add_argument("--asr", action="store_true", help="加载配置的语音识别模型代替合成数据")
+    args = parser.parse_args()
+
+    if memory_usage(os.getpid()) is None:
+        print("当前系统不支持读取 /proc/<pid>/smaps_rollup")
+        return
+
+    payload = "语音识别模型" if args.asr else f"{args.weights_mb} MB 缓冲区 + {args.objects} 个词表项"
+    print(f"{args.workers} 个 worker，预加载: {payload}")
+    print(f"{'方式':<20}{'RSS/worker':>12}{'PSS/worker':>12}{'私有/worker':>12}{'合计 PSS':>12}{'估算节省/worker':>16}")
+
+    baseline = None
+    for label, target, extra in (
+        ("独立进程", run_independent, ()),
+        ("prefork", run_prefork, (False,)),
+        ("prefork + gc.freeze", run_prefork, (True,)),
+    ):
+        result = measure(target, args, *extra)
+        workers = result["workers"]
+        count = len(workers)
+        total = sum(usage["pss"] for usage in workers) + (result["master"]["pss"] if result["master"] else 0)
+        if baseline is None:
+            baseline = total
+        rss = sum(usage["rss"] for usage in workers) / count
+        pss = sum(usage["pss"] for usage in workers) / count
+        private = sum(usage["private_clean"] + usage["private_dirty"] for usage in workers) / count
+        saved = sum(shared_saving(usage) for usage in workers) / count
+        print(f"{label:<20}{rss / MB:>12.1f}{pss / MB:>12.1f}{private / MB:>12.1f}{total / MB:>12.1f}"
+              f"{saved / MB:>16.1f}")
+        if total != baseline:
+            print(f"{'':<20}合计 PSS 比独立进程少 {(baseline - total) / MB:.1f} MB"
+                  f"（每个 worker {(baseline - total) / count / MB:.1f} MB）")
+
+
+if __name__ == "__main__":
+    main()
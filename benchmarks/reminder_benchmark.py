@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""
+日程提醒调度基准测试
+向调度器加入 N 个提醒，测量添加、改期和取消的单次耗时，
+以及即将到期的提醒实际触发时间与计划时间的偏差
+
+用法: python -m benchmarks.reminder_benchmark [--reminders 100000]
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from core.reminders import ReminderScheduler
+
+
+def timed(fn, count: int) -> float:
+    """平均单次耗时（微秒）"""
+    start = time.perf_counter()
+    for index in range(count):
+        fn(index)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+async def run(args):
+    lateness = []
+
+    async def notify(reminder):
+        lateness.append((time.time() - reminder["fire_at"]) * 1000)
+
+    scheduler = ReminderScheduler(notify)
+    scheduler.start()
+    rng = random.Random(0)
+    now = time.time()
+    far = [now + 3600 + rng.random() * 86400 * 30 for _ in range(args.reminders)]
+
+    add = timed(lambda i: scheduler.schedule(("event", i), far[i], {"fire_at": far[i]}), args.reminders)
+    moved = [now + 3600 + rng.random() * 86400 * 30 for _ in range(args.reminders)]
+    reschedule = timed(lambda i: scheduler.schedule(("event", i), moved[i], {"fire_at": moved[i]}),
+                       args.reminders)
+    cancel = timed(lambda i: scheduler.cancel(("event", i)), args.reminders // 2)
+
+    # 在大量远期提醒之外加入即将到期的提醒，检查触发精度
+    now = time.time()
+    for index in range(args.due):
+        fire_at = now + 0.2 + index * args.spacing
+        scheduler.schedule(("due", index), fire_at, {"fire_at": fire_at})
+    await asyncio.sleep(0.5 + args.due * args.spacing)
+    scheduler.stop()
+
+    print(f"{args.reminders} 个提醒（单位：微秒/次）")
+    print(f"  添加      {add:.2f}")
+    print(f"  改期      {reschedule:.2f}")
+    print(f"  取消      {cancel:.2f}")
+    print(f"剩余 {len(scheduler)} 个提醒，堆中 {len(scheduler._heap)} 个条目")
+    if lateness:
+        print(f"触发 {len(lateness)}/{args.due} 个到期提醒，延迟中位数 {statistics.median(lateness):.2f} ms，"
+              f"最大 {max(lateness):.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日程提醒调度基准测试")
+    parser.add_argument("--reminders", type=int, default=100000)
+    parser.add_argument("--due", type=int, default=50, help="即将到期的提醒数")
+    parser.add_argument("--spacing", type=float, default=0.01, help="到期提醒之间的间隔（秒）")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+"""
+外部服务弹性层基准测试
+启动本地伪高德服务，模拟长尾延迟、服务故障和恢复，
+检查对冲请求降低尾延迟、瞬时故障被重试掩盖，以及熔断器的打开、半开和关闭，不符合预期时退出码为 1
+
+用法: python -m benchmarks.resilience_benchmark [--requests 200]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config.settings import settings
+from external_services.amap_client import amap_client
+from external_services.resilience import ResilientService, CircuitOpenError
+
+LIVE_WEATHER = {
+    "status": "1",
+    "lives": [{
+        "province": "广东", "city": "深圳市", "adcode": "440300", "weather": "阴",
+        "temperature": "27", "winddirection": "东", "windpower": "≤3", "humidity": "80",
+        "reporttime": "2025-09-28 23:30:38"
+    }]
+}
+
+
+class FakeAmapHandler(BaseHTTPRequestHandler):
+    """伪高德接口：mode 为 ok / slow_tail / down"""
+
+    def do_GET(self):
+        mode = self.server.mode
+        if mode == "down" or self.server.fail_next > 0:
+            self.server.fail_next -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        if mode == "slow_tail" and random.random() < self.server.tail_ratio:
+            time.sleep(self.server.tail_delay)
+        else:
+            time.sleep(self.server.base_delay)
+
+        body = json.dumps(LIVE_WEATHER, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # 对冲请求胜出后另一个请求被取消
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeAmapHandler)
+    server.mode = "ok"
+    server.base_delay = 0.01
+    server.tail_delay = 0.5
+    server.tail_ratio = 0.03
+    server.fail_next = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def run_calls(service: ResilientService, url: str, count: int) -> list:
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        try:
+            await service.acall(amap_client.get_json, url)
+        except Exception:
+            pass
+        latencies.append(time.perf_counter() - start)
+    return sorted(latencies)
+
+
+def percentile(values: list, q: float) -> float:
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+class Checker:
+    def __init__(self):
+        self.failed = 0
+
+    def __call__(self, ok: bool, message: str):
+        if not ok:
+            self.failed += 1
+            print(f"  不符合预期: {message}")
+
+
+async def run(args, server, check: Checker):
+    url = f"http://127.0.0.1:{server.server_port}/v3/weather/weatherInfo?city=440300"
+    config = dict(settings.RESILIENCE["amap"], recovery_timeout=1.0, base_delay=0.01)
+
+    print("== 长尾延迟：对冲请求 ==")
+    server.mode = "slow_tail"
+    p99 = {}
+    for hedge in (False, True):
+        service = ResilientService(f"amap-hedge-{hedge}", dict(config, hedge=hedge))
+        await run_calls(service, url, 30)  # 预热延迟统计
+        latencies = await run_calls(service, url, args.requests)
+        metrics = service.get_metrics()
+        p99[hedge] = percentile(latencies, 0.99)
+        print(f"hedge={hedge!s:<5} p50={percentile(latencies, 0.5) * 1000:6.1f}ms "
+              f"p99={p99[hedge] * 1000:6.1f}ms "
+              f"对冲次数={metrics['hedges']} 对冲胜出={metrics['hedge_wins']}")
+        if hedge:
+            check(metrics["hedges"] > 0 and metrics["hedge_wins"] > 0, "长尾请求没有触发对冲或对冲从未胜出")
+            check(p99[True] < server.tail_delay, f"对冲后 p99 仍不低于长尾延迟 {server.tail_delay}s")
+        else:
+            check(metrics["hedges"] == 0, "未开启对冲时发出了对冲请求")
+    check(p99[True] < p99[False], "对冲没有降低 p99")
+
+    print("\n== 瞬时故障：重试 ==")
+    server.mode = "ok"
+    service = ResilientService("amap-retry", dict(config, hedge=False))
+    server.fail_next = config["max_attempts"] - 1
+    result = await service.acall(amap_client.get_json, url)
+    metrics = service.get_metrics()
+    print(f"前 {config['max_attempts'] - 1} 次返回 503 后: 重试次数={metrics['retries']} 状态={metrics['state']}")
+    check(result == LIVE_WEATHER, "重试后没有拿到正确结果")
+    check(metrics["retries"] == config["max_attempts"] - 1, "重试次数不正确")
+    check(metrics["state"] == "closed", "失败次数未达到阈值却打开了熔断")
+
+    print("\n== 服务故障：熔断 ==")
+    service = ResilientService("amap-breaker", dict(config, hedge=False))
+    server.mode = "down"
+    outcomes = []
+    for index in range(8):
+        start = time.perf_counter()
+        try:
+            await service.acall(amap_client.get_json, url)
+            outcome = "成功"
+        except CircuitOpenError:
+            outcome = "快速失败"
+        except Exception as e:
+            outcome = f"失败({type(e).__name__})"
+        outcomes.append(outcome)
+        print(f"请求 {index + 1}: {outcome:<20} 耗时 {(time.perf_counter() - start) * 1000:6.1f}ms "
+              f"状态={service.breaker.state}")
+    check(service.breaker.state == "open", "连续失败后熔断器没有打开")
+    check(outcomes[-1] == "快速失败", "熔断打开后请求没有被快速拒绝")
+    check("成功" not in outcomes, "服务故障时请求却成功了")
+
+    print("\n== 服务恢复：半开 -> 关闭 ==")
+    server.mode = "ok"
+    await asyncio.sleep(config["recovery_timeout"])
+    print(f"等待 {config['recovery_timeout']} 秒后状态={service.breaker.state}")
+    check(service.breaker.state == "half_open", "恢复等待结束后熔断器没有进入半开状态")
+    result = await service.acall(amap_client.get_json, url)
+    print(f"探测成功后状态={service.breaker.state}")
+    check(result == LIVE_WEATHER, "探测请求没有拿到正确结果")
+    check(service.breaker.state == "closed", "探测成功后熔断器没有关闭")
+    print(f"\n指标: {json.dumps(service.get_metrics(), ensure_ascii=False)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="外部服务弹性层基准测试")
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    server = start_server()
+    check = Checker()
+    try:
+        asyncio.run(run(args, server, check))
+    finally:
+        server.shutdown()
+        amap_client.close()
+
+    if check.failed:
+        print(f"\n{check.failed} 项检查不符合预期")
+        sys.exit(1)
+    print("\n所有检查均符合预期")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+中文时间表达式解析基准测试
+在标注语料上统计日期、时刻、结束时刻和时长的准确率，并测量单次解析耗时
+
+用法: python -m benchmarks.time_parser_benchmark [--corpus benchmarks/data/time_zh/corpus.jsonl]
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+from tools.time_parser import parse_time_expression
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "data", "time_zh", "corpus.jsonl")
+FIELDS = ("date", "time", "end", "duration_minutes")
+
+
+def describe(text: str, now: datetime) -> dict:
+    result = parse_time_expression(text, now)
+    end = result.end()
+    return {
+        "date": result.date.isoformat() if result.date else None,
+        "time": result.time.strftime("%H:%M") if result.time else None,
+        "end": end.strftime("%H:%M") if end else None,
+        "duration_minutes": int(result.duration.total_seconds() // 60) if result.duration else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="中文时间表达式解析基准测试")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with open(args.corpus, "r", encoding="utf-8") as f:
+        samples = [json.loads(line) for line in f if line.strip()]
+
+    correct = {field: 0 for field in FIELDS}
+    exact = 0
+    for sample in samples:
+        now = datetime.fromisoformat(sample["now"])
+        actual = describe(sample["text"], now)
+        matched = True
+        for field in FIELDS:
+            if actual[field] == sample["expect"][field]:
+                correct[field] += 1
+            else:
+                matched = False
+        if matched:
+            exact += 1
+        else:
+            print(f"不一致: {sample['text']}  期望 {sample['expect']}  实际 {actual}")
+
+    print(f"{len(samples)} 条样本，完全正确 {exact} 条（{exact / len(samples):.1%}）")
+    for field in FIELDS:
+        print(f"  {field:<18}{correct[field] / len(samples):.1%}")
+
+    texts = [(sample["text"], datetime.fromisoformat(sample["now"])) for sample in samples]
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for text, now in texts:
+            parse_time_expression(text, now)
+    elapsed = time.perf_counter() - start
+    print(f"平均解析耗时: {elapsed / (args.repeat * len(texts)) * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,13 +9,48 @@ class Settings:
     SAMPLE_RATE = 16000
     RECORD_DURATION = 5  # 录音时长（秒）
 
+    # 语音模式采集设置
+    VOICE_CAPTURE = {
+        "mode": "stream",  # "stream"（检测语音结束）或 "fixed"（固定录音 RECORD_DURATION 秒）
+        "source": "microphone",  # "microphone"、"wav" 或 "stdin"（16 位 PCM）
+        "wav_path": None,  # source 为 wav 时的文件路径
+        "frame_duration": 0.03,  # 每帧时长（秒）
+        "silence_threshold": 500,  # 静音能量阈值（RMS）
+        "min_speech_duration": 0.2,  # 确认开始说话所需的语音时长（秒）
+        "end_silence_duration": 0.8,  # 说话后持续静音多久视为结束（秒）
+        "pre_roll": 0.3,  # 保留语音开始前的音频时长（秒）
+        "no_speech_timeout": 8.0,  # 一直未说话时的超时（秒）
+        "max_duration": 30.0  # 单句最长时长（秒）
+    }
+
     # 语音合成设置
     TTS_RATE = 160
 
     # 模型设置
     WHISPER_MODEL = "base"
+
+    # 语音识别后端设置
+    ASR = {
+        "engine": "whisper",  # "whisper"（openai-whisper）或 "faster_whisper"（CTranslate2 int8 量化）
+        "model": WHISPER_MODEL,
+        "language": "zh",
+        "compute_type": "int8",  # faster_whisper 的权重量化类型
+        "cpu_threads": 0,  # faster_whisper 的 CPU 线程数，0 为自动
+        "beam_size": 1
+    }
     LLM_MODEL = "deepseek-r1:14b"
 
+    # 智能体设置
+    # "function_calling"（原生工具调用）时，未识别到工具意图的通用对话由该智能体处理；
+    # "react"（文本解析）只用于基准测试，通用对话直接由 LLM 回答
+    AGENT_MODE = "function_calling"
+    FUNCTION_AGENT = {
+        "max_iterations": 3,  # 每轮对话最多调用模型次数
+        "max_tokens": 1024,  # 每轮对话的 token 预算
+        "num_predict": 512,  # 单次生成的最大 token 数
+        "return_tool_output": True  # 工具结果直接作为回答，省去总结调用
+    }
+
     # 服务地址
     MCP_WEATHER_URL = "http://localhost:5000/mcp/tools/weather_tool/execute"
     OLLAMA_URL = "http://localhost:11434/api/generate"
@@ -24,7 +59,9 @@ class Settings:
     TOOL_CONFIG = {
         "weather": {
             "enabled": True,
-            "timeout": 10
+            "timeout": 10,
+            "max_cities": 5,  # 一次查询最多返回几个城市的天气
+            "multi_city_concurrency": 4  # 多城市查询的并发请求数
         },
         "calendar": {
             "enabled": True
@@ -42,6 +79,24 @@ class Settings:
             "enabled": True
         }
     }
+    # 工具注册表配置
+    TOOL_REGISTRY = {
+        "watch": True,  # 监听 tools_config.json 变化并热加载
+        "watch_interval": 2.0  # 检查修改时间的间隔（秒）
+    }
+
+    # 工具执行配置，各工具可在 tools_config.json 的 execution 中覆盖 defaults
+    TOOL_EXECUTION = {
+        "backend": "process",  # "process"（隔离的工作进程池）或 "inline"（主进程内执行）
+        "defaults": {
+            "isolated": True,  # 是否在工作进程中执行
+            "max_concurrency": 2,  # 最大并发数（即工作进程数）
+            "queue_size": 8,  # 最大排队请求数，超出时直接拒绝
+            "timeout": 10,  # 单次执行超时（秒），超时的进程会被杀死并替换
+            "memory_limit_mb": 1024  # 工作进程的地址空间上限
+        }
+    }
+
     env_path = Path('.') / '.env'
     load_dotenv(dotenv_path=env_path)  # 加载.env文件中的环境变量到os.environ中
 
@@ -58,6 +113,36 @@ class Settings:
         "max_silence_duration": 3.0  # 最大静音时长（秒）
     }
 
+    # 唤醒词配置：未唤醒时音频不送入 Whisper
+    WAKE_WORD = {
+        "enabled": False,
+        "phrase": "你好助手",
+        "template_dir": "wake_word_templates",  # 唤醒词模板录音目录（python -m core.wake_word 录制）
+        "sensitivity": 0.5,  # 0~1，越高越容易唤醒
+        "min_distance": 8.0,  # 灵敏度为 0 时的模板距离阈值
+        "max_distance": 16.0,  # 灵敏度为 1 时的模板距离阈值
+        "energy_threshold": 300,  # 低于该能量的窗口直接跳过
+        "hop_duration": 0.1,  # 检测步长（秒）
+        "listen_window": 8.0  # 唤醒后持续接收语音的时长（秒）
+    }
+
+    # 推测预取配置：根据部分识别结果提前执行只读工具
+    SPECULATIVE_PREFETCH = {
+        "enabled": False,
+        "partial_interval": 0.5,  # 每累积多少秒新音频识别一次部分文本（上一次未完成时跳过）
+        "partial_window": 4.0,  # 部分识别只取最近多少秒音频，限制每次识别的计算量
+        "tools": ["weather_tool", "calendar_tool", "system_tool"],  # 幂等只读工具
+        "max_pending": 2  # 每个会话同时进行的推测数
+    }
+
+    # 日程提醒：在事件开始前 default_reminder_minutes（日历工具配置）推送到实时语音会话
+    REMINDERS = {
+        "enabled": True,
+        "tool": "calendar_tool",  # 提供日历数据库路径和提醒提前量的工具
+        "horizon": 86400,  # 每次加载未来多少秒内的提醒
+        "poll_interval": 60.0  # 兜底检查日历数据版本的间隔（秒），发现其他进程新增的事件
+    }
+
     # LangSmith 配置
     LANGCHAIN_TRACING_V2 = os.getenv("LANGCHAIN_TRACING_V2", "false").lower() == "true"
     LANGCHAIN_ENDPOINT = os.getenv("LANGCHAIN_ENDPOINT", "https://api.smith.langchain.com")
@@ -67,6 +152,24 @@ class Settings:
     # LangServe 配置
     LANGSERVE_HOST = os.getenv("LANGSERVE_HOST", "0.0.0.0")
     LANGSERVE_PORT = int(os.getenv("LANGSERVE_PORT", 8000))
+    LANGSERVE = {
+        "max_concurrency": int(os.getenv("LANGSERVE_MAX_CONCURRENCY", 4)),  # 同时处理的请求数（含批量请求中的各项）
+        "max_batch_size": 32,  # 单个批量请求最多包含的输入数
+        "stream_think": os.getenv("LANGSERVE_STREAM_THINK", "false").lower() == "true",  # 流式接口默认是否推送 <think> 内容
+        "stream_keepalive": 15  # 流式接口无事件时发送心跳的间隔（秒）
+    }
+
+    # 多进程（prefork）服务配置：主进程加载一次模型后 fork 出 worker，模型权重写时复制共享
+    PREFORK = {
+        "workers": int(os.getenv("PREFORK_WORKERS", 0)),  # worker 数，0 为 CPU 核数
+        "reuse_port": True,  # 各 worker 以 SO_REUSEPORT 各自监听同一端口，由内核分配连接；否则共用主进程的监听套接字
+        "preload_asr": True,  # 主进程预先加载语音识别模型
+        "restart_delay": 1.0,  # worker 退出后重启前的等待（秒），连续崩溃时加倍
+        "max_restart_delay": 30.0,
+        "min_uptime": 10.0,  # 运行不足该时长就退出视为连续崩溃（秒）
+        "report_interval": 300,  # 定期输出各 worker 内存占用的间隔（秒），0 为不输出（可随时发送 SIGUSR1）
+        "shutdown_timeout": 10.0  # 停止时等待 worker 退出的时长（秒），超时后强制结束
+    }
 
     # LangChain 详细日志配置
     LANGCHAIN_VERBOSE = os.getenv("LANGCHAIN_VERBOSE", "false").lower() == "true"
@@ -76,5 +179,40 @@ class Settings:
     IP_LOCATION_API = os.getenv("IP_LOCATION_API", 'https://restapi.amap.com/v3/ip')
     WEATHER_INFO_API = os.getenv("WEATHER_INFO_API", 'https://restapi.amap.com/v3/weather/weatherInfo')
 
+    # 高德客户端连接池配置（请求超时使用 TOOL_CONFIG["weather"]["timeout"]）
+    AMAP_CLIENT = {
+        "max_connections": 10,  # 最大并发连接数
+        "max_keepalive_connections": 5,  # 保持的空闲长连接数
+        "keepalive_expiry": 30.0,  # 空闲长连接保留时间（秒）
+        "pool_timeout": 5.0  # 等待空闲连接的超时（秒）
+    }
+
+    # 天气与 IP 定位缓存配置
+    WEATHER_CACHE = {
+        "update_interval": 3600,  # 高德实况天气更新周期（秒），缓存到 reporttime + 该值
+        "min_ttl": 300,  # 最短缓存时间（秒），reporttime 已过期时按此间隔重试
+        "max_ttl": 3600,  # 最长缓存时间（秒）
+        "location_ttl": 86400,  # IP 定位结果缓存时间（秒）
+        "max_entries": 512,  # 每类缓存的最大条目数
+        "refresh_enabled": True,  # 是否后台刷新热门城市
+        "hot_cities": 10,  # 后台刷新查询最多的前 N 个城市
+        "refresh_interval": 60,  # 后台刷新检查间隔（秒）
+        "refresh_ahead": 120  # 提前多少秒刷新即将过期的城市
+    }
+
+    # 外部服务弹性配置（熔断、重试、对冲请求）
+    RESILIENCE = {
+        "amap": {
+            "failure_threshold": 5,  # 连续失败多少次后熔断
+            "recovery_timeout": 30.0,  # 熔断后多久进入半开状态（秒）
+            "half_open_max_calls": 1,  # 半开状态放行的探测请求数
+            "max_attempts": 3,  # 含首次请求的最大尝试次数
+            "base_delay": 0.2,  # 重试退避基准（秒），带全抖动
+            "max_delay": 2.0,  # 重试退避上限（秒）
+            "hedge": True,  # 超过 P95 延迟仍未返回时发出对冲请求
+            "hedge_min_delay": 0.3  # 对冲等待的下限（秒）
+        }
+    }
+
 settings = Settings()
 print(settings.WEBSOCKET_HOST)
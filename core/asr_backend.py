@@ -0,0 +1,104 @@
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Union
+
+import numpy as np
+
+from config.settings import settings
+
+AudioInput = Union[str, np.ndarray]
+
+
+def to_float32(audio: np.ndarray) -> np.ndarray:
+    """将 int16 音频转换为 [-1, 1] 的 float32"""
+    if audio.dtype == np.int16:
+        return audio.astype(np.float32) / 32768.0
+    return audio.astype(np.float32)
+
+
+class ASRBackend(ABC):
+    """语音识别后端基类，输入为 WAV 路径或 16kHz 单声道数组"""
+
+    name = ""
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.language = config.get("language", "zh")
+
+    @abstractmethod
+    def transcribe(self, audio: AudioInput) -> str:
+        """识别音频，返回文本"""
+
+
+class WhisperBackend(ASRBackend):
+    """openai-whisper 后端"""
+
+    name = "whisper"
+
+    def __init__(self, config: dict):
+        super().__init__(config)
+        import whisper
+
+        self.model = whisper.load_model(config["model"], device="cpu")
+        # 同一模型实例在多线程中推理需要串行
+        self._lock = threading.Lock()
+
+    def transcribe(self, audio: AudioInput) -> str:
+        if isinstance(audio, np.ndarray):
+            audio = to_float32(audio)
+        with self._lock:
+            result = self.model.transcribe(audio, fp16=False, language=self.language)
+        return result["text"].strip()
+
+
+class FasterWhisperBackend(ASRBackend):
+    """faster-whisper（CTranslate2）后端，CPU 上使用 int8 量化权重"""
+
+    name = "faster_whisper"
+
+    def __init__(self, config: dict):
+        super().__init__(config)
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise RuntimeError("未安装 faster-whisper，请执行 pip install faster-whisper，"
+                               "或将 settings.ASR['engine'] 设为 \"whisper\"") from e
+
+        self.beam_size = config.get("beam_size", 1)
+        self.model = WhisperModel(
+            config["model"],
+            device="cpu",
+            compute_type=config.get("compute_type", "int8"),
+            cpu_threads=config.get("cpu_threads", 0),
+            num_workers=config.get("num_workers", 1)
+        )
+
+    def transcribe(self, audio: AudioInput) -> str:
+        if isinstance(audio, np.ndarray):
+            audio = to_float32(audio)
+        segments, _ = self.model.transcribe(audio, language=self.language, beam_size=self.beam_size)
+        return "".join(segment.text for segment in segments).strip()
+
+
+ASR_BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend
+}
+
+_backend_instances: Dict[tuple, ASRBackend] = {}
+_backend_lock = threading.Lock()
+
+
+def get_asr_backend(engine: str = None, **overrides) -> ASRBackend:
+    """获取识别后端，同一配置在进程内只加载一次模型"""
+    config = dict(settings.ASR, **overrides)
+    engine = engine or config["engine"]
+    if engine not in ASR_BACKENDS:
+        raise ValueError(f"未知的语音识别后端: {engine}，可选: {', '.join(ASR_BACKENDS)}")
+
+    key = (engine, tuple(sorted(config.items())))
+    with _backend_lock:
+        if key not in _backend_instances:
+            print(f"加载语音识别后端 {engine}（模型 {config['model']}）")
+            _backend_instances[key] = ASR_BACKENDS[engine](config)
+        return _backend_instances[key]
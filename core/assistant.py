@@ -8,13 +8,16 @@ from langchain.memory import ConversationBufferWindowMemory
 from langchain.prompts import PromptTemplate
 from langchain.tools import Tool as LangchainTool
 from langchain_community.chat_message_histories import ChatMessageHistory
-from langchain_ollama import OllamaLLM
+from langchain_ollama import OllamaLLM, ChatOllama
 from langgraph.graph import StateGraph, END
 
 from config.settings import settings
 from langserve.langsmith_integration import langsmith_integration
+from .function_agent import FunctionCallingAgent, ThinkFilter, strip_think
+from .intent import detect_intent, intent_to_tool
 from .realtime_audio import AssistantAudioManager
 from .speech_utils import SpeechUtils
+from .tool_executor import tool_executor
 from .tool_registry import tool_registry
 
 
@@ -22,10 +25,20 @@ from .tool_registry import tool_registry
 class AssistantState(TypedDict):
     audio_path: Optional[str]
     recognized_text: Optional[str]
+    user_input: Optional[str]
     intent: Optional[str]
     tool_result: Optional[str]
     response_text: Optional[str]
     synthesis_complete: bool
+    prefetcher: Optional[Any]
+    listener: Optional[Any]
+
+
+async def _emit(state: AssistantState, event: str, data: Dict[str, Any]):
+    """通知流式调用方处理进度（未提供 listener 时忽略）"""
+    listener = state.get("listener")
+    if listener:
+        await listener(event, data)
 
 
 class VoiceAssistant:
@@ -40,8 +53,9 @@ class VoiceAssistant:
         # 初始化LLM
         self.llm = OllamaLLM(model=settings.LLM_MODEL, temperature=0.7)
 
-        # 创建工具集
+        # 创建工具集，并在工具配置变化时增量更新
         self.tools = self._get_langchain_tools()
+        tool_registry.add_listener(self._on_tools_changed)
 
         # 创建内存
         self.memory = self._create_memory()
@@ -81,20 +95,85 @@ class VoiceAssistant:
         )
 
     def _get_langchain_tools(self):
-        """获取LangChain格式的工具集"""
-        tools = []
-        active_tools = tool_registry.get_all_tools()
+        """获取LangChain格式的工具集（工具在首次调用时才实例化）"""
+        self._langchain_tools = {
+            name: self._make_langchain_tool(spec)
+            for name, spec in tool_registry.get_enabled_specs().items()
+        }
+        return list(self._langchain_tools.values())
+
+    @staticmethod
+    def _make_langchain_tool(spec) -> LangchainTool:
+        """创建通过注册表延迟获取工具实例的 LangChain 工具"""
+        def run_tool(query: str, name: str = spec.name) -> str:
+            return tool_executor.run(name, query)
+
+        return LangchainTool(
+            name=spec.name,
+            func=run_tool,
+            description=spec.description or spec.name
+        )
 
-        for name, tool_instance in active_tools.items():
-            tools.append(LangchainTool(
-                name=name,
-                func=tool_instance.run,
-                description=tool_instance.description
-            ))
+    def _on_tools_changed(self, diff, snapshot):
+        """工具注册表变更回调（可能来自配置文件监听线程）"""
+        self._apply_tool_diff(diff)
+
+    def _apply_tool_diff(self, diff):
+        """按配置差异增量更新工具集和智能体"""
+        if not diff or not hasattr(self, "agent"):
+            return
+
+        enabled_specs = tool_registry.get_enabled_specs()
+        langchain_tools = dict(self._langchain_tools)
+        prompt_changed = False
+        for name in diff.removed + diff.added + diff.changed:
+            old_tool = langchain_tools.pop(name, None)
+            spec = enabled_specs.get(name)
+            if spec:
+                langchain_tools[name] = self._make_langchain_tool(spec)
+            # 仅配置变化时，包装函数会从注册表取到新实例，无需更新智能体
+            new_tool = langchain_tools.get(name)
+            if (old_tool is None) != (new_tool is None) or (
+                    old_tool and new_tool and old_tool.description != new_tool.description):
+                prompt_changed = True
+
+        self._langchain_tools = langchain_tools
+        self.tools = list(langchain_tools.values())
+        if not prompt_changed:
+            return
+        if isinstance(self.agent, FunctionCallingAgent):
+            self.agent.update_tools(self.tools)
+        else:
+            self.agent = self._create_react_agent()
+
+    def _create_agent(self, mode: str = None):
+        """根据配置创建智能体"""
+        mode = mode or settings.AGENT_MODE
+        if mode == "function_calling":
+            return self._create_function_agent()
+        return self._create_react_agent()
+
+    def _create_function_agent(self):
+        """创建原生工具调用智能体"""
+        agent_config = settings.FUNCTION_AGENT
+        chat_llm = ChatOllama(
+            model=settings.LLM_MODEL,
+            temperature=0.7,
+            num_predict=agent_config["num_predict"]
+        )
+        callback_manager = langsmith_integration.get_callback_manager()
 
-        return tools
+        return FunctionCallingAgent(
+            chat_llm=chat_llm,
+            tools=self.tools,
+            memory=self.memory,
+            max_iterations=agent_config["max_iterations"],
+            max_tokens=agent_config["max_tokens"],
+            return_tool_output=agent_config["return_tool_output"],
+            callbacks=callback_manager.handlers if callback_manager else None
+        )
 
-    def _create_agent(self):
+    def _create_react_agent(self):
         """创建React智能体"""
         # 获取工具名称列表
         tool_names = ", ".join([tool.name for tool in self.tools])
@@ -172,9 +251,13 @@ class VoiceAssistant:
 
     # 工作流节点函数
     async def _speech_recognition_node(self, state: AssistantState) -> Dict[str, Any]:
-        """语音识别节点"""
-        print("开始录音...")
-        audio_path = self.speech_utils.record_audio()
+        """语音识别节点（文本输入时跳过录音）"""
+        if state.get("recognized_text"):
+            return {}
+        if settings.VOICE_CAPTURE["mode"] == "stream":
+            audio_path = self.speech_utils.record_utterance()
+        else:
+            audio_path = self.speech_utils.record_audio()
         text = self.speech_utils.speech_to_text(audio_path)
         return {
             "audio_path": audio_path,
@@ -187,18 +270,8 @@ class VoiceAssistant:
         if not text:
             return {"intent": "unknown"}
 
-        # 简单的意图分类
-        intents = {
-            "weather": any(
-                keyword in text for keyword in ["天气", "气温", "温度", "下雨", "下雪", "天氣", "氣溫", "溫度"]),
-            "calendar": any(keyword in text for keyword in ["日历", "日程", "会议", "安排", "事件"]),
-            "files": any(keyword in text for keyword in ["文件", "查找", "打开", "文件夹", "文档"]),
-            "music": any(keyword in text for keyword in ["音乐", "播放", "歌曲", "暂停", "下一首"]),
-            "system": any(keyword in text for keyword in ["锁屏", "关机", "打开应用", "系统"]),
-            "calculation": any(keyword in text for keyword in ["计算", "算一下", "等于多少", "+", "-", "*", "/"])
-        }
-
-        detected_intent = next((intent for intent, detected in intents.items() if detected), "general")
+        detected_intent = detect_intent(text)
+        await _emit(state, "intent", {"intent": detected_intent, "tool": intent_to_tool(detected_intent)})
         return {
             "intent": detected_intent,
             "user_input": text
@@ -210,38 +283,65 @@ class VoiceAssistant:
         intent = state.get("intent", "general")
 
         # 根据意图选择工具
-        tool_mapping = {
-            "weather": "weather_tool",
-            "calendar": "calendar_tool",
-            "files": "file_tool",
-            "music": "music_tool",
-            "system": "system_tool",
-            "calculation": "calculator_tool"
-        }
-
-        tool_name = tool_mapping.get(intent)
+        tool_name = intent_to_tool(intent)
         if not tool_name:
-            return {"tool_result": self.llm.invoke(user_input)}
-
-        tool = tool_registry.get_tool(tool_name)
-        if not tool:
-            return {"tool_result": f"抱歉，{tool_name} 工具当前不可用"}
+            if settings.AGENT_MODE == "function_calling":
+                return {"tool_result": await self._run_agent(state, user_input)}
+            if state.get("listener"):
+                return {"tool_result": await self._stream_llm(state, user_input)}
+            return {"tool_result": strip_think(await self.llm.ainvoke(user_input))}
+
+        await _emit(state, "tool_start", {"tool": tool_name})
+
+        # 复用部分识别阶段推测执行的结果
+        prefetcher = state.get("prefetcher")
+        if prefetcher:
+            prefetched = await prefetcher.take(tool_name, user_input)
+            if prefetched is not None:
+                await _emit(state, "tool_end", {"tool": tool_name, "result": prefetched, "prefetched": True})
+                return {"tool_result": prefetched}
 
         try:
-            result = tool.run(user_input)
-            return {"tool_result": result}
+            result = await tool_executor.arun(tool_name, user_input)
         except Exception as e:
-            return {"tool_result": f"执行工具时出错: {str(e)}"}
+            result = f"执行工具时出错: {str(e)}"
+        await _emit(state, "tool_end", {"tool": tool_name, "result": result, "prefetched": False})
+        return {"tool_result": result}
+
+    async def _run_agent(self, state: AssistantState, user_input: str) -> str:
+        """原生工具调用模式下，通用对话交给智能体（可能调用多个工具），有监听方时流式推送模型输出"""
+        on_text = None
+        if state.get("listener"):
+            async def on_text(kind: str, text: str):
+                await _emit(state, "token" if kind == "text" else "think", {"text": text})
+        result = await self.agent.ainvoke({"input": user_input}, on_text=on_text)
+        return result.get("output", "")
+
+    async def _stream_llm(self, state: AssistantState, user_input: str) -> str:
+        """流式生成，逐段推送正文（token）和推理过程（think），返回去掉 <think> 后的完整回复"""
+        think_filter = ThinkFilter()
+        text = []
+        async for chunk in self.llm.astream(user_input):
+            for kind, part in think_filter.feed(chunk):
+                if kind == "text":
+                    text.append(part)
+                await _emit(state, "token" if kind == "text" else "think", {"text": part})
+        for kind, part in think_filter.flush():
+            if kind == "text":
+                text.append(part)
+            await _emit(state, "token" if kind == "text" else "think", {"text": part})
+        return "".join(text).strip()
 
     async def _response_generation_node(self, state: AssistantState) -> Dict[str, Any]:
         """响应生成节点"""
         tool_result = state.get("tool_result", "")
+        await _emit(state, "final", {"text": tool_result})
         return {"response_text": tool_result}
 
     async def _speech_synthesis_node(self, state: AssistantState) -> Dict[str, Any]:
-        """语音合成节点"""
+        """语音合成节点（只在本机录音的语音模式下播报，文本请求的回复由调用方发送）"""
         response_text = state.get("response_text", "")
-        if response_text:
+        if response_text and state.get("audio_path"):
             self.text_to_speech(response_text)
         return {"synthesis_complete": True}
 
@@ -255,7 +355,7 @@ class VoiceAssistant:
     async def run_voice_mode(self):
         """运行语音模式"""
         print("语音助手已启动（语音模式）")
-        print("支持的功能：", ", ".join(tool_registry.get_all_tools().keys()))
+        print("支持的功能：", ", ".join(tool_registry.get_enabled_specs().keys()))
 
         while True:
             try:
@@ -286,8 +386,8 @@ class VoiceAssistant:
             except Exception as e:
                 print(f"发生错误: {e}")
 
-    async def process_text(self, text: str) -> str:
-        """处理文本输入"""
+    async def process_text(self, text: str, prefetcher=None, listener=None) -> str:
+        """处理文本输入；listener(event, data) 为异步回调，用于流式推送各阶段事件"""
         try:
             # 初始化状态
             initial_state = AssistantState(
@@ -296,7 +396,9 @@ class VoiceAssistant:
                 intent=None,
                 tool_result=None,
                 response_text=None,
-                synthesis_complete=False
+                synthesis_complete=False,
+                prefetcher=prefetcher,
+                listener=listener
             )
 
             # 使用LangSmith跟踪
@@ -317,22 +419,16 @@ class VoiceAssistant:
     def reload_tools(self):
         """重新加载工具配置"""
         tool_registry.reload_config()
-        # 重新创建智能体以包含新工具
-        self.agent = self._create_agent()
-        print("工具配置已重新加载")
+        print(f"工具配置已重新加载（版本 {tool_registry.version}）")
 
     def add_tool(self, name: str, class_path: str, config: Dict[str, Any] = None, enable: bool = True):
         """动态添加新工具"""
         tool_registry.add_dynamic_tool(name, class_path, config, enable)
-        # 重新创建智能体以包含新工具
-        self.agent = self._create_agent()
         print(f"工具 '{name}' 已添加")
 
     def remove_tool(self, name: str):
         """移除工具"""
         tool_registry.unregister_tool(name)
-        # 重新创建智能体以移除工具
-        self.agent = self._create_agent()
         print(f"工具 '{name}' 已移除")
 
     def log_feedback(self, run_id: str, score: int, comment: str = ""):
@@ -0,0 +1,236 @@
+import queue
+import sys
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Optional
+
+import numpy as np
+import scipy.io.wavfile
+
+
+class AudioSource(ABC):
+    """音频输入源基类，按帧输出 int16 单声道数据"""
+
+    def __init__(self, sample_rate: int, frame_size: int):
+        self.sample_rate = sample_rate
+        self.frame_size = frame_size
+
+    def start(self):
+        """开始采集"""
+        pass
+
+    def stop(self):
+        """停止采集"""
+        pass
+
+    @abstractmethod
+    def read(self, timeout: float = 1.0) -> Optional[np.ndarray]:
+        """读取一帧音频，音频源结束时返回 None"""
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+class MicrophoneSource(AudioSource):
+    """麦克风音频源，基于 sounddevice.InputStream 回调写入帧队列"""
+
+    def __init__(self, sample_rate: int, frame_size: int, max_queued_frames: int = 500):
+        super().__init__(sample_rate, frame_size)
+        self.frames: queue.Queue = queue.Queue(maxsize=max_queued_frames)
+        self.overflows = 0
+        self.stream = None
+
+    def _callback(self, indata, frames, time_info, status):
+        """音频回调（在 PortAudio 线程中执行，只做拷贝入队）"""
+        if status:
+            self.overflows += 1
+        try:
+            self.frames.put_nowait(indata[:, 0].copy())
+        except queue.Full:
+            self.overflows += 1
+
+    def start(self):
+        import sounddevice as sd
+
+        self.stream = sd.InputStream(
+            samplerate=self.sample_rate,
+            blocksize=self.frame_size,
+            channels=1,
+            dtype='int16',
+            callback=self._callback
+        )
+        self.stream.start()
+
+    def stop(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+    def read(self, timeout: float = 1.0) -> Optional[np.ndarray]:
+        try:
+            return self.frames.get(timeout=timeout)
+        except queue.Empty:
+            # 麦克风不会结束，超时返回空帧
+            return np.zeros(0, dtype=np.int16)
+
+
+class WavFileSource(AudioSource):
+    """WAV 文件音频源，用于无麦克风环境下的运行与基准测试"""
+
+    def __init__(self, path: str, sample_rate: int, frame_size: int):
+        super().__init__(sample_rate, frame_size)
+        file_rate, audio = scipy.io.wavfile.read(path)
+        if file_rate != sample_rate:
+            raise ValueError(f"WAV 采样率 {file_rate} 与配置 {sample_rate} 不一致")
+        if audio.ndim > 1:
+            audio = audio[:, 0]
+        self.audio = self.to_int16(audio)
+        self.position = 0
+
+    @staticmethod
+    def to_int16(audio: np.ndarray) -> np.ndarray:
+        """按样本类型换算为 int16：32 位（含左对齐的 24 位）取高 16 位，8 位无符号去掉偏置，浮点按 [-1, 1]"""
+        if audio.dtype == np.int16:
+            return audio
+        if audio.dtype == np.int32:
+            return (audio >> 16).astype(np.int16)
+        if audio.dtype == np.uint8:
+            return ((audio.astype(np.int16) - 128) << 8).astype(np.int16)
+        if audio.dtype.kind == "f":
+            return (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+        raise ValueError(f"不支持的 WAV 样本类型: {audio.dtype}")
+
+    def read(self, timeout: float = 1.0) -> Optional[np.ndarray]:
+        if self.position >= len(self.audio):
+            return None
+        frame = self.audio[self.position:self.position + self.frame_size]
+        self.position += self.frame_size
+        return frame
+
+
+class StdinPCMSource(AudioSource):
+    """标准输入音频源，读取原始 16 位小端 PCM（如 arecord -f S16_LE 的输出）"""
+
+    def __init__(self, sample_rate: int, frame_size: int, stream=None):
+        super().__init__(sample_rate, frame_size)
+        self.stream = stream or sys.stdin.buffer
+
+    def read(self, timeout: float = 1.0) -> Optional[np.ndarray]:
+        data = self.stream.read(self.frame_size * 2)
+        if not data:
+            return None
+        return np.frombuffer(data[:len(data) // 2 * 2], dtype='<i2').astype(np.int16)
+
+
+class EndOfSpeechDetector:
+    """基于能量的语音结束检测"""
+
+    def __init__(self, sample_rate: int, frame_size: int, silence_threshold: float,
+                 end_silence_duration: float, min_speech_duration: float,
+                 max_duration: float, no_speech_timeout: float):
+        frame_duration = frame_size / sample_rate
+        self.silence_threshold = silence_threshold
+        self.end_silence_frames = int(end_silence_duration / frame_duration)
+        self.min_speech_frames = int(min_speech_duration / frame_duration)
+        self.max_frames = int(max_duration / frame_duration)
+        self.no_speech_frames = int(no_speech_timeout / frame_duration)
+        self.reset()
+
+    def reset(self):
+        self.total_frames = 0
+        self.speech_frames = 0
+        self.silence_run = 0
+
+    @property
+    def speech_started(self) -> bool:
+        return self.speech_frames >= self.min_speech_frames
+
+    @staticmethod
+    def energy(frame: np.ndarray) -> float:
+        """帧的均方根能量"""
+        if len(frame) == 0:
+            return 0.0
+        samples = frame.astype(np.float32)
+        return float(np.sqrt(np.mean(samples * samples)))
+
+    def update(self, frame: np.ndarray) -> bool:
+        """输入一帧，返回语音是否已结束"""
+        self.total_frames += 1
+        if self.energy(frame) >= self.silence_threshold:
+            self.speech_frames += 1
+            self.silence_run = 0
+        else:
+            self.silence_run += 1
+
+        if self.total_frames >= self.max_frames:
+            return True
+        if self.speech_started:
+            return self.silence_run >= self.end_silence_frames
+        return self.total_frames >= self.no_speech_frames
+
+
+class StreamingRecorder:
+    """流式录音：从音频源读取帧，检测到语音结束后返回整段语音"""
+
+    def __init__(self, sample_rate: int, config: dict):
+        self.sample_rate = sample_rate
+        self.frame_size = int(config["frame_duration"] * sample_rate)
+        self.pre_roll_frames = int(config["pre_roll"] / config["frame_duration"])
+        self.detector = EndOfSpeechDetector(
+            sample_rate,
+            self.frame_size,
+            silence_threshold=config["silence_threshold"],
+            end_silence_duration=config["end_silence_duration"],
+            min_speech_duration=config["min_speech_duration"],
+            max_duration=config["max_duration"],
+            no_speech_timeout=config["no_speech_timeout"]
+        )
+
+    def record(self, source: AudioSource) -> np.ndarray:
+        """录制一句话，开头的静音只保留 pre_roll 时长"""
+        self.detector.reset()
+        # 语音确认前的帧（含前导静音和起始语音）暂存在环形缓冲中
+        pre_roll = deque(maxlen=self.pre_roll_frames + self.detector.min_speech_frames + 1)
+        captured = []
+
+        with source:
+            while True:
+                frame = source.read()
+                if frame is None:
+                    break
+                if len(frame) == 0:
+                    continue
+
+                done = self.detector.update(frame)
+                if self.detector.speech_started:
+                    if pre_roll:
+                        captured.extend(pre_roll)
+                        pre_roll.clear()
+                    captured.append(frame)
+                else:
+                    pre_roll.append(frame)
+
+                if done:
+                    break
+
+        if not captured:
+            return np.zeros(0, dtype=np.int16)
+        return np.concatenate(captured)
+
+
+def create_audio_source(config: dict, sample_rate: int) -> AudioSource:
+    """根据配置创建音频源"""
+    frame_size = int(config["frame_duration"] * sample_rate)
+    source = config["source"]
+    if source == "microphone":
+        return MicrophoneSource(sample_rate, frame_size)
+    if source == "wav":
+        return WavFileSource(config["wav_path"], sample_rate, frame_size)
+    if source == "stdin":
+        return StdinPCMSource(sample_rate, frame_size)
+    raise ValueError(f"未知的音频源: {source}")
@@ -0,0 +1,221 @@
+import re
+import time
+from typing import Dict, Any, Awaitable, Callable, List, Optional, Tuple
+
+from langchain_core.messages import (
+    AIMessage, HumanMessage, SystemMessage, ToolMessage, BaseMessage
+)
+from langchain_core.tools import StructuredTool
+
+from tools.base_tool import ToolInput
+
+THINK_PATTERN = re.compile(r"<think>.*?(</think>|$)", re.DOTALL)
+
+
+def strip_think(text: str) -> str:
+    """去除推理模型输出中的 <think> 段落"""
+    if not text:
+        return ""
+    return THINK_PATTERN.sub("", text).strip()
+
+
+class ThinkFilter:
+    """流式输出中分离 <think> 段落
+
+    feed() 接收模型输出的片段，返回 [("think" | "text", 文本)]；标签可能被拆在两个片段中，
+    可能是标签开头的尾部字符会留到下一个片段再判断。
+    """
+
+    OPEN, CLOSE = "<think>", "</think>"
+
+    def __init__(self):
+        self.in_think = False
+        self._pending = ""
+        self._started = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        text = self._pending + chunk
+        self._pending = ""
+        parts = []
+        while text:
+            tag = self.CLOSE if self.in_think else self.OPEN
+            index = text.find(tag)
+            if index >= 0:
+                self._append(parts, text[:index])
+                text = text[index + len(tag):]
+                self.in_think = not self.in_think
+                continue
+            # 末尾可能是被截断的标签
+            keep = next((n for n in range(min(len(tag) - 1, len(text)), 0, -1) if tag.startswith(text[-n:])), 0)
+            self._append(parts, text[:len(text) - keep])
+            self._pending = text[len(text) - keep:]
+            break
+        return parts
+
+    def flush(self) -> List[Tuple[str, str]]:
+        parts = []
+        self._append(parts, self._pending)
+        self._pending = ""
+        return parts
+
+    def _append(self, parts: List[Tuple[str, str]], text: str):
+        if not text:
+            return
+        kind = "think" if self.in_think else "text"
+        if kind == "text" and not self._started:
+            # 去掉 </think> 之后、正文之前的空白
+            text = text.lstrip()
+            if not text:
+                return
+            self._started = True
+        parts.append((kind, text))
+
+
+class FunctionCallingAgent:
+    """基于原生工具调用（Ollama tool calling）的智能体
+
+    与 ReAct 文本解析不同，模型直接输出结构化的工具调用，
+    每轮对话受迭代次数和 token 预算约束。
+    """
+
+    SYSTEM_PROMPT = (
+        "你是一个智能语音助手，可以帮助用户完成各种任务。"
+        "需要时请直接调用工具，不要输出推理过程；"
+        "如果用户的问题不明确，请主动询问更多细节。回答请简洁友好。"
+    )
+
+    def __init__(self, chat_llm, tools: List, memory=None,
+                 max_iterations: int = 3, max_tokens: int = 1024,
+                 return_tool_output: bool = True, callbacks=None):
+        self.chat_llm = chat_llm
+        self.memory = memory
+        self.max_iterations = max_iterations
+        self.max_tokens = max_tokens
+        self.return_tool_output = return_tool_output
+        self.callbacks = callbacks
+        self.tools: Dict[str, StructuredTool] = {}
+        self.llm_with_tools = None
+        self.update_tools(tools)
+
+    @staticmethod
+    def to_structured_tool(tool) -> StructuredTool:
+        """将单字符串输入的工具转换为带参数 schema 的结构化工具"""
+        if isinstance(tool, StructuredTool):
+            return tool
+        return StructuredTool.from_function(
+            func=tool.func,
+            name=tool.name,
+            description=tool.description or tool.name,
+            args_schema=ToolInput
+        )
+
+    def update_tools(self, tools: List):
+        """更新工具集，只需重新绑定工具 schema，无需重建智能体"""
+        self.tools = {tool.name: self.to_structured_tool(tool) for tool in tools}
+        self.llm_with_tools = self.chat_llm.bind_tools(list(self.tools.values()))
+
+    def _history(self) -> List[BaseMessage]:
+        if not self.memory:
+            return []
+        return self.memory.load_memory_variables({}).get("chat_history", [])
+
+    def _save(self, user_input: str, output: str):
+        if self.memory:
+            self.memory.save_context({"input": user_input}, {"output": output})
+
+    @staticmethod
+    def _count_tokens(message: AIMessage) -> int:
+        usage = getattr(message, "usage_metadata", None) or {}
+        return usage.get("total_tokens", 0)
+
+    async def _run_tool(self, name: str, args: Dict[str, Any]) -> str:
+        tool = self.tools.get(name)
+        if not tool:
+            return f"未知工具: {name}"
+        try:
+            return str(await tool.ainvoke(args))
+        except Exception as e:
+            return f"执行工具 {name} 时出错: {str(e)}"
+
+    async def _call_llm(self, messages: List[BaseMessage], config: Dict[str, Any],
+                        on_text: Optional[Callable[[str, str], Awaitable[None]]]) -> AIMessage:
+        """调用一次模型；传入 on_text 时流式生成，逐段回调 ("think" | "text", 文本)"""
+        if on_text is None:
+            return await self.llm_with_tools.ainvoke(messages, config=config)
+        think_filter = ThinkFilter()
+        message = None
+        async for chunk in self.llm_with_tools.astream(messages, config=config):
+            message = chunk if message is None else message + chunk
+            for kind, part in think_filter.feed(chunk.content if isinstance(chunk.content, str) else ""):
+                await on_text(kind, part)
+        for kind, part in think_filter.flush():
+            await on_text(kind, part)
+        return message if message is not None else AIMessage(content="")
+
+    async def ainvoke(self, input_data: Dict[str, Any], config: Optional[Dict[str, Any]] = None,
+                      on_text: Optional[Callable[[str, str], Awaitable[None]]] = None) -> Dict[str, Any]:
+        """执行一轮对话；on_text 用于流式推送模型生成的推理过程和正文"""
+        user_input = input_data.get("input", "")
+        config = dict(config or {})
+        if self.callbacks and "callbacks" not in config:
+            config["callbacks"] = self.callbacks
+
+        messages: List[BaseMessage] = [SystemMessage(content=self.SYSTEM_PROMPT)]
+        messages.extend(self._history())
+        messages.append(HumanMessage(content=user_input))
+
+        start = time.perf_counter()
+        llm_calls = 0
+        tokens = 0
+        output = ""
+        last_observation = ""
+
+        iteration = 0
+        for iteration in range(1, self.max_iterations + 1):
+            # 每次调用模型前检查 token 预算
+            if tokens >= self.max_tokens:
+                iteration -= 1
+                output = last_observation or "抱歉，这个请求超出了处理预算"
+                break
+
+            ai_message = await self._call_llm(messages, config, on_text)
+            llm_calls += 1
+            tokens += self._count_tokens(ai_message)
+
+            if not ai_message.tool_calls:
+                output = strip_think(ai_message.content)
+                if output:
+                    break
+                # 生成长度用完时还停在 <think> 中，不算作回答，在预算内重试
+                continue
+
+            messages.append(ai_message)
+
+            observations = []
+            for call in ai_message.tool_calls:
+                observation = await self._run_tool(call["name"], call.get("args", {}))
+                observations.append(observation)
+                messages.append(ToolMessage(content=observation, tool_call_id=call["id"]))
+            last_observation = "\n".join(observations)
+
+            # 工具结果本身就是回答，省去一次总结调用
+            if self.return_tool_output:
+                output = last_observation
+                break
+        else:
+            output = last_observation or "抱歉，我暂时无法完成这个请求"
+
+        self._save(user_input, output)
+        return {
+            "input": user_input,
+            "output": output,
+            "iterations": iteration,
+            "llm_calls": llm_calls,
+            "tokens": tokens,
+            "latency": time.perf_counter() - start
+        }
+
+    def invoke(self, input_data: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """同步执行一轮对话：在新的事件循环中运行，不能在已有事件循环的线程中调用（请使用 ainvoke）"""
+        import asyncio
+        return asyncio.run(self.ainvoke(input_data, config))
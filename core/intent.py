@@ -0,0 +1,37 @@
+from typing import Optional
+
+# 意图关键词
+INTENT_KEYWORDS = {
+    "weather": ["天气", "气温", "温度", "下雨", "下雪", "天氣", "氣溫", "溫度"],
+    "calendar": ["日历", "日程", "会议", "开会", "安排", "事件"],
+    "files": ["文件", "查找", "打开", "文件夹", "文档"],
+    "music": ["音乐", "播放", "歌曲", "暂停", "下一首"],
+    # 只收录询问当前时间的说法，"什么时间开会"之类的日程查询不能归为系统查询
+    "system": ["锁屏", "关机", "打开应用", "系统", "几点", "现在时间", "当前时间", "现在的时间"],
+    "calculation": ["计算", "算一下", "等于多少", "+", "-", "*", "/"]
+}
+
+# 意图到工具的映射
+INTENT_TOOL_MAPPING = {
+    "weather": "weather_tool",
+    "calendar": "calendar_tool",
+    "files": "file_tool",
+    "music": "music_tool",
+    "system": "system_tool",
+    "calculation": "calculator_tool"
+}
+
+
+def detect_intent(text: str) -> str:
+    """简单的关键词意图分类"""
+    if not text:
+        return "unknown"
+    return next(
+        (intent for intent, keywords in INTENT_KEYWORDS.items() if any(k in text for k in keywords)),
+        "general"
+    )
+
+
+def intent_to_tool(intent: str) -> Optional[str]:
+    """获取意图对应的工具名称"""
+    return INTENT_TOOL_MAPPING.get(intent)
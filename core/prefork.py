@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+"""
+预派生（prefork）多进程服务
+
+主进程导入依赖并加载语音识别模型后 fork 出多个 worker，模型权重和已导入的模块以写时复制的方式
+在各 worker 间共享；worker 退出后由主进程重启。主进程只加载、不推理，fork 前停止配置监听线程
+（线程不会被 fork 复制），worker 启动后再各自重新启动。
+
+用法: python -m core.prefork {api,websocket} [--workers 4]
+"""
+
+import argparse
+import asyncio
+import gc
+import importlib
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config.settings import settings
+
+MB = 1024 * 1024
+
+
+def _serve_api(sock: socket.socket):
+    import uvicorn
+    from serve import app
+
+    uvicorn.Server(uvicorn.Config(app)).run(sockets=[sock])
+
+
+def _serve_websocket(sock: socket.socket):
+    from websocket_server import VoiceWebSocketServer
+
+    asyncio.run(VoiceWebSocketServer().start_server(sock=sock))
+
+
+# 服务名 -> (地址, 端口, 主进程预先导入的模块, worker 中运行服务的函数)
+SERVERS: Dict[str, Tuple[str, int, Tuple[str, ...], Callable[[socket.socket], None]]] = {
+    "api": (settings.LANGSERVE_HOST, settings.LANGSERVE_PORT,
+            ("fastapi", "uvicorn", "langserve.assistant_chain"), _serve_api),
+    "websocket": (settings.WEBSOCKET_HOST, settings.WEBSOCKET_PORT,
+                  ("websockets", "core.assistant"), _serve_websocket)
+}
+
+
+def create_socket(host: str, port: int, reuse_port: bool) -> socket.socket:
+    """创建监听套接字；reuse_port 时多个进程可各自监听同一端口，由内核分配连接"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    return sock
+
+
+def memory_usage(pid: int) -> Optional[Dict[str, int]]:
+    """读取 /proc/<pid>/smaps_rollup（字节），进程不存在或非 Linux 时返回 None"""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            lines = f.readlines()[1:]
+    except OSError:
+        return None
+    usage = {}
+    for line in lines:
+        key, _, value = line.partition(":")
+        usage[key.strip().lower()] = int(value.split()[0]) * 1024
+    return usage
+
+
+def shared_saving(usage: Dict[str, int]) -> int:
+    """与独立进程相比少占用的内存
+
+    独立进程的匿名内存（模型权重、Python 对象）全部私有，文件映射（代码、动态库）本来就共享，
+    因此按匿名内存与其 PSS 份额之差计算；内核不提供 Pss_Anon 时退化为 RSS - PSS。
+    """
+    if "pss_anon" in usage:
+        return usage["anonymous"] - usage["pss_anon"]
+    return usage["rss"] - usage["pss"]
+
+
+@dataclass
+class WorkerInfo:
+    slot: int
+    pid: int
+    started: float
+
+
+class PreforkMaster:
+    """主进程：预加载、fork worker 并监督重启"""
+
+    def __init__(self, server: str, workers: int = None):
+        if server not in SERVERS:
+            raise ValueError(f"未知的服务: {server}，可选: {', '.join(SERVERS)}")
+        self.config = settings.PREFORK
+        self.host, self.port, self.modules, self.serve = SERVERS[server]
+        self.workers = workers or self.config["workers"] or os.cpu_count() or 1
+        self.reuse_port = self.config["reuse_port"] and hasattr(socket, "SO_REUSEPORT")
+        self.children: Dict[int, WorkerInfo] = {}
+        self._restart_at: Dict[int, float] = {}
+        self._restart_delay: Dict[int, float] = {}
+        self._listener: Optional[socket.socket] = None
+        self._stopping = False
+        self._report_requested = False
+
+    # ---- 预加载 ----
+
+    def preload(self):
+        """导入服务依赖并加载模型，worker 中再次导入时直接复用"""
+        start = time.perf_counter()
+        for module in self.modules:
+            importlib.import_module(module)
+        if self.config["preload_asr"]:
+            from core.asr_backend import get_asr_backend
+            get_asr_backend()
+        print(f"预加载完成，耗时 {time.perf_counter() - start:.1f} 秒")
+
+        # 线程不会被 fork 复制，且可能在 fork 时持有锁
+        from core.tool_registry import tool_registry
+        tool_registry.stop_watcher(wait=True)
+
+    def _after_fork(self):
+        """worker 中恢复信号处理、垃圾回收和后台线程"""
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGUSR1):
+            signal.signal(signum, signal.SIG_DFL)
+        gc.enable()
+        if settings.TOOL_REGISTRY["watch"]:
+            from core.tool_registry import tool_registry
+            tool_registry.start_watcher()
+
+    # ---- worker ----
+
+    def _spawn(self, slot: int):
+        pid = os.fork()
+        if pid:
+            self.children[pid] = WorkerInfo(slot, pid, time.monotonic())
+            return
+
+        code = 1
+        try:
+            self._after_fork()
+            sock = self._listener or create_socket(self.host, self.port, reuse_port=True)
+            print(f"worker {slot}（pid {os.getpid()}）开始监听 {self.host}:{self.port}")
+            self.serve(sock)
+            code = 0
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else 1
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            # 不执行主进程注册的 atexit 回调，工具工作进程在这里关闭
+            from core.tool_executor import tool_executor
+            tool_executor.shutdown()
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+
+    def _reap(self):
+        """回收退出的 worker，按连续崩溃次数延迟重启"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            worker = self.children.pop(pid, None)
+            if worker is None or self._stopping:
+                continue
+
+            now = time.monotonic()
+            delay = self._restart_delay.get(worker.slot, self.config["restart_delay"])
+            if now - worker.started >= self.config["min_uptime"]:
+                delay = self.config["restart_delay"]
+            self._restart_delay[worker.slot] = min(delay * 2, self.config["max_restart_delay"])
+            self._restart_at[worker.slot] = now + delay
+            print(f"worker {worker.slot}（pid {pid}）已退出（{os.waitstatus_to_exitcode(status)}），"
+                  f"{delay:.1f} 秒后重启")
+
+    def _restart_due(self):
+        now = time.monotonic()
+        for slot, due in list(self._restart_at.items()):
+            if due <= now:
+                del self._restart_at[slot]
+                self._spawn(slot)
+
+    # ---- 内存报告 ----
+
+    def memory_report(self) -> Dict[str, Any]:
+        """主进程和各 worker 的 RSS/PSS，以及与各自独立加载模型的进程相比节省的内存"""
+        master = memory_usage(os.getpid())
+        workers = {}
+        for worker in sorted(self.children.values(), key=lambda w: w.slot):
+            usage = memory_usage(worker.pid)
+            if usage:
+                workers[worker.slot] = dict(usage, pid=worker.pid, saved=shared_saving(usage))
+        return {"master": master, "workers": workers}
+
+    def print_memory_report(self):
+        report = self.memory_report()
+        if not report["master"]:
+            print("当前系统不支持读取 /proc/<pid>/smaps_rollup，无法统计内存")
+            return
+        master = report["master"]
+        print(f"主进程: RSS {master['rss'] / MB:.1f} MB，PSS {master['pss'] / MB:.1f} MB")
+        for slot, usage in report["workers"].items():
+            private = usage["private_clean"] + usage["private_dirty"]
+            print(f"worker {slot}（pid {usage['pid']}）: RSS {usage['rss'] / MB:.1f} MB，"
+                  f"PSS {usage['pss'] / MB:.1f} MB，私有 {private / MB:.1f} MB，"
+                  f"比独立进程节省 {usage['saved'] / MB:.1f} MB")
+        if report["workers"]:
+            saved = sum(usage["saved"] for usage in report["workers"].values())
+            total = master["pss"] + sum(usage["pss"] for usage in report["workers"].values())
+            print(f"合计 PSS {total / MB:.1f} MB，{len(report['workers'])} 个 worker 共节省 {saved / MB:.1f} MB"
+                  f"（平均每个 {saved / len(report['workers']) / MB:.1f} MB）")
+
+    # ---- 主循环 ----
+
+    def _on_stop(self, signum, frame):
+        self._stopping = True
+
+    def _on_report(self, signum, frame):
+        self._report_requested = True
+
+    def run(self):
+        # 预加载期间关闭垃圾回收，fork 前冻结已有对象，避免 worker 的垃圾回收写入共享页
+        gc.disable()
+        self.preload()
+        if not self.reuse_port:
+            self._listener = create_socket(self.host, self.port, reuse_port=False)
+        gc.freeze()
+
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGUSR1, self._on_report)
+        print(f"主进程 pid {os.getpid()}，启动 {self.workers} 个 worker"
+              f"（{'SO_REUSEPORT' if self.reuse_port else '共用监听套接字'}）")
+        for slot in range(self.workers):
+            self._spawn(slot)
+
+        interval = self.config["report_interval"]
+        next_report = time.monotonic() + interval
+        try:
+            while not self._stopping:
+                self._reap()
+                self._restart_due()
+                if self._report_requested or (interval and time.monotonic() >= next_report):
+                    self._report_requested = False
+                    next_report = time.monotonic() + interval
+                    self.print_memory_report()
+                time.sleep(0.2)
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        """通知所有 worker 退出，超时后强制结束"""
+        self._stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.config["shutdown_timeout"]
+        while self.children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+            self.children.pop(pid, None)
+        if self._listener:
+            self._listener.close()
+        print("所有 worker 已退出")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="预派生多进程服务")
+    parser.add_argument("server", choices=sorted(SERVERS))
+    parser.add_argument("--workers", type=int, default=None, help="worker 数，默认取配置或 CPU 核数")
+    args = parser.parse_args()
+    PreforkMaster(args.server, args.workers).run()
+
+
+if __name__ == "__main__":
+    main()
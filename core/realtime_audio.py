@@ -3,25 +3,40 @@ import websockets
 import json
 import base64
 import numpy as np
-import whisper
-import tempfile
-import scipy.io.wavfile
-from typing import Callable, Optional
-from config import settings
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+from config.settings import settings
+from external_services.amap_service import client_ip
+from tools.calendar_store import CalendarStore
+from .asr_backend import get_asr_backend
+from .reminders import ReminderScheduler, format_reminder
+from .speculative import SpeculativePrefetcher, speculation_stats
+from .tool_executor import tool_executor
+from .tool_registry import tool_registry
+from .wake_word import WakeWordDetector, wake_word_stats
 
 
 class RealtimeAudioProcessor:
     """实时音频处理器"""
 
     def __init__(self):
-        self.whisper_model = whisper.load_model(settings.WHISPER_MODEL)
+        self.asr_backend = get_asr_backend()
         self.sample_rate = settings.REALTIME_AUDIO["sample_rate"]
         self.buffer_duration = settings.REALTIME_AUDIO["buffer_duration"]
         self.chunk_size = settings.REALTIME_AUDIO["chunk_size"]
         self.is_listening = False
         self.audio_buffer = []
         self.callback: Optional[Callable] = None
+        self.partial_callback: Optional[Callable] = None
+        self.partial_interval = settings.SPECULATIVE_PREFETCH["partial_interval"]
+        self.partial_window = int(settings.SPECULATIVE_PREFETCH["partial_window"] * self.sample_rate)
+        self._last_partial_samples = 0
+        self._partial_task: Optional[asyncio.Task] = None
         self.websocket = None
+        self.wake_detector = self._create_wake_detector()
+        self.wake_listen_window = settings.WAKE_WORD["listen_window"]
+        self._awake_until = 0.0
+        self._first_after_wake = False
 
     async def start_listening(self, websocket, callback: Callable):
         """开始监听音频流"""
@@ -29,6 +44,7 @@ class RealtimeAudioProcessor:
         self.callback = callback
         self.websocket = websocket
         self.audio_buffer = []
+        self._last_partial_samples = 0
 
         print("开始实时语音采集...")
 
@@ -45,6 +61,7 @@ class RealtimeAudioProcessor:
             print(f"音频处理错误: {e}")
         finally:
             self.is_listening = False
+            self._cancel_partial()
 
     async def _process_audio_message(self, message):
         """处理音频消息"""
@@ -58,6 +75,16 @@ class RealtimeAudioProcessor:
                 # 转换为numpy数组
                 audio_array = np.frombuffer(audio_data, dtype=np.int16)
 
+                # 未唤醒时音频只经过唤醒词检测，不送入 Whisper
+                if self.wake_detector and not self._is_awake():
+                    if self.audio_buffer:
+                        self._cancel_partial()
+                        self.audio_buffer = []
+                        self._last_partial_samples = 0
+                    if await asyncio.to_thread(self.wake_detector.process, audio_array):
+                        self._wake()
+                    return
+
                 # 添加到缓冲区
                 self.audio_buffer.extend(audio_array)
 
@@ -65,6 +92,8 @@ class RealtimeAudioProcessor:
                 buffer_length = len(self.audio_buffer) / self.sample_rate
                 if buffer_length >= self.buffer_duration:
                     await self._process_buffer()
+                elif self.partial_callback:
+                    self._process_partial()
 
             elif data.get("type") == "stop":
                 # 处理剩余缓冲区
@@ -80,41 +109,109 @@ class RealtimeAudioProcessor:
         if not self.audio_buffer:
             return
 
+        # 最终识别覆盖部分识别，不再等待其结果
+        self._cancel_partial()
+
         try:
             # 转换为numpy数组
             audio_array = np.array(self.audio_buffer, dtype=np.int16)
 
-            # 保存为临时文件进行识别
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-                scipy.io.wavfile.write(temp_file.name, self.sample_rate, audio_array)
-
-                # 语音识别
-                result = self.whisper_model.transcribe(
-                    temp_file.name,
-                    fp16=False,
-                    language="zh"
-                )
+            text = await asyncio.to_thread(self._transcribe, audio_array)
+            if self.wake_detector:
+                text = self._after_wake_result(text)
+            if text:
+                print(f"识别结果: {text}")
 
-                text = result["text"].strip()
-                if text:
-                    print(f"识别结果: {text}")
+                # 调用回调函数处理文本
+                if self.callback:
+                    response = await self.callback(text)
 
-                    # 调用回调函数处理文本
-                    if self.callback:
-                        response = await self.callback(text)
-
-                        # 发送响应回客户端
-                        if self.websocket:
-                            await self._send_response(response)
+                    # 发送响应回客户端
+                    if self.websocket:
+                        await self._send_response(response)
 
             # 清空缓冲区（保留最后0.5秒数据用于上下文）
             keep_samples = int(0.5 * self.sample_rate)
             self.audio_buffer = self.audio_buffer[-keep_samples:] if len(self.audio_buffer) > keep_samples else []
+            self._last_partial_samples = len(self.audio_buffer)
 
         except Exception as e:
             print(f"处理音频缓冲区错误: {e}")
             self.audio_buffer = []
 
+    def _create_wake_detector(self) -> Optional[WakeWordDetector]:
+        """启用唤醒词时创建检测器，没有模板则不启用"""
+        if not settings.WAKE_WORD["enabled"]:
+            return None
+        detector = WakeWordDetector(self.sample_rate)
+        if not detector.ready:
+            print(f"未找到唤醒词模板（{settings.WAKE_WORD['template_dir']}），唤醒词检测未启用")
+            return None
+        return detector
+
+    def _is_awake(self) -> bool:
+        return time.monotonic() < self._awake_until
+
+    def _wake(self):
+        """唤醒后，只有之后的音频送入识别"""
+        self._awake_until = time.monotonic() + self.wake_listen_window
+        self._first_after_wake = True
+        self._cancel_partial()
+        self.audio_buffer = []
+        self._last_partial_samples = 0
+
+    def _after_wake_result(self, text: str) -> str:
+        """统计误唤醒，并在有效对话时延长唤醒窗口"""
+        text = self.wake_detector.strip_phrase(text)
+        if text:
+            self._awake_until = time.monotonic() + self.wake_listen_window
+        elif self._first_after_wake:
+            self.wake_detector.report_false_wake()
+        self._first_after_wake = False
+        return text
+
+    def _process_partial(self):
+        """每累积 partial_interval 秒新音频，在后台识别一次部分文本用于推测预取
+
+        不阻塞音频接收：同一时间最多一个部分识别任务，进行中时跳过本次；
+        只识别最近 partial_window 秒音频，每次的计算量不随缓冲区增长。
+        """
+        if self._partial_task and not self._partial_task.done():
+            return
+        new_samples = len(self.audio_buffer) - self._last_partial_samples
+        if new_samples < self.partial_interval * self.sample_rate:
+            return
+
+        self._last_partial_samples = len(self.audio_buffer)
+        audio_array = np.array(self.audio_buffer[-self.partial_window:], dtype=np.int16)
+        self._partial_task = asyncio.create_task(self._run_partial(audio_array))
+
+    async def _run_partial(self, audio_array: np.ndarray):
+        try:
+            start = time.perf_counter()
+            text = await asyncio.to_thread(self._transcribe, audio_array)
+            speculation_stats.add(partial_asr_seconds=time.perf_counter() - start)
+            if text:
+                await self.partial_callback(text)
+        except Exception as e:
+            print(f"部分识别错误: {e}")
+
+    def _cancel_partial(self):
+        """取消进行中的部分识别；已在线程中开始的识别会运行完，但结果被丢弃"""
+        if self._partial_task and not self._partial_task.done():
+            self._partial_task.cancel()
+        self._partial_task = None
+
+    def _transcribe(self, audio_array: np.ndarray) -> str:
+        """识别一段音频"""
+        start = time.perf_counter()
+        text = self.asr_backend.transcribe(audio_array)
+        wake_word_stats.add(
+            asr_audio_seconds=len(audio_array) / self.sample_rate,
+            asr_cpu_seconds=time.perf_counter() - start
+        )
+        return text
+
     async def _send_response(self, response_text: str):
         """发送响应到客户端"""
         try:
@@ -144,9 +241,15 @@ class AudioStreamManager:
         connection_id = id(websocket)
         print(f"新的音频连接: {connection_id}")
 
+        # 本连接上的工具调用按客户端 IP 定位
+        remote_address = getattr(websocket, "remote_address", None)
+        if remote_address:
+            client_ip.set(remote_address[0])
+
         # 创建音频处理器
         audio_processor = RealtimeAudioProcessor()
         audio_processor.websocket = websocket
+        audio_processor.partial_callback = self._create_partial_handler(connection_id)
 
         # 存储连接和处理器
         self.active_connections[connection_id] = websocket
@@ -156,7 +259,7 @@ class AudioStreamManager:
             # 开始处理音频流
             await audio_processor.start_listening(
                 websocket,
-                self._handle_recognized_text
+                lambda text: self._handle_recognized_text(text, connection_id)
             )
         except Exception as e:
             print(f"处理连接错误: {e}")
@@ -166,9 +269,18 @@ class AudioStreamManager:
                 del self.active_connections[connection_id]
             if connection_id in self.audio_processors:
                 del self.audio_processors[connection_id]
+            self._release_connection(connection_id)
             print(f"连接关闭: {connection_id}")
 
-    async def _handle_recognized_text(self, text: str) -> str:
+    def _create_partial_handler(self, connection_id) -> Optional[Callable]:
+        """创建部分识别结果处理函数，默认不处理"""
+        return None
+
+    def _release_connection(self, connection_id):
+        """释放连接相关资源"""
+        pass
+
+    async def _handle_recognized_text(self, text: str, connection_id=None) -> str:
         """处理识别到的文本"""
         # 这里可以集成现有的语音助手逻辑
         # 暂时返回简单响应
@@ -180,15 +292,17 @@ class AudioStreamManager:
         else:
             return f"您说: {text}。我听到了，但需要更多上下文来回答。"
 
-    async def broadcast_message(self, message: str):
-        """广播消息到所有连接"""
+    async def broadcast_message(self, message: str, targets: Optional[Iterable] = None, extra: Optional[dict] = None):
+        """发送通知消息，targets 为连接 id 列表，默认发送到所有连接"""
+        payload = json.dumps(dict({"type": "notification", "message": message}, **(extra or {})))
+        connection_ids = list(self.active_connections) if targets is None else list(targets)
         disconnected = []
-        for connection_id, websocket in self.active_connections.items():
+        for connection_id in connection_ids:
+            websocket = self.active_connections.get(connection_id)
+            if websocket is None:
+                continue
             try:
-                await websocket.send(json.dumps({
-                    "type": "notification",
-                    "message": message
-                }))
+                await websocket.send(payload)
             except websockets.exceptions.ConnectionClosed:
                 disconnected.append(connection_id)
 
@@ -206,12 +320,68 @@ class AssistantAudioManager(AudioStreamManager):
     def __init__(self, assistant):
         super().__init__()
         self.assistant = assistant
+        self.prefetchers = {}
+        self.reminders = self._create_reminder_scheduler()
+
+    def _create_reminder_scheduler(self) -> Optional[ReminderScheduler]:
+        """按日历工具的数据库和提醒提前量创建提醒调度器"""
+        if not settings.REMINDERS["enabled"]:
+            return None
+        spec = tool_registry.get_tool_spec(settings.REMINDERS["tool"])
+        if spec is None:
+            print(f"未找到 {settings.REMINDERS['tool']}，日程提醒未启用")
+            return None
+        config = spec.config or {}
+        scheduler = ReminderScheduler(
+            self._send_reminder,
+            CalendarStore(config.get("database", "calendar.db")),
+            lead_minutes=config.get("default_reminder_minutes", 15),
+            horizon=settings.REMINDERS["horizon"],
+            poll_interval=settings.REMINDERS["poll_interval"]
+        )
+        tool_executor.add_event_listener(scheduler.on_events)
+        return scheduler
 
-    async def _handle_recognized_text(self, text: str) -> str:
+    async def handle_connection(self, websocket, path):
+        """第一个连接建立时在当前事件循环中启动提醒调度"""
+        if self.reminders:
+            self.reminders.start()
+        await super().handle_connection(websocket, path)
+
+    async def _send_reminder(self, reminder: Dict[str, Any]):
+        """把到期的日程提醒推送到在线的语音会话"""
+        if not self.active_connections:
+            print(f"没有在线会话，日程提醒未送达: {reminder.get('title', '')}")
+            return
+        await self.broadcast_message(format_reminder(reminder), extra={
+            "category": "reminder",
+            "event": {key: reminder.get(key) for key in ("date", "time", "title")}
+        })
+
+    def _create_partial_handler(self, connection_id) -> Optional[Callable]:
+        """启用推测预取时，为连接创建预取器"""
+        if not settings.SPECULATIVE_PREFETCH["enabled"]:
+            return None
+        prefetcher = SpeculativePrefetcher()
+        self.prefetchers[connection_id] = prefetcher
+        return prefetcher.on_partial
+
+    def _release_connection(self, connection_id):
+        """取消连接上未完成的推测"""
+        prefetcher = self.prefetchers.pop(connection_id, None)
+        if prefetcher:
+            prefetcher.cancel_all()
+
+    async def _handle_recognized_text(self, text: str, connection_id=None) -> str:
         """使用语音助手处理识别到的文本"""
         try:
+            # 最终识别结果确认或取消推测
+            prefetcher = self.prefetchers.get(connection_id)
+            if prefetcher:
+                prefetcher.resolve(text)
+
             # 使用语音助手处理文本
-            response = self.assistant.process_text(text)
+            response = await self.assistant.process_text(text, prefetcher=prefetcher)
             print(f"助手响应: {response}")
             return response
         except Exception as e:
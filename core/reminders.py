@@ -0,0 +1,244 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from tools.calendar_store import CalendarStore
+
+# 事件 -> (提醒时刻, 提醒内容)
+Schedule = Dict[Hashable, Tuple[float, Dict[str, Any]]]
+
+
+def event_start(event: Dict[str, Any]) -> Optional[datetime]:
+    """事件开始时刻；time 可能是 "HH:MM" 或 "HH:MM-HH:MM" """
+    try:
+        return datetime.strptime(f"{event['date']} {(event.get('time') or '')[:5]}", "%Y-%m-%d %H:%M")
+    except ValueError:
+        return None
+
+
+def load_schedule(store: CalendarStore, now: float, until: float, lead_minutes: int) -> Schedule:
+    """读取在 (now, until] 内需要提醒的事件（含展开的重复事件）
+
+    提醒时刻可能早于 now（已经进入提醒时段但尚未开始），这类提醒会立即触发。
+    """
+    start, end = datetime.fromtimestamp(now), datetime.fromtimestamp(until + lead_minutes * 60)
+    schedule = {}
+    for event in store.between(start.date().isoformat(), end.date().isoformat()):
+        begin = event_start(event)
+        if begin is None:
+            continue
+        begin_at = begin.timestamp()
+        fire_at = begin_at - lead_minutes * 60
+        if begin_at < now or fire_at > until:
+            continue
+        key = ("series", event["series_id"], event["date"]) if event.get("series_id") else ("event", event["id"])
+        schedule[key] = (fire_at, dict(event, starts_at=begin_at))
+    return schedule
+
+
+class ReminderScheduler:
+    """日历提醒调度器
+
+    提醒保存在按触发时刻排序的最小堆中，只为堆顶设置一个 loop.call_at 定时器，
+    不轮询提醒；添加和取消都是 O(log n)，取消采用惰性删除（堆中的旧条目在弹出时跳过，
+    失效条目过多时重建堆）。只加载未来 horizon 秒内的事件，到期后再加载下一段；
+    日历变化时重新读取窗口并按差异增删提醒：本进程的写入通过 calendar.changed 事件立即得知；
+    触发提醒前先核对数据版本号，其他进程删除或改期的事件不会误提醒；其他进程新增的事件
+    由间隔较长的 poll_interval 版本号检查兜底发现（只读一行 meta，提前量内添加的事件可能晚到）。
+    """
+
+    def __init__(self, notify: Callable[[Dict[str, Any]], Awaitable[None]],
+                 store: Optional[CalendarStore] = None, lead_minutes: int = 15, horizon: float = 86400,
+                 poll_interval: float = 60.0):
+        self.notify = notify
+        self.store = store
+        self.lead_minutes = lead_minutes
+        self.horizon = horizon
+        self.poll_interval = poll_interval
+        self._heap: List[Tuple[float, int, Hashable, Dict[str, Any]]] = []
+        self._scheduled: Dict[Hashable, float] = {}
+        self._fired: Dict[Hashable, float] = {}
+        self._seq = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_at: Optional[float] = None
+        self._refill_timer: Optional[asyncio.TimerHandle] = None
+        self._poll_timer: Optional[asyncio.TimerHandle] = None
+        self._store_version: Optional[int] = None
+        self._reload_pending = False
+        self.stats = {"scheduled": 0, "cancelled": 0, "fired": 0, "reloads": 0}
+
+    def start(self):
+        """在当前事件循环中启动（重复调用无效）"""
+        if self._loop is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        if self.store is not None:
+            self._request_reload()
+            self._schedule_poll()
+
+    def stop(self):
+        for handle in (self._timer, self._refill_timer, self._poll_timer):
+            if handle:
+                handle.cancel()
+        self._timer = self._refill_timer = self._poll_timer = None
+        self._timer_at = None
+        self._loop = None
+
+    def __len__(self) -> int:
+        return len(self._scheduled)
+
+    # ---- 堆操作 ----
+
+    def schedule(self, key: Hashable, fire_at: float, reminder: Dict[str, Any]):
+        """添加或改期提醒（fire_at 为 Unix 时间戳）"""
+        if self._scheduled.get(key) == fire_at:
+            return
+        self._scheduled[key] = fire_at
+        heapq.heappush(self._heap, (fire_at, next(self._seq), key, reminder))
+        self.stats["scheduled"] += 1
+        self._arm()
+
+    def cancel(self, key: Hashable):
+        """取消提醒；堆中的条目留到弹出时丢弃"""
+        if self._scheduled.pop(key, None) is None:
+            return
+        self.stats["cancelled"] += 1
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._scheduled):
+            self._heap = [entry for entry in self._heap if self._scheduled.get(entry[2]) == entry[0]]
+            heapq.heapify(self._heap)
+        self._arm()
+
+    def _live(self, entry) -> bool:
+        return self._scheduled.get(entry[2]) == entry[0]
+
+    def _arm(self):
+        """让定时器指向堆顶的提醒"""
+        while self._heap and not self._live(self._heap[0]):
+            heapq.heappop(self._heap)
+        if self._loop is None:
+            return
+        fire_at = self._heap[0][0] if self._heap else None
+        if fire_at == self._timer_at:
+            return
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        self._timer_at = fire_at
+        if fire_at is not None:
+            self._timer = self._loop.call_at(self._loop.time() + max(0.0, fire_at - time.time()), self._fire)
+
+    def _fire(self):
+        self._timer = self._timer_at = None
+        self._loop.create_task(self._fire_due())
+
+    async def _fire_due(self):
+        """触发到期的提醒；日历被其他进程改过时先重新加载"""
+        if self.store is not None:
+            try:
+                if await asyncio.to_thread(self.store.version) != self._store_version:
+                    await self._reload()
+            except Exception as e:
+                print(f"检查日历版本失败: {str(e)}")
+        if self._loop is None:
+            return
+        now = time.time()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            if self._live(entry):
+                fire_at, _, key, reminder = entry
+                del self._scheduled[key]
+                self._fired[key] = fire_at
+                due.append(reminder)
+        for reminder in due:
+            self.stats["fired"] += 1
+            self._loop.create_task(self._notify(reminder))
+        self._arm()
+
+    async def _notify(self, reminder: Dict[str, Any]):
+        try:
+            await self.notify(reminder)
+        except Exception as e:
+            print(f"发送日程提醒失败: {str(e)}")
+
+    # ---- 从日历加载 ----
+
+    def on_events(self, events: Iterable[str]):
+        """工具事件监听：日历变化时重新加载（可在任意线程调用）"""
+        if "calendar.changed" in events and self._loop is not None and self.store is not None:
+            self._loop.call_soon_threadsafe(self._request_reload)
+
+    def _request_reload(self):
+        """合并短时间内的多次变化，同一时刻只进行一次加载"""
+        if self._reload_pending or self._loop is None:
+            return
+        self._reload_pending = True
+        self._loop.create_task(self._reload())
+
+    def _schedule_poll(self):
+        if self._loop is not None and self.poll_interval:
+            self._poll_timer = self._loop.call_later(self.poll_interval, self._poll)
+
+    def _poll(self):
+        self._poll_timer = None
+        self._loop.create_task(self._check_version())
+
+    async def _check_version(self):
+        """数据版本号变化（包括其他进程的写入）时重新加载"""
+        try:
+            version = await asyncio.to_thread(self.store.version)
+            if version != self._store_version:
+                self._request_reload()
+        except Exception as e:
+            print(f"检查日历版本失败: {str(e)}")
+        finally:
+            self._schedule_poll()
+
+    def _load(self, now: float, until: float) -> Tuple[int, Schedule]:
+        # 先读版本号，加载期间的写入会在下次检查时再次触发加载
+        version = self.store.version()
+        return version, load_schedule(self.store, now, until, self.lead_minutes)
+
+    async def _reload(self):
+        self._reload_pending = False
+        now = time.time()
+        until = now + self.horizon
+        try:
+            version, schedule = await asyncio.to_thread(self._load, now, until)
+        except Exception as e:
+            print(f"加载日程提醒失败: {str(e)}")
+            return
+        if self._loop is None:
+            return
+        self._store_version = version
+        self.stats["reloads"] += 1
+        self._apply(schedule)
+
+        if self._refill_timer:
+            self._refill_timer.cancel()
+        self._refill_timer = self._loop.call_at(self._loop.time() + self.horizon, self._request_reload)
+
+    def _apply(self, schedule: Schedule):
+        """按差异更新提醒：已删除的取消，新增或改期的加入，已经提醒过的不再提醒"""
+        for key in [key for key in self._scheduled if key not in schedule]:
+            self.cancel(key)
+        for key, (fire_at, reminder) in schedule.items():
+            if self._fired.get(key) != fire_at:
+                self.schedule(key, fire_at, reminder)
+
+        # 只保留仍在窗口中的已提醒记录
+        self._fired = {key: fire_at for key, fire_at in self._fired.items() if key in schedule}
+
+
+def format_reminder(reminder: Dict[str, Any]) -> str:
+    """提醒消息文本"""
+    minutes = math.ceil((reminder["starts_at"] - time.time()) / 60)
+    when = "现在开始" if minutes <= 0 else f"{minutes}分钟后开始"
+    day = date.fromisoformat(reminder["date"])
+    prefix = "" if day == date.today() else ("明天 " if day == date.today() + timedelta(days=1) else f"{day} ")
+    return f"日程提醒：{prefix}{reminder.get('time', '')} {reminder.get('title', '')}（{when}）"
@@ -0,0 +1,164 @@
+import asyncio
+import contextvars
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from config.settings import settings
+from .intent import detect_intent, intent_to_tool
+from .tool_executor import tool_executor
+from .tool_registry import tool_registry
+
+
+class SpeculationStats:
+    """推测执行统计（所有会话共享）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.cancelled = 0
+        self.saved_seconds = 0.0
+        self.wasted_seconds = 0.0
+        self.partial_asr_seconds = 0.0
+
+    def add(self, **deltas):
+        with self._lock:
+            for key, value in deltas.items():
+                setattr(self, key, getattr(self, key) + value)
+
+    def snapshot(self) -> Dict[str, float]:
+        """获取统计快照"""
+        with self._lock:
+            return {
+                "started": self.started,
+                "hits": self.hits,
+                "misses": self.misses,
+                "cancelled": self.cancelled,
+                "hit_rate": self.hits / self.started if self.started else 0.0,
+                "saved_seconds": round(self.saved_seconds, 3),
+                "wasted_seconds": round(self.wasted_seconds, 3),
+                "partial_asr_seconds": round(self.partial_asr_seconds, 3)
+            }
+
+
+speculation_stats = SpeculationStats()
+
+
+class _Speculation:
+    """一次推测执行的工具调用"""
+
+    def __init__(self, tool_name: str, text: str):
+        self.tool_name = tool_name
+        self.text = text
+        self.future: Optional[asyncio.Future] = None
+        self.compute_time = 0.0
+        self.finished = False
+        self.discarded = False
+        self.lock = threading.Lock()
+
+    def run(self, stats: SpeculationStats):
+        start = time.perf_counter()
+        try:
+            return tool_executor.run(self.tool_name, self.text)
+        finally:
+            with self.lock:
+                self.compute_time = time.perf_counter() - start
+                self.finished = True
+                if self.discarded:
+                    stats.add(wasted_seconds=self.compute_time)
+
+    def discard(self, stats: SpeculationStats):
+        """丢弃结果；线程中的工具无法中断，完成后计入浪费的计算量"""
+        with self.lock:
+            self.discarded = True
+            if self.finished:
+                stats.add(wasted_seconds=self.compute_time)
+        if self.future and not self.future.done():
+            self.future.cancel()
+
+
+class SpeculativePrefetcher:
+    """基于部分识别结果的工具推测预取（每个会话一个实例）
+
+    在流式识别过程中对部分文本做意图检测，提前执行幂等只读工具；
+    最终识别结果确认意图后复用结果，否则取消。
+    """
+
+    def __init__(self, stats: SpeculationStats = speculation_stats):
+        config = settings.SPECULATIVE_PREFETCH
+        self.allowed_tools = set(config["tools"])
+        self.max_pending = config["max_pending"]
+        self.stats = stats
+        self._pending: Dict[Tuple[str, str], _Speculation] = {}
+
+    def _resolve_key(self, text: str) -> Optional[Tuple[str, str]]:
+        tool_name = intent_to_tool(detect_intent(text))
+        if tool_name not in self.allowed_tools:
+            return None
+        tool_class = tool_registry.get_tool_class(tool_name)
+        if not tool_class:
+            return None
+        key = tool_class.speculation_key(text)
+        if key is None:
+            return None
+        return tool_name, key
+
+    async def on_partial(self, text: str):
+        """处理部分识别结果"""
+        key = self._resolve_key(text)
+        if key is None or key in self._pending:
+            return
+
+        # 超出并发上限时丢弃最早的推测
+        while len(self._pending) >= self.max_pending:
+            oldest = next(iter(self._pending))
+            self._discard(oldest)
+
+        speculation = _Speculation(key[0], text)
+        loop = asyncio.get_running_loop()
+        # run_in_executor 不会复制上下文（如客户端 IP），需要显式带上
+        context = contextvars.copy_context()
+        speculation.future = loop.run_in_executor(None, context.run, speculation.run, self.stats)
+        self._pending[key] = speculation
+        self.stats.add(started=1)
+        print(f"推测执行 {key[0]}({key[1]})")
+
+    def _discard(self, key: Tuple[str, str]):
+        speculation = self._pending.pop(key)
+        speculation.discard(self.stats)
+        self.stats.add(cancelled=1)
+
+    def resolve(self, final_text: str):
+        """最终识别结果到达后，取消与其意图不一致的推测"""
+        final_key = self._resolve_key(final_text)
+        for key in list(self._pending):
+            if key != final_key:
+                self._discard(key)
+
+    async def take(self, tool_name: str, text: str) -> Optional[str]:
+        """获取与最终文本匹配的推测结果，未命中返回 None"""
+        key = self._resolve_key(text)
+        if key is None or key[0] != tool_name:
+            return None
+
+        speculation = self._pending.pop(key, None)
+        if speculation is None:
+            self.stats.add(misses=1)
+            return None
+
+        waited = time.perf_counter()
+        try:
+            result = await speculation.future
+        except Exception:
+            self.stats.add(misses=1)
+            return None
+        waited = time.perf_counter() - waited
+        self.stats.add(hits=1, saved_seconds=max(speculation.compute_time - waited, 0.0))
+        return result
+
+    def cancel_all(self):
+        """取消所有未完成的推测"""
+        for key in list(self._pending):
+            self._discard(key)
@@ -1,16 +1,17 @@
-import whisper
 import sounddevice as sd
 import tempfile
 import scipy.io.wavfile
 
 from config.settings import settings
+from .asr_backend import get_asr_backend
+from .audio_capture import AudioSource, StreamingRecorder, create_audio_source
 
 
 class SpeechUtils:
     """语音处理工具类"""
 
     def __init__(self):
-        self.whisper_model = whisper.load_model(settings.WHISPER_MODEL)
+        self.asr_backend = get_asr_backend()
         self.sample_rate = settings.SAMPLE_RATE
 
     def record_audio(self, duration: int = None) -> str:
@@ -33,11 +34,25 @@ class SpeechUtils:
         scipy.io.wavfile.write(temp_file.name, self.sample_rate, audio)
         return temp_file.name
 
+    def record_utterance(self, source: AudioSource = None) -> str:
+        """流式录音，检测到语音结束后立即返回"""
+        config = settings.VOICE_CAPTURE
+        if source is None:
+            source = create_audio_source(config, self.sample_rate)
+
+        print("开始录音...（说完后自动结束）")
+        recorder = StreamingRecorder(self.sample_rate, config)
+        audio = recorder.record(source)
+        print(f"录音结束（{len(audio) / self.sample_rate:.1f}秒）")
+
+        temp_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
+        scipy.io.wavfile.write(temp_file.name, self.sample_rate, audio)
+        return temp_file.name
+
     def speech_to_text(self, audio_path: str) -> str:
         """语音转文本"""
         try:
-            result = self.whisper_model.transcribe(audio_path, fp16=False, language="zh")
-            return result["text"].strip()
+            return self.asr_backend.transcribe(audio_path)
         except Exception as e:
             print(f"语音识别错误: {e}")
             return ""
\ No newline at end of file
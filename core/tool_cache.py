@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Iterable, Optional, Tuple
+
+
+class _ToolCacheEntries:
+    """单个工具的 LRU + TTL 缓存"""
+
+    def __init__(self, policy: Dict[str, Any]):
+        self.ttl = policy.get("ttl", 60)
+        self.max_entries = policy.get("max_entries", 128)
+        self.invalidate_on = set(policy.get("invalidate_on", []))
+        self.entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.generation = 0  # 每次失效加一，避免失效前开始的计算写回旧结果
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, key: str) -> Optional[str]:
+        item = self.entries.get(key)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                del self.entries[key]
+            self.stats["misses"] += 1
+            return None
+        self.entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return item[1]
+
+    def put(self, key: str, value: str):
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def clear(self):
+        self.generation += 1
+        if self.entries:
+            self.entries.clear()
+            self.stats["invalidations"] += 1
+
+
+class ToolResultCache:
+    """工具结果缓存层
+
+    缓存策略在 tools_config.json 的 cache 中按工具声明：
+    ttl（秒）、max_entries 以及 invalidate_on（使缓存失效的事件名）。
+    工具通过 BaseAssistantTool.emit 发出事件，例如日历写入后发出 calendar.changed。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._caches: Dict[str, _ToolCacheEntries] = {}
+
+    def configure(self, name: str, policy: Optional[Dict[str, Any]]):
+        """设置工具的缓存策略（策略变化时清空旧缓存）"""
+        with self._lock:
+            if policy:
+                self._caches[name] = _ToolCacheEntries(policy)
+            else:
+                self._caches.pop(name, None)
+
+    def call(self, name: str, key: Optional[str], compute: Callable[[], Tuple[str, bool]]) -> str:
+        """缓存包装：命中直接返回，否则调用 compute 并缓存成功的结果
+
+        compute 返回 (结果, 是否可缓存)，执行失败的结果不缓存。
+        """
+        cache = self._caches.get(name)
+        if cache is None or key is None:
+            return compute()[0]
+
+        with self._lock:
+            cached = cache.get(key)
+            generation = cache.generation
+        if cached is not None:
+            return cached
+
+        result, cacheable = compute()
+        if cacheable:
+            with self._lock:
+                if cache.generation == generation:
+                    cache.put(key, result)
+        return result
+
+    def publish(self, events: Iterable[str]):
+        """处理工具发出的事件，清空声明了该事件的工具缓存"""
+        events = set(events)
+        if not events:
+            return
+        with self._lock:
+            for cache in self._caches.values():
+                if cache.invalidate_on & events:
+                    cache.clear()
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """各工具的缓存统计"""
+        with self._lock:
+            return {
+                name: dict(cache.stats, entries=len(cache.entries))
+                for name, cache in self._caches.items()
+            }
+
+
+# 全局工具结果缓存实例
+tool_cache = ToolResultCache()
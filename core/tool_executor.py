@@ -0,0 +1,245 @@
+import asyncio
+import atexit
+import multiprocessing
+import threading
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+from config.settings import settings
+from tools.base_tool import ToolError
+from .tool_cache import tool_cache
+from .tool_registry import tool_registry, ToolSpec
+from .tool_worker import worker_main
+
+_mp_context = multiprocessing.get_context("spawn")
+
+
+class _Worker:
+    """一个工具工作进程"""
+
+    def __init__(self, memory_limit_mb: int):
+        self.conn, child_conn = _mp_context.Pipe()
+        self.process = _mp_context.Process(
+            target=worker_main,
+            args=(child_conn, memory_limit_mb),
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        """强制结束进程"""
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=1)
+        self.conn.close()
+
+    def close(self):
+        """正常退出进程"""
+        try:
+            self.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(timeout=1)
+        self.kill()
+
+
+class ToolWorkerPool:
+    """单个工具的工作进程池，限制并发数、排队长度、超时和内存"""
+
+    def __init__(self, name: str, limits: Dict[str, Any]):
+        self.name = name
+        self.max_concurrency = limits["max_concurrency"]
+        self.queue_size = limits["queue_size"]
+        self.timeout = limits["timeout"]
+        self.memory_limit_mb = limits["memory_limit_mb"]
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self._idle: List[_Worker] = []
+        self._workers = 0
+        self._waiting = 0
+        self._closed = False
+        self.stats = {"calls": 0, "rejected": 0, "timeouts": 0, "restarts": 0, "errors": 0}
+
+    def _checkout(self) -> _Worker:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+            self._workers += 1
+        try:
+            return _Worker(self.memory_limit_mb)
+        except Exception:
+            with self._lock:
+                self._workers -= 1
+            raise
+
+    def _checkin(self, worker: _Worker):
+        with self._lock:
+            if not self._closed:
+                self._idle.append(worker)
+                return
+        worker.close()
+
+    def _discard(self, worker: _Worker):
+        """结束出问题的进程并在后台补充一个新进程，不影响其他调用"""
+        worker.kill()
+        with self._lock:
+            self._workers -= 1
+            self.stats["restarts"] += 1
+            if self._closed:
+                return
+        threading.Thread(target=self._prestart, daemon=True).start()
+
+    def _prestart(self):
+        try:
+            self._checkin(self._checkout())
+        except Exception as e:
+            print(f"启动 {self.name} 工作进程失败: {str(e)}")
+
+    def run(self, spec: ToolSpec, query: str) -> Tuple[str, bool, List[str]]:
+        """在工作进程中执行工具（阻塞），返回 (结果, 是否可缓存, 工具发出的事件)"""
+        with self._lock:
+            if self._waiting >= self.queue_size:
+                self.stats["rejected"] += 1
+                return f"{self.name} 当前请求过多，请稍后再试", False, []
+            self._waiting += 1
+
+        self._slots.acquire()
+        with self._lock:
+            self._waiting -= 1
+            self.stats["calls"] += 1
+
+        try:
+            worker = self._checkout()
+            try:
+                worker.conn.send((spec.name, spec.class_path, spec.config, query))
+                if not worker.conn.poll(self.timeout):
+                    self.stats["timeouts"] += 1
+                    self._discard(worker)
+                    return f"执行{self.name}超时（{self.timeout}秒）", False, []
+                status, result, events = worker.conn.recv()
+            except (EOFError, OSError, BrokenPipeError):
+                # 进程异常退出（如超出内存限制被杀死）
+                self.stats["errors"] += 1
+                self._discard(worker)
+                return f"执行{self.name}时工作进程异常退出", False, []
+
+            self._checkin(worker)
+            if status == "error":
+                self.stats["errors"] += 1
+                return f"执行{self.name} 时出错：{result}", False, events
+            return result, status == "ok", events
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        """关闭所有空闲进程，正在执行的进程在归还时关闭"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.close()
+
+
+class ToolExecutor:
+    """工具执行后端：在主进程内执行，或在隔离的工作进程池中执行"""
+
+    def __init__(self):
+        self.backend = settings.TOOL_EXECUTION["backend"]
+        self.defaults = settings.TOOL_EXECUTION["defaults"]
+        self._pools: Dict[str, ToolWorkerPool] = {}
+        self._lock = threading.Lock()
+        self._event_listeners: List[Callable[[List[str]], None]] = []
+        for spec in tool_registry.snapshot().specs.values():
+            tool_cache.configure(spec.name, spec.cache)
+        tool_registry.add_listener(self._on_tools_changed)
+
+    def add_event_listener(self, callback: Callable[[List[str]], None]):
+        """注册工具事件监听者（如日历变化后重新安排提醒），在执行工具的线程中调用"""
+        with self._lock:
+            self._event_listeners = self._event_listeners + [callback]
+
+    def _limits(self, spec: ToolSpec) -> Dict[str, Any]:
+        return dict(self.defaults, **spec.execution)
+
+    def _pool(self, spec: ToolSpec) -> ToolWorkerPool:
+        pool = self._pools.get(spec.name)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(spec.name)
+                if pool is None:
+                    pool = ToolWorkerPool(spec.name, self._limits(spec))
+                    self._pools = dict(self._pools, **{spec.name: pool})
+        return pool
+
+    def _on_tools_changed(self, diff, snapshot):
+        """工具配置变化后重置缓存并关闭旧的进程池，下次调用按新配置创建"""
+        for name in diff.removed + diff.added + diff.changed:
+            spec = snapshot.specs.get(name)
+            tool_cache.configure(name, spec.cache if spec else None)
+
+        with self._lock:
+            pools = dict(self._pools)
+            stale = [pools.pop(name) for name in diff.removed + diff.changed if name in pools]
+            self._pools = pools
+        for pool in stale:
+            pool.shutdown()
+
+    def run(self, name: str, query: str) -> str:
+        """执行工具（阻塞），结果经过缓存层"""
+        spec = tool_registry.get_tool_spec(name)
+        # 只导入工具类计算缓存键，隔离执行的工具不在服务进程中实例化
+        tool_class = tool_registry.get_tool_class(name)
+        if not spec or not tool_class:
+            return f"抱歉，{name} 工具当前不可用"
+
+        key = tool_class.cache_key(query) if spec.cache else None
+        return tool_cache.call(name, key, lambda: self._execute(spec, query))
+
+    def _execute(self, spec: ToolSpec, query: str) -> Tuple[str, bool]:
+        """实际执行工具，并发布工具发出的事件；返回 (结果, 是否可缓存)"""
+        limits = self._limits(spec)
+        if self.backend != "process" or not limits["isolated"]:
+            tool = tool_registry.get_tool(spec.name)
+            if not tool:
+                return f"抱歉，{spec.name} 工具当前不可用", False
+            try:
+                result = tool.run(query)
+                ok = tool.drain_cacheable()
+            except ToolError as e:
+                tool.drain_cacheable()
+                result, ok = str(e), False
+            events = tool.drain_events()
+        else:
+            result, ok, events = self._pool(spec).run(spec, query)
+
+        tool_cache.publish(events)
+        if events:
+            for listener in self._event_listeners:
+                try:
+                    listener(events)
+                except Exception as e:
+                    print(f"通知工具事件失败: {str(e)}")
+        return result, ok
+
+    async def arun(self, name: str, query: str) -> str:
+        """执行工具（异步）"""
+        return await asyncio.to_thread(self.run, name, query)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """各工具进程池和缓存的统计"""
+        return {
+            "pools": {name: dict(pool.stats) for name, pool in self._pools.items()},
+            "cache": tool_cache.get_stats()
+        }
+
+    def shutdown(self):
+        """关闭所有工作进程"""
+        with self._lock:
+            pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            pool.shutdown()
+
+
+# 全局工具执行器实例
+tool_executor = ToolExecutor()
+atexit.register(tool_executor.shutdown)
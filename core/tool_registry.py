@@ -1,46 +1,238 @@
 import importlib
 import json
 import os
-from typing import Dict, Type, Any
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+from typing import Dict, Type, Any, List, Optional, Callable, Mapping
 from tools.base_tool import BaseAssistantTool
-from config import settings
+from config.settings import settings
+
+# 工具配置文件（读写使用同一路径）
+TOOLS_CONFIG_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), '../config/tools_config.json'))
+
+
+@dataclass(frozen=True)
+class ToolSpec:
+    """工具配置（不可变）"""
+    name: str
+    class_path: str
+    enabled: bool = True
+    config: Dict[str, Any] = field(default_factory=dict, compare=True, hash=False)
+    description: str = ""
+    execution: Dict[str, Any] = field(default_factory=dict, compare=True, hash=False)
+    cache: Dict[str, Any] = field(default_factory=dict, compare=True, hash=False)
+
+
+@dataclass
+class ToolDiff:
+    """两次配置之间的差异"""
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def merge(self, other: "ToolDiff") -> "ToolDiff":
+        return ToolDiff(self.added + other.added, self.removed + other.removed, self.changed + other.changed)
+
+
+class _ToolSlot:
+    """已启用工具的占位，首次使用时才导入工具类并创建实例
+
+    配置未变化的工具在新快照中复用同一个占位。锁只在首次实例化时使用，
+    实例创建后读取无需加锁。
+    """
+
+    def __init__(self, spec: ToolSpec):
+        self.spec = spec
+        self.instance: Optional[BaseAssistantTool] = None
+        self.tool_class: Optional[Type[BaseAssistantTool]] = None
+        self.failed = False
+        self._lock = threading.Lock()
+
+    def get_class(self) -> Optional[Type[BaseAssistantTool]]:
+        """只导入工具类，不创建实例"""
+        if self.tool_class is None and not self.failed:
+            try:
+                self.tool_class = resolve_tool_class(self.spec.class_path)
+            except Exception as e:
+                self.failed = True
+                print(f"导入工具 '{self.spec.name}' 失败: {str(e)}")
+        return self.tool_class
+
+    def get(self) -> Optional[BaseAssistantTool]:
+        if self.instance is not None or self.failed:
+            return self.instance
+
+        with self._lock:
+            if self.instance is None and not self.failed:
+                try:
+                    tool_class = self.get_class()
+                    if tool_class is None:
+                        return None
+                    instance = tool_class(name=self.spec.name, config=self.spec.config)
+                    if not instance.description:
+                        instance.description = self.spec.description
+                    self.instance = instance
+                    print(f"工具 '{self.spec.name}' 已实例化")
+                except Exception as e:
+                    self.failed = True
+                    print(f"实例化工具 '{self.spec.name}' 失败: {str(e)}")
+        return self.instance
+
+
+def resolve_tool_class(class_path: str) -> Type[BaseAssistantTool]:
+    """动态导入工具类"""
+    module_name, class_name = class_path.rsplit('.', 1)
+    module = importlib.import_module(module_name)
+    tool_class = getattr(module, class_name)
+
+    if not issubclass(tool_class, BaseAssistantTool):
+        raise TypeError(f"注册的工具类必须继承自 BaseAssistantTool: {class_path}")
+    return tool_class
+
+
+@dataclass(frozen=True)
+class RegistrySnapshot:
+    """注册表的不可变快照，整体原子替换"""
+    version: int
+    specs: Mapping[str, ToolSpec]
+    active_tools: Mapping[str, _ToolSlot]
+    config_mtime: float = 0.0
 
 
 class ToolRegistry:
-    """工具注册与管理类"""
+    """工具注册与管理类
+
+    启动时只读取配置，工具类在首次使用时才导入和实例化。
+    所有状态保存在不可变快照中：读取方只读取当前快照的引用，不加锁；
+    修改方在写锁内基于旧快照构建新快照后原子替换，并通知监听者。
+    """
 
     _instance = None
-    _tools: Dict[str, Type[BaseAssistantTool]] = {}
-    _active_tools: Dict[str, BaseAssistantTool] = {}
 
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super(ToolRegistry, cls).__new__(cls)
-            cls._instance._load_tool_config()
+            instance = super(ToolRegistry, cls).__new__(cls)
+            instance._snapshot = RegistrySnapshot(0, MappingProxyType({}), MappingProxyType({}))
+            instance._write_lock = threading.RLock()
+            instance._listeners: List[Callable[[ToolDiff, RegistrySnapshot], None]] = []
+            instance._watcher = None
+            instance._load_tool_config()
+            cls._instance = instance
+            if settings.TOOL_REGISTRY["watch"]:
+                instance.start_watcher()
         return cls._instance
 
-    def _load_tool_config(self):
-        """从配置文件加载工具配置"""
-        config_path = os.path.join(os.path.dirname(__file__), '../config/tools_config.json')
+    # ---- 快照 ----
+
+    @property
+    def version(self) -> int:
+        """当前配置版本号，每次变更加一"""
+        return self._snapshot.version
+
+    def snapshot(self) -> RegistrySnapshot:
+        """获取当前快照"""
+        return self._snapshot
+
+    def debug_info(self) -> Dict[str, Any]:
+        """调试信息：版本号、配置文件修改时间及各工具状态"""
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version,
+            "config_path": TOOLS_CONFIG_PATH,
+            "config_mtime": snapshot.config_mtime,
+            "tools": {
+                name: {
+                    "class_path": spec.class_path,
+                    "enabled": spec.enabled,
+                    "instantiated": name in snapshot.active_tools and snapshot.active_tools[name].instance is not None
+                }
+                for name, spec in snapshot.specs.items()
+            }
+        }
+
+    def add_listener(self, callback: Callable[[ToolDiff, RegistrySnapshot], None]):
+        """注册配置变更监听者"""
+        with self._write_lock:
+            self._listeners = self._listeners + [callback]
+
+    def _commit(self, specs: Dict[str, ToolSpec], diff: ToolDiff, config_mtime: float = None) -> ToolDiff:
+        """基于新配置构建快照并原子替换（需持有写锁）"""
+        old = self._snapshot
+        active_tools = {}
+        for name, spec in specs.items():
+            if not spec.enabled:
+                continue
+            slot = old.active_tools.get(name)
+            active_tools[name] = slot if slot is not None and slot.spec == spec else _ToolSlot(spec)
+
+        if not diff and config_mtime is None:
+            return diff
+
+        self._snapshot = RegistrySnapshot(
+            version=old.version + 1 if diff else old.version,
+            specs=MappingProxyType(dict(specs)),
+            active_tools=MappingProxyType(active_tools),
+            config_mtime=old.config_mtime if config_mtime is None else config_mtime
+        )
+        if diff:
+            for listener in self._listeners:
+                try:
+                    listener(diff, self._snapshot)
+                except Exception as e:
+                    print(f"通知工具配置变更失败: {str(e)}")
+        return diff
+
+    # ---- 配置文件 ----
+
+    @staticmethod
+    def _config_mtime() -> float:
         try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                tool_configs = json.load(f)
-
-            for tool_config in tool_configs:
-                self.register_tool(
-                    tool_config["name"],
-                    tool_config["class_path"],
-                    enabled=tool_config.get("enabled", True),
-                    config=tool_config.get("config", {})
-                )
+            return os.stat(TOOLS_CONFIG_PATH).st_mtime
+        except OSError:
+            return 0.0
+
+    def _read_tool_configs(self) -> List[Dict[str, Any]]:
+        with open(TOOLS_CONFIG_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _read_tool_specs(self, strict: bool = False) -> Dict[str, ToolSpec]:
+        """读取配置文件中的工具配置，strict 为真时读取失败直接抛出异常"""
+        try:
+            tool_configs = self._read_tool_configs()
         except Exception as e:
+            if strict:
+                raise
             print(f"加载工具配置失败: {str(e)}")
             # 默认加载核心工具
-            self._load_default_tools()
+            tool_configs = self._default_tool_configs()
+
+        return {
+            tool_config["name"]: ToolSpec(
+                name=tool_config["name"],
+                class_path=tool_config["class_path"],
+                enabled=tool_config.get("enabled", True),
+                config=tool_config.get("config", {}),
+                description=tool_config.get("description", ""),
+                execution=tool_config.get("execution", {}),
+                cache=tool_config.get("cache", {})
+            )
+            for tool_config in tool_configs
+        }
 
-    def _load_default_tools(self):
-        """加载默认工具集"""
-        default_tools = [
+    def _load_tool_config(self):
+        """从配置文件加载工具配置"""
+        self.reload_config()
+
+    @staticmethod
+    def _default_tool_configs() -> List[Dict[str, Any]]:
+        """默认工具集"""
+        return [
             {
                 "name": "weather_tool",
                 "class_path": "tools.weather_tool.WeatherTool",
@@ -73,94 +265,135 @@ class ToolRegistry:
             }
         ]
 
-        for tool_config in default_tools:
-            self.register_tool(
-                tool_config["name"],
-                tool_config["class_path"],
-                enabled=tool_config.get("enabled", True)
-            )
+    def _diff(self, old: Mapping[str, ToolSpec], new: Mapping[str, ToolSpec]) -> ToolDiff:
+        diff = ToolDiff()
+        diff.removed = [name for name in old if name not in new]
+        for name, spec in new.items():
+            if name not in old:
+                diff.added.append(name)
+            elif old[name] != spec:
+                diff.changed.append(name)
+        return diff
 
-    def register_tool(self, name: str, class_path: str, enabled: bool = True, config: Dict[str, Any] = None):
-        """注册工具类"""
-        if name in self._tools:
-            print(f"警告: 工具 '{name}' 已注册，将被覆盖")
+    def _update_specs(self, updates: Dict[str, Optional[ToolSpec]]) -> ToolDiff:
+        """更新部分工具配置（None 表示移除）"""
+        with self._write_lock:
+            old_specs = self._snapshot.specs
+            new_specs = dict(old_specs)
+            for name, spec in updates.items():
+                if spec is None:
+                    new_specs.pop(name, None)
+                else:
+                    new_specs[name] = spec
+            return self._commit(new_specs, self._diff(old_specs, new_specs))
 
-        try:
-            # 动态导入工具类
-            module_name, class_name = class_path.rsplit('.', 1)
-            module = importlib.import_module(module_name)
-            tool_class = getattr(module, class_name)
-
-            if not issubclass(tool_class, BaseAssistantTool):
-                raise TypeError(f"注册的工具类必须继承自 BaseAssistantTool: {class_path}")
-
-            self._tools[name] = tool_class
-
-            # 如果启用，则创建实例
-            if enabled:
-                self._active_tools[name] = tool_class(name=name, config=config or {})
-                print(f"工具 '{name}' 已注册并启用")
-            else:
-                print(f"工具 '{name}' 已注册但未启用")
+    def register_tool(self, name: str, class_path: str, enabled: bool = True, config: Dict[str, Any] = None,
+                      description: str = "") -> ToolDiff:
+        """注册工具（不立即导入工具类）"""
+        existing = self._snapshot.specs.get(name)
+        if existing:
+            print(f"警告: 工具 '{name}' 已注册，将被覆盖")
 
-        except Exception as e:
-            print(f"注册工具 '{name}' 失败: {str(e)}")
+        spec = ToolSpec(
+            name, class_path, enabled, config or {},
+            description or (existing.description if existing else ""),
+            existing.execution if existing else {},
+            existing.cache if existing else {}
+        )
+        diff = self._update_specs({name: spec})
+        if diff:
+            print(f"工具 '{name}' 已注册{'并启用' if enabled else '但未启用'}")
+        return diff
 
-    def unregister_tool(self, name: str):
+    def unregister_tool(self, name: str) -> ToolDiff:
         """取消注册工具"""
-        if name in self._tools:
-            del self._tools[name]
-            if name in self._active_tools:
-                del self._active_tools[name]
-            print(f"工具 '{name}' 已取消注册")
-        else:
+        if name not in self._snapshot.specs:
             print(f"警告: 尝试取消注册未注册的工具 '{name}'")
+            return ToolDiff()
+
+        diff = self._update_specs({name: None})
+        print(f"工具 '{name}' 已取消注册")
+        return diff
+
+    def _set_enabled(self, name: str, enabled: bool) -> ToolDiff:
+        spec = self._snapshot.specs.get(name)
+        return self._update_specs({name: replace(spec, enabled=enabled)})
 
-    def enable_tool(self, name: str):
+    def enable_tool(self, name: str) -> ToolDiff:
         """启用工具"""
-        if name in self._tools:
-            if name not in self._active_tools:
-                tool_class = self._tools[name]
-                self._active_tools[name] = tool_class()
-                print(f"工具 '{name}' 已启用")
-            else:
-                print(f"工具 '{name}' 已经启用")
-        else:
+        snapshot = self._snapshot
+        if name not in snapshot.specs:
             print(f"警告: 尝试启用未注册的工具 '{name}'")
+            return ToolDiff()
+        if name in snapshot.active_tools:
+            print(f"工具 '{name}' 已经启用")
+            return ToolDiff()
+
+        diff = self._set_enabled(name, True)
+        print(f"工具 '{name}' 已启用")
+        return diff
 
-    def disable_tool(self, name: str):
+    def disable_tool(self, name: str) -> ToolDiff:
         """禁用工具"""
-        if name in self._active_tools:
-            del self._active_tools[name]
-            print(f"工具 '{name}' 已禁用")
-        else:
+        if name not in self._snapshot.active_tools:
             print(f"警告: 尝试禁用未启用的工具 '{name}'")
+            return ToolDiff()
+
+        diff = self._set_enabled(name, False)
+        print(f"工具 '{name}' 已禁用")
+        return diff
+
+    def get_tool(self, name: str) -> Optional[BaseAssistantTool]:
+        """获取工具实例，首次调用时创建"""
+        slot = self._snapshot.active_tools.get(name)
+        return slot.get() if slot else None
 
-    def get_tool(self, name: str) -> BaseAssistantTool:
-        """获取工具实例"""
-        return self._active_tools.get(name)
+    def get_tool_class(self, name: str) -> Optional[Type[BaseAssistantTool]]:
+        """获取已启用工具的类（不创建实例），用于计算缓存键和推测键"""
+        slot = self._snapshot.active_tools.get(name)
+        return slot.get_class() if slot else None
+
+    def get_tool_spec(self, name: str) -> Optional[ToolSpec]:
+        """获取工具配置"""
+        return self._snapshot.specs.get(name)
+
+    def get_enabled_specs(self) -> Dict[str, ToolSpec]:
+        """获取所有启用工具的配置（不触发实例化）"""
+        return {name: slot.spec for name, slot in self._snapshot.active_tools.items()}
 
     def get_all_tools(self) -> Dict[str, BaseAssistantTool]:
-        """获取所有启用的工具"""
-        return self._active_tools
+        """获取所有启用的工具（会实例化全部工具）"""
+        tools = {}
+        for name, slot in self._snapshot.active_tools.items():
+            instance = slot.get()
+            if instance is not None:
+                tools[name] = instance
+        return tools
 
-    def reload_config(self):
-        """重新加载工具配置"""
-        self._active_tools.clear()
-        self._load_tool_config()
+    def reload_config(self, strict: bool = False) -> ToolDiff:
+        """重新加载工具配置，只更新发生变化的工具"""
+        with self._write_lock:
+            config_mtime = self._config_mtime()
+            new_specs = self._read_tool_specs(strict)
+            diff = self._commit(new_specs, self._diff(self._snapshot.specs, new_specs), config_mtime)
 
-    def add_dynamic_tool(self, name: str, class_path: str, config: Dict[str, Any] = None, enable: bool = True):
+        if diff:
+            print(f"工具配置已更新（版本 {self.version}）: 新增 {diff.added}，移除 {diff.removed}，变更 {diff.changed}")
+        return diff
+
+    def add_dynamic_tool(self, name: str, class_path: str, config: Dict[str, Any] = None,
+                         enable: bool = True) -> ToolDiff:
         """动态添加新工具"""
-        self.register_tool(name, class_path, enabled=enable, config=config)
-        # 更新配置文件
-        self._update_config_file(name, class_path, config, enable)
+        with self._write_lock:
+            diff = self.register_tool(name, class_path, enabled=enable, config=config)
+            # 更新配置文件
+            self._update_config_file(name, class_path, config, enable)
+        return diff
 
     def _update_config_file(self, name: str, class_path: str, config: Dict[str, Any], enabled: bool):
-        """更新工具配置文件"""
-        config_path = os.path.join(os.path.dirname(__file__), '../../config/tools_config.json')
+        """更新工具配置文件（写临时文件后原子替换）"""
         try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                tool_configs = json.load(f)
+            tool_configs = self._read_tool_configs()
 
             # 检查是否已存在
             existing = next((t for t in tool_configs if t["name"] == name), None)
@@ -168,7 +401,7 @@ class ToolRegistry:
             if existing:
                 # 更新现有配置
                 existing["class_path"] = class_path
-                existing["config"] = config
+                existing["config"] = config or {}
                 existing["enabled"] = enabled
             else:
                 # 添加新配置
@@ -180,13 +413,63 @@ class ToolRegistry:
                 })
 
             # 写回文件
-            with open(config_path, 'w', encoding='utf-8') as f:
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(TOOLS_CONFIG_PATH), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
                 json.dump(tool_configs, f, indent=2, ensure_ascii=False)
+            os.replace(temp_path, TOOLS_CONFIG_PATH)
+
+            # 记录自身写入的修改时间，避免监听线程重复加载
+            with self._write_lock:
+                self._commit(dict(self._snapshot.specs), ToolDiff(), self._config_mtime())
 
             print(f"工具 '{name}' 配置已更新")
         except Exception as e:
             print(f"更新工具配置文件失败: {str(e)}")
 
+    # ---- 热加载 ----
+
+    def start_watcher(self, interval: float = None):
+        """启动配置文件监听线程"""
+        if self._watcher and self._watcher.is_alive():
+            return
+        self._watcher = ToolConfigWatcher(self, interval or settings.TOOL_REGISTRY["watch_interval"])
+        self._watcher.start()
+
+    def stop_watcher(self, wait: bool = False):
+        """停止配置文件监听线程；wait 为真时等待线程退出（如 fork 前）"""
+        if self._watcher:
+            self._watcher.stop()
+            if wait:
+                self._watcher.join()
+            self._watcher = None
+
+
+class ToolConfigWatcher(threading.Thread):
+    """轮询 tools_config.json 的修改时间，变化时热加载"""
+
+    def __init__(self, registry: ToolRegistry, interval: float):
+        super().__init__(name="tool-config-watcher", daemon=True)
+        self.registry = registry
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._failed_mtime = None
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            mtime = self.registry._config_mtime()
+            if mtime and mtime != self.registry.snapshot().config_mtime and mtime != self._failed_mtime:
+                # 等待写入方完成，避免读到写了一半的文件
+                time.sleep(0.05)
+                try:
+                    # 配置文件有误时保留当前快照
+                    self.registry.reload_config(strict=True)
+                except Exception as e:
+                    self._failed_mtime = mtime
+                    print(f"热加载工具配置失败，继续使用版本 {self.registry.version}: {str(e)}")
+
+    def stop(self):
+        self._stopped.set()
+
 
 # 全局工具注册表实例
-tool_registry = ToolRegistry()
\ No newline at end of file
+tool_registry = ToolRegistry()
@@ -0,0 +1,54 @@
+"""
+工具工作进程入口
+只依赖工具模块本身，避免在子进程中初始化注册表、模型等全局状态
+"""
+
+import importlib
+import json
+import resource
+
+from tools.base_tool import ToolError
+
+
+def _create_tool(name: str, class_path: str, config: dict):
+    module_name, class_name = class_path.rsplit('.', 1)
+    tool_class = getattr(importlib.import_module(module_name), class_name)
+    return tool_class(name=name, config=config)
+
+
+def worker_main(conn, memory_limit_mb: int):
+    """循环接收 (name, class_path, config, query)，返回 (status, result, events)
+
+    status 为 ok（可缓存）、uncached（成功但不缓存）、failed（工具报告的失败）或 error（异常）。
+    """
+    if memory_limit_mb:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    instances = {}
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+
+        name, class_path, config, query = message
+        key = (name, class_path, json.dumps(config, sort_keys=True, ensure_ascii=False))
+        try:
+            if key not in instances:
+                instances[key] = _create_tool(name, class_path, config)
+            tool = instances[key]
+            try:
+                result = tool.run(query)
+                status = "ok" if tool.drain_cacheable() else "uncached"
+            except ToolError as e:
+                tool.drain_cacheable()
+                result, status = str(e), "failed"
+            conn.send((status, result, tool.drain_events()))
+        except MemoryError:
+            instances.pop(key, None)
+            conn.send(("error", "内存超出限制", []))
+        except Exception as e:
+            conn.send(("error", str(e), []))
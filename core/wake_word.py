@@ -0,0 +1,220 @@
+import glob
+import os
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+import scipy.io.wavfile
+
+from config.settings import settings
+
+
+class MFCCExtractor:
+    """纯 NumPy 实现的 MFCC 特征提取"""
+
+    def __init__(self, sample_rate: int, n_mfcc: int = 13, n_mels: int = 26,
+                 frame_duration: float = 0.025, hop_duration: float = 0.01, n_fft: int = 512):
+        self.sample_rate = sample_rate
+        self.frame_length = int(frame_duration * sample_rate)
+        self.hop_length = int(hop_duration * sample_rate)
+        self.n_fft = n_fft
+        self.window = np.hamming(self.frame_length).astype(np.float32)
+        self.mel_filters = self._mel_filterbank(n_mels)
+        self.dct_matrix = self._dct_matrix(n_mfcc, n_mels)
+
+    @staticmethod
+    def _hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    @staticmethod
+    def _mel_to_hz(mel):
+        return 700.0 * (10 ** (mel / 2595.0) - 1.0)
+
+    def _mel_filterbank(self, n_mels: int) -> np.ndarray:
+        mel_points = np.linspace(self._hz_to_mel(0), self._hz_to_mel(self.sample_rate / 2), n_mels + 2)
+        bins = np.floor((self.n_fft + 1) * self._mel_to_hz(mel_points) / self.sample_rate).astype(int)
+        filters = np.zeros((n_mels, self.n_fft // 2 + 1), dtype=np.float32)
+        for m in range(1, n_mels + 1):
+            left, center, right = bins[m - 1], bins[m], bins[m + 1]
+            for k in range(left, center):
+                filters[m - 1, k] = (k - left) / max(center - left, 1)
+            for k in range(center, right):
+                filters[m - 1, k] = (right - k) / max(right - center, 1)
+        return filters
+
+    @staticmethod
+    def _dct_matrix(n_mfcc: int, n_mels: int) -> np.ndarray:
+        n = np.arange(n_mels)
+        k = np.arange(n_mfcc)[:, None]
+        return (np.cos(np.pi * k * (2 * n + 1) / (2 * n_mels)) * np.sqrt(2.0 / n_mels)).astype(np.float32)
+
+    def extract(self, audio: np.ndarray) -> np.ndarray:
+        """提取 MFCC，返回 (帧数, n_mfcc)，已做倒谱均值归一化"""
+        signal = audio.astype(np.float32) / 32768.0
+        signal = np.append(signal[0], signal[1:] - 0.97 * signal[:-1])
+        if len(signal) < self.frame_length:
+            signal = np.pad(signal, (0, self.frame_length - len(signal)))
+
+        n_frames = 1 + (len(signal) - self.frame_length) // self.hop_length
+        indices = np.arange(self.frame_length)[None, :] + self.hop_length * np.arange(n_frames)[:, None]
+        frames = signal[indices] * self.window
+
+        power = np.abs(np.fft.rfft(frames, self.n_fft)) ** 2 / self.n_fft
+        mel_energy = np.log(power @ self.mel_filters.T + 1e-10)
+        features = mel_energy @ self.dct_matrix.T
+        return features - features.mean(axis=0)
+
+
+def dtw_distance(a: np.ndarray, b: np.ndarray) -> float:
+    """两段特征序列的 DTW 距离（按路径长度归一化）"""
+    cost = np.sqrt(((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2))
+    n, m = cost.shape
+    previous = np.full(m + 1, np.inf)
+    previous[0] = 0.0
+    for i in range(n):
+        current = np.full(m + 1, np.inf)
+        # 先处理来自上一行的两个方向，再顺序处理同一行内的方向
+        candidates = cost[i] + np.minimum(previous[1:], previous[:-1])
+        for j in range(m):
+            current[j + 1] = min(candidates[j], cost[i, j] + current[j])
+        previous = current
+    return float(previous[m] / (n + m))
+
+
+class WakeWordStats:
+    """唤醒词统计（所有会话共享）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.wakes = 0
+        self.false_wakes = 0
+        self.gated_audio_seconds = 0.0  # 未送入 Whisper 的音频时长
+        self.gate_cpu_seconds = 0.0  # 唤醒词检测自身的耗时
+        self.asr_audio_seconds = 0.0
+        self.asr_cpu_seconds = 0.0
+
+    def add(self, **deltas):
+        with self._lock:
+            for key, value in deltas.items():
+                setattr(self, key, getattr(self, key) + value)
+
+    def snapshot(self) -> dict:
+        """获取统计快照，节省的 CPU 按实测 Whisper 实时率估算"""
+        with self._lock:
+            asr_rtf = self.asr_cpu_seconds / self.asr_audio_seconds if self.asr_audio_seconds else 0.0
+            estimated_asr = self.gated_audio_seconds * asr_rtf
+            return {
+                "wakes": self.wakes,
+                "false_wakes": self.false_wakes,
+                "gated_audio_seconds": round(self.gated_audio_seconds, 2),
+                "gate_cpu_seconds": round(self.gate_cpu_seconds, 3),
+                "asr_real_time_factor": round(asr_rtf, 3),
+                "cpu_saved_seconds": round(estimated_asr - self.gate_cpu_seconds, 3)
+            }
+
+
+wake_word_stats = WakeWordStats()
+
+_templates_cache = {}
+
+
+def load_templates(template_dir: str, extractor: MFCCExtractor) -> List[np.ndarray]:
+    """加载唤醒词模板录音并提取特征（进程内缓存）"""
+    if template_dir in _templates_cache:
+        return _templates_cache[template_dir]
+
+    templates = []
+    for path in sorted(glob.glob(os.path.join(template_dir, "*.wav"))):
+        rate, audio = scipy.io.wavfile.read(path)
+        if rate != extractor.sample_rate:
+            print(f"跳过唤醒词模板 {path}: 采样率 {rate} 不匹配")
+            continue
+        if audio.ndim > 1:
+            audio = audio[:, 0]
+        templates.append(extractor.extract(audio))
+
+    _templates_cache[template_dir] = templates
+    return templates
+
+
+class WakeWordDetector:
+    """基于 MFCC 模板匹配的低成本唤醒词检测（每个会话一个实例）"""
+
+    def __init__(self, sample_rate: int, config: dict = None, stats: WakeWordStats = wake_word_stats):
+        config = config or settings.WAKE_WORD
+        self.sample_rate = sample_rate
+        self.phrase = config["phrase"]
+        self.energy_threshold = config["energy_threshold"]
+        self.hop_samples = int(config["hop_duration"] * sample_rate)
+        # 灵敏度越高，允许的模板距离越大
+        sensitivity = min(max(config["sensitivity"], 0.0), 1.0)
+        self.threshold = config["min_distance"] + sensitivity * (config["max_distance"] - config["min_distance"])
+        self.stats = stats
+
+        self.extractor = MFCCExtractor(sample_rate)
+        self.templates = load_templates(config["template_dir"], self.extractor)
+        longest = max((len(t) for t in self.templates), default=0)
+        window_frames = int(longest * 1.2)
+        self.window_samples = window_frames * self.extractor.hop_length + self.extractor.frame_length
+        self.window = np.zeros(0, dtype=np.int16)
+        self.pending_samples = 0
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.templates)
+
+    def process(self, chunk: np.ndarray) -> bool:
+        """输入一段音频，返回是否检测到唤醒词"""
+        self.stats.add(gated_audio_seconds=len(chunk) / self.sample_rate)
+        self.window = np.concatenate([self.window, chunk])[-self.window_samples:]
+        self.pending_samples += len(chunk)
+        if self.pending_samples < self.hop_samples or len(self.window) < self.window_samples:
+            return False
+        self.pending_samples = 0
+
+        start = time.perf_counter()
+        try:
+            # 静音直接跳过，避免计算特征
+            samples = self.window.astype(np.float32)
+            if np.sqrt(np.mean(samples * samples)) < self.energy_threshold:
+                return False
+
+            features = self.extractor.extract(self.window)
+            distance = min(dtw_distance(features, template) for template in self.templates)
+            if distance <= self.threshold:
+                self.window = np.zeros(0, dtype=np.int16)
+                self.stats.add(wakes=1)
+                print(f"检测到唤醒词 '{self.phrase}'（距离 {distance:.2f}）")
+                return True
+            return False
+        finally:
+            self.stats.add(gate_cpu_seconds=time.perf_counter() - start)
+
+    def report_false_wake(self):
+        """唤醒后未识别到有效语音时调用"""
+        self.stats.add(false_wakes=1)
+
+    def strip_phrase(self, text: str) -> str:
+        """去除识别文本开头残留的唤醒词"""
+        return text[len(self.phrase):].lstrip("，,。 ") if text.startswith(self.phrase) else text
+
+
+def enroll(count: int = 3):
+    """录制唤醒词模板"""
+    from .audio_capture import StreamingRecorder, create_audio_source
+
+    config = settings.WAKE_WORD
+    os.makedirs(config["template_dir"], exist_ok=True)
+    recorder = StreamingRecorder(settings.SAMPLE_RATE, settings.VOICE_CAPTURE)
+    for index in range(count):
+        input(f"按回车后说出唤醒词 '{config['phrase']}'（{index + 1}/{count}）...")
+        source = create_audio_source(settings.VOICE_CAPTURE, settings.SAMPLE_RATE)
+        audio = recorder.record(source)
+        path = os.path.join(config["template_dir"], f"template_{int(time.time())}_{index}.wav")
+        scipy.io.wavfile.write(path, settings.SAMPLE_RATE, audio)
+        print(f"已保存模板: {path}")
+
+
+if __name__ == "__main__":
+    enroll()
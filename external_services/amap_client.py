@@ -0,0 +1,118 @@
+import asyncio
+import atexit
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Dict, Optional
+
+import httpx
+
+from config.settings import settings
+
+
+class AmapClient:
+    """高德接口异步客户端
+
+    所有请求共享一个 HTTP/1.1 keep-alive 连接池，连接池归属于一个后台事件循环线程；
+    其他事件循环中的调用会转交给该循环执行，同步调用方通过 run_sync 阻塞等待结果。
+    """
+
+    def __init__(self, timeout: float, limits: Dict[str, Any]):
+        self.timeout = timeout
+        self.limits = limits
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """按需启动后台事件循环线程"""
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=run, name="amap-client", daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """在后台事件循环中创建连接池"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http1=True,
+                http2=False,
+                timeout=httpx.Timeout(self.timeout, pool=self.limits.get("pool_timeout", self.timeout)),
+                limits=httpx.Limits(
+                    max_connections=self.limits.get("max_connections", 10),
+                    max_keepalive_connections=self.limits.get("max_keepalive_connections", 5),
+                    keepalive_expiry=self.limits.get("keepalive_expiry", 30.0)
+                )
+            )
+        return self._client
+
+    async def _request_json(self, url: str, params: Optional[Dict[str, Any]]) -> dict:
+        response = await self._get_client().get(url, params=params)
+        if response.status_code >= 500:
+            response.raise_for_status()
+        if response.status_code != 200:
+            return {}
+        return response.json()
+
+    async def get_json(self, url: str, params: Optional[Dict[str, Any]] = None) -> dict:
+        """请求高德接口，网络错误和 5xx 会抛出 httpx.HTTPError 以便重试"""
+        loop = self._ensure_loop()
+        if asyncio.get_running_loop() is loop:
+            return await self._request_json(url, params)
+        future = asyncio.run_coroutine_threadsafe(self._request_json(url, params), loop)
+        return await asyncio.wrap_future(future)
+
+    def run_sync(self, coro: Coroutine) -> Any:
+        """在后台事件循环中执行协程并阻塞等待结果（供同步调用方使用）"""
+        loop = self._ensure_loop()
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("不能在高德客户端的事件循环线程中同步等待请求")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def submit(self, coro: Coroutine) -> Future:
+        """在后台事件循环中启动协程（不等待结果）"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def get_json_sync(self, url: str, params: Optional[Dict[str, Any]] = None) -> dict:
+        """get_json 的同步版本"""
+        return self.run_sync(self.get_json(url, params))
+
+    async def _shutdown(self):
+        """取消后台任务（如热门城市刷新）并关闭连接池"""
+        for task in asyncio.all_tasks():
+            if task is not asyncio.current_task():
+                task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def close(self):
+        """关闭连接池并停止后台事件循环"""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(timeout=5)
+        loop.close()
+
+
+# 全局高德客户端实例
+amap_client = AmapClient(
+    timeout=settings.TOOL_CONFIG["weather"]["timeout"],
+    limits=settings.AMAP_CLIENT
+)
+atexit.register(amap_client.close)
@@ -1,39 +1,180 @@
-import json
+import asyncio
+import ipaddress
+import threading
+from contextvars import ContextVar
 from datetime import datetime
+from typing import List, Optional, Tuple
 
-import requests
+import httpx
 
 from config.settings import settings
+from external_services.amap_client import amap_client
+from external_services.resilience import get_service, CircuitOpenError
+from external_services.weather_cache import WeatherCache
 
+# 高德接口的熔断、重试与对冲请求
+amap_resilience = get_service("amap", retry_on=(httpx.HTTPError,))
 
-def getLocation() -> str:
-    url = "{}?key={}".format(settings.IP_LOCATION_API, settings.AMAP_API_KEY)
-    response = requests.get(url)
-    if response is None or response.status_code != 200:
+# 天气与 IP 定位缓存
+weather_cache = WeatherCache(settings.WEATHER_CACHE)
+
+# 当前请求的客户端 IP，由连接处理逻辑设置；为空时按服务端出口 IP 定位
+client_ip: ContextVar[str] = ContextVar("amap_client_ip", default="")
+
+_refresher_lock = threading.Lock()
+_refresher_started = False
+
+
+class WeatherUnavailable(Exception):
+    """未能获取天气数据，消息为给用户的提示"""
+
+
+def _public_ip(ip: Optional[str]) -> str:
+    """内网和回环地址无法被高德定位，统一按服务端出口 IP 处理"""
+    try:
+        return ip if ip and ipaddress.ip_address(ip).is_global else ""
+    except ValueError:
         return ""
 
-    result = json.loads(response.text)
-    return result['adcode']
 
+async def aget_location(ip: Optional[str] = None) -> str:
+    """根据客户端 IP 获取当前位置的 adcode，ip 为空时使用 client_ip"""
+    ip = _public_ip(client_ip.get() if ip is None else ip)
+    cached = weather_cache.get_location(ip)
+    if cached is not None:
+        return cached
 
-def getWeatherInfo(city_or_adcode: str) -> str:
-    url = "{}?key={}&city={}".format(settings.WEATHER_INFO_API, settings.AMAP_API_KEY, city_or_adcode)
+    params = {"key": settings.AMAP_API_KEY}
+    if ip:
+        params["ip"] = ip
+    try:
+        result = await amap_resilience.acall(amap_client.get_json, settings.IP_LOCATION_API, params)
+    except (CircuitOpenError, httpx.HTTPError) as e:
+        print(f"获取位置失败: {str(e)}")
+        return ""
 
+    # 定位失败时高德返回空列表
+    adcode = result.get('adcode', "")
+    if not isinstance(adcode, str) or not adcode:
+        return ""
+    weather_cache.put_location(ip, adcode)
+    return adcode
+
+
+async def _fetch_live(city_or_adcode: str) -> Optional[dict]:
+    """请求实况天气并写入缓存；服务不可用返回 None，城市无效返回空字典"""
+    params = {"key": settings.AMAP_API_KEY, "city": city_or_adcode}
+    result = await amap_resilience.acall(amap_client.get_json, settings.WEATHER_INFO_API, params)
+    if not result:
+        return None
+    lives = result.get('lives')
+    if not lives:
+        return {}
+    weather_cache.put_weather(city_or_adcode, lives[0])
+    return lives[0]
+
+
+async def _refresh_hot_cities():
+    """后台刷新即将过期的热门城市，使热门查询总能命中缓存"""
+    config = settings.WEATHER_CACHE
+    while True:
+        await asyncio.sleep(config["refresh_interval"])
+        for key in weather_cache.hot_keys(config["hot_cities"], config["refresh_ahead"]):
+            try:
+                await _fetch_live(key)
+            except Exception as e:
+                print(f"刷新 {key} 天气失败: {str(e)}")
+
+
+def _ensure_refresher():
+    global _refresher_started
+    if _refresher_started or not settings.WEATHER_CACHE["refresh_enabled"]:
+        return
+    with _refresher_lock:
+        if not _refresher_started:
+            amap_client.submit(_refresh_hot_cities())
+            _refresher_started = True
+
+
+async def _aget_live(city_or_adcode: str) -> dict:
+    """获取实况天气数据，失败时抛出 WeatherUnavailable"""
+    _ensure_refresher()
+    live = weather_cache.get_weather(city_or_adcode)
     try:
-        response = requests.get(url)
-        if response is None or response.status_code != 200:
-            return "天气服务暂时不可用"
-        else:
-            result = json.loads(response.text)
-            return generate_weather_report(result['lives'][0])
+        if live is None:
+            live = await _fetch_live(city_or_adcode)
+    except (CircuitOpenError, httpx.HTTPError) as e:
+        # 服务不可用时降级使用过期的缓存
+        stale = weather_cache.get_weather(city_or_adcode, stale=True)
+        if stale:
+            return stale
+        if isinstance(e, CircuitOpenError):
+            raise WeatherUnavailable("天气服务暂时不可用，请稍后再试")
+        raise WeatherUnavailable(f"获取天气信息失败: {str(e)}")
     except Exception as e:
-        return f"获取天气信息失败: {str(e)}"
+        raise WeatherUnavailable(f"获取天气信息失败: {str(e)}")
+    if live is None:
+        raise WeatherUnavailable("天气服务暂时不可用")
+    if not live:
+        raise WeatherUnavailable(f"未查询到{city_or_adcode}的天气信息")
+    return live
+
+
+async def aget_weather_info(city_or_adcode: str) -> str:
+    """查询城市实时天气并生成播报文本，失败时抛出 WeatherUnavailable"""
+    return generate_weather_report(await _aget_live(city_or_adcode))
+
+
+async def aget_weather_reports(cities: List[str]) -> Tuple[str, bool]:
+    """并发查询多个城市的天气并合并为一份播报，并发数受 multi_city_concurrency 限制
+
+    返回 (播报, 是否全部成功)；查询失败的城市以提示文本代替，全部失败时抛出 WeatherUnavailable。
+    """
+    semaphore = asyncio.Semaphore(settings.TOOL_CONFIG["weather"]["multi_city_concurrency"])
+
+    async def fetch(city: str) -> dict:
+        async with semaphore:
+            return await _aget_live(city)
+
+    reports = []
+    failed = 0
+    with_time = True  # 只在第一个城市的播报中报时
+    for live in await asyncio.gather(*(fetch(city) for city in cities), return_exceptions=True):
+        if isinstance(live, WeatherUnavailable):
+            reports.append(str(live))
+            failed += 1
+            continue
+        if isinstance(live, BaseException):
+            raise live
+        try:
+            reports.append(generate_weather_report(live, with_time=with_time))
+            with_time = False
+        except WeatherUnavailable as e:
+            reports.append(str(e))
+            failed += 1
+    if failed == len(reports):
+        raise WeatherUnavailable("\n".join(reports))
+    return "\n".join(reports), failed == 0
+
+
+def getLocation(ip: Optional[str] = None) -> str:
+    # 上下文变量不会传到后台事件循环，在调用线程中先取出
+    return amap_client.run_sync(aget_location(client_ip.get() if ip is None else ip))
+
+
+def getWeatherInfo(city_or_adcode: str) -> str:
+    return amap_client.run_sync(aget_weather_info(city_or_adcode))
+
+
+def getWeatherReports(cities: List[str]) -> Tuple[str, bool]:
+    return amap_client.run_sync(aget_weather_reports(cities))
 
 
-def generate_weather_report(data):
+def generate_weather_report(data, with_time=True):
     """
     将天气字典数据转换为自然语言播报文本
     :param data: 天气数据字典
+    :param with_time: 是否播报发布时间（多城市合并播报时只在第一条中播报）
     :return: 格式化后的天气播报文本
     """
     try:
@@ -44,7 +185,8 @@ def generate_weather_report(data):
         # 构建播报文本
         report = (
             f"现在是{report_time.year}年{report_time.month}月{report_time.day}日"
-            f"{weekday}{report_time.hour:02d}:{report_time.minute:02d}分，"
+            f"{weekday}{report_time.hour:02d}:{report_time.minute:02d}分，" if with_time else ""
+        ) + (
             f"{data['province']}{data['city']}当前天气为{data['weather']}，"
             f"气温{data['temperature']}℃，湿度{data['humidity']}%，"
             f"风向为{data['winddirection']}风，风力等级{data['windpower']}。"
@@ -53,7 +195,7 @@ def generate_weather_report(data):
         return report
 
     except (KeyError, ValueError) as e:
-        return f"天气数据解析失败: {str(e)}"
+        raise WeatherUnavailable(f"天气数据解析失败: {str(e)}")
 
 
 # if __name__ == '__main__':
@@ -0,0 +1,374 @@
+"""
+离线行政区划索引
+
+收录全国省、市、区县及其 adcode、简称和繁体写法，编译为 Aho-Corasick 自动机，
+一次扫描找出文本中的所有地名并直接返回 adcode，查询天气时无需高德按城市名解析。
+gazetteer_extra.json 手工维护行政区划以外的常用地名（台湾城市、景区）到 adcode 的映射，
+以及不支持查询的境外地名，重新生成数据文件时不受影响。
+
+重新生成数据文件：
+    python -m external_services.gazetteer build            # 使用高德行政区查询接口（需要 AMAP_API_KEY）
+    python -m external_services.gazetteer build --csv 路径  # 使用 adcode,name 格式的区划代码表
+"""
+
+import argparse
+import json
+import os
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(__file__), "data", "gazetteer.json")
+EXTRA_PATH = os.path.join(os.path.dirname(__file__), "data", "gazetteer_extra.json")
+
+LEVELS = ("province", "city", "district")
+
+# 不是实际地名的占位节点，其下级直接挂到上一级
+_PLACEHOLDER_NAMES = {"市辖区", "县", "省直辖县级行政区划", "自治区直辖县级行政区划"}
+
+# 按从长到短的顺序去掉的通名
+_SUFFIXES = ("特别行政区", "自治区", "自治州", "自治县", "自治旗", "林区", "特区", "地区",
+             "省", "市", "区", "县", "盟", "旗")
+
+# 去掉通名后与常用词重合的简称，只保留全称
+_ALIAS_STOPWORDS = {
+    "和平", "光明", "大方", "东方", "长寿", "平安", "安定", "新华", "解放", "红旗", "东风",
+    "向阳", "前进", "友好", "胜利", "团结", "新城", "城区", "郊区", "矿区", "市中", "城中",
+    "城东", "城西", "城南", "城北", "中山", "开发", "高新", "永安", "长安", "新区", "西区",
+    "东区", "南区", "北区", "中区", "华容", "河口", "江北", "江南", "中原", "白云", "青山"
+}
+
+
+class Place(NamedTuple):
+    """一个行政区划"""
+    adcode: str
+    name: str
+    level: str
+    parent: str
+
+
+def _strip_nations(name: str, nations: Iterable[str]) -> str:
+    """去掉自治地方名称末尾的民族名，如 延边朝鲜族 -> 延边"""
+    nations = sorted(nations, key=len, reverse=True)
+    stripped = True
+    while stripped:
+        stripped = False
+        for nation in nations:
+            if name.endswith(nation) and len(name) > len(nation):
+                name = name[:-len(nation)]
+                stripped = True
+                break
+    return name
+
+
+def make_aliases(name: str, level: str, nations: Iterable[str] = ()) -> List[str]:
+    """生成地名简称"""
+    short = name
+    for suffix in _SUFFIXES:
+        if short.endswith(suffix) and len(short) > len(suffix):
+            short = short[:-len(suffix)]
+            break
+    short = _strip_nations(short, nations)
+    if short == name or len(short) < 2:
+        return []
+    if level == "district" and short in _ALIAS_STOPWORDS:
+        return []
+    return [short]
+
+
+class _Automaton:
+    """Aho-Corasick 自动机"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[str]] = [[]]
+
+        for pattern in patterns:
+            node = 0
+            for char in pattern:
+                nxt = self.goto[node].get(char)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][char] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                node = nxt
+            self.output[node].append(pattern)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, nxt in self.goto[node].items():
+                queue.append(nxt)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nxt] = self.goto[fallback].get(char, 0)
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+
+    def iter_matches(self, text: str) -> Iterable[Tuple[int, str]]:
+        """产生所有匹配 (起始位置, 模式串)"""
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for pattern in self.output[node]:
+                yield index - len(pattern) + 1, pattern
+
+
+class Gazetteer:
+    """行政区划地名索引"""
+
+    def __init__(self, places: List[Place], forms: Dict[str, List[str]], unsupported: Iterable[str] = ()):
+        self.places = {place.adcode: place for place in places}
+        # 写法 -> 候选 adcode，按 省 > 市 > 区县、全称优先排序
+        self.forms = forms
+        # 能识别但无法查询的地名（如境外城市），参与最长匹配以免其中的字被误认成国内地名
+        self.unsupported = set(unsupported) - set(forms)
+        self._automaton = _Automaton(list(forms) + sorted(self.unsupported))
+
+    @classmethod
+    def load(cls, path: str = GAZETTEER_PATH, extra_path: str = EXTRA_PATH) -> "Gazetteer":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        extra = {"aliases": [], "unsupported": []}
+        if extra_path and os.path.exists(extra_path):
+            with open(extra_path, "r", encoding="utf-8") as f:
+                extra.update(json.load(f))
+
+        places = []
+        forms: Dict[str, List[Tuple[int, int, str]]] = {}
+        for adcode, name, level, parent, aliases in data["places"]:
+            places.append(Place(adcode, name, level, parent))
+            rank = LEVELS.index(level)
+            for priority, form in enumerate([name] + aliases):
+                forms.setdefault(form, []).append((rank, min(priority, 1), adcode))
+
+        levels = {place.adcode: place.level for place in places}
+        for adcode, aliases in extra["aliases"]:
+            if adcode in levels:
+                for form in aliases:
+                    forms.setdefault(form, []).append((LEVELS.index(levels[adcode]), 1, adcode))
+        return cls(places, {form: [adcode for *_, adcode in sorted(candidates)]
+                            for form, candidates in forms.items()}, extra["unsupported"])
+
+    def _ancestors(self, adcode: str) -> List[str]:
+        result = []
+        place = self.places.get(adcode)
+        while place and place.parent:
+            result.append(place.parent)
+            place = self.places.get(place.parent)
+        return result
+
+    def _longest_matches(self, text: str) -> List[Tuple[int, str]]:
+        """最左最长且互不重叠的匹配"""
+        matches = sorted(self._automaton.iter_matches(text), key=lambda m: (m[0], -len(m[1])))
+        selected = []
+        end = 0
+        for start, form in matches:
+            if start >= end:
+                selected.append((start, form))
+                end = start + len(form)
+        return selected
+
+    def _chains(self, text: str) -> List[List[str]]:
+        """把首尾相接的匹配分为一组（如 南京鼓楼），被其他字符隔开的（如 西安和吉林）各自成组"""
+        chains = []
+        end = -1
+        for start, form in self._longest_matches(text):
+            if form in self.unsupported:
+                end = -1
+                continue
+            if start == end:
+                chains[-1].append(form)
+            else:
+                chains.append([form])
+            end = start + len(form)
+        return chains
+
+    def _resolve_chain(self, chain: List[str]) -> List[str]:
+        """同名地名优先选择上级紧挨在前面的候选，否则按 省 > 市 > 区县 选择；作为限定的上级被省略"""
+        resolved = []
+        for index, form in enumerate(chain):
+            context = {adcode for qualifier in chain[:index] for adcode in self.forms[qualifier]}
+            candidates = self.forms[form]
+            resolved.append(next((c for c in candidates if context.intersection(self._ancestors(c))),
+                                 candidates[0]))
+
+        result = []
+        for index, form in enumerate(chain):
+            descendants = {a for adcode in resolved[index + 1:] for a in self._ancestors(adcode)}
+            if not descendants.intersection(self.forms[form]):
+                result.append(resolved[index])
+        return result
+
+    def find_all(self, text: str) -> List[Place]:
+        """按出现顺序返回文本中的所有地名
+
+        只有紧挨着的上级地名才用于区分同名地名（如 南京鼓楼、广东深圳 只返回鼓楼区、深圳），
+        用"和""与""、"等隔开的地名各自独立解析，不互相限定或省略。
+        """
+        resolved = []
+        for chain in self._chains(text):
+            for adcode in self._resolve_chain(chain):
+                if adcode not in resolved:
+                    resolved.append(adcode)
+        return [self.places[adcode] for adcode in resolved]
+
+    def find_unsupported(self, text: str) -> List[str]:
+        """按出现顺序返回文本中能识别但不支持查询的地名（如 东京、纽约）"""
+        result = []
+        for _, form in self._longest_matches(text):
+            if form in self.unsupported and form not in result:
+                result.append(form)
+        return result
+
+    def find(self, text: str) -> Optional[Place]:
+        """返回文本中第一个地名"""
+        places = self.find_all(text)
+        return places[0] if places else None
+
+
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    """获取全局地名索引（首次调用时加载）"""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer.load()
+    return _gazetteer
+
+
+# ---------------------------------------------------------------- 数据构建
+
+_NATIONS = [
+    "汉族", "蒙古族", "回族", "藏族", "维吾尔族", "苗族", "彝族", "壮族", "布依族", "朝鲜族", "满族",
+    "侗族", "瑶族", "白族", "土家族", "哈尼族", "哈萨克族", "傣族", "黎族", "傈僳族", "佤族", "畲族",
+    "高山族", "拉祜族", "水族", "东乡族", "纳西族", "景颇族", "柯尔克孜族", "土族", "达斡尔族",
+    "仫佬族", "羌族", "布朗族", "撒拉族", "毛南族", "仡佬族", "锡伯族", "阿昌族", "普米族", "塔吉克族",
+    "怒族", "乌孜别克族", "俄罗斯族", "鄂温克族", "德昂族", "保安族", "裕固族", "京族", "塔塔尔族",
+    "独龙族", "鄂伦春族", "赫哲族", "门巴族", "珞巴族", "基诺族", "各族"
+]
+
+
+def _converters() -> list:
+    """简体到繁体（通用、台湾、香港）转换器，需要安装 opencc（未安装时不生成繁体写法）"""
+    try:
+        from opencc import OpenCC
+    except ImportError:
+        print("未安装 opencc，跳过繁体写法")
+        return []
+    return [OpenCC(config) for config in ("s2t", "s2tw", "s2hk")]
+
+
+def _traditional_forms(names: List[str], converters: list) -> List[str]:
+    forms = []
+    for converter in converters:
+        for name in names:
+            converted = converter.convert(name)
+            if converted != name and converted not in forms:
+                forms.append(converted)
+    return forms
+
+
+def _level_of(adcode: str) -> str:
+    if adcode.endswith("0000"):
+        return "province"
+    if adcode.endswith("00"):
+        return "city"
+    return "district"
+
+
+def _rows_from_csv(path: str) -> List[Tuple[str, str]]:
+    """读取 adcode,name 格式的区划代码表（adcode 可为 12 位统计用区划代码）"""
+    rows = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            fields = line.strip().split(",")
+            if len(fields) >= 2 and fields[0].isdigit():
+                rows.append((fields[0][:6], fields[1]))
+    return rows
+
+
+def _rows_from_amap(api_key: str) -> List[Tuple[str, str]]:
+    """调用高德行政区查询接口获取省、市、区县三级"""
+    import httpx
+
+    response = httpx.get(
+        "https://restapi.amap.com/v3/config/district",
+        params={"key": api_key, "keywords": "中国", "subdistrict": 3, "extensions": "base"},
+        timeout=60
+    )
+    response.raise_for_status()
+
+    rows = []
+    stack = list(response.json()["districts"][0]["districts"])
+    while stack:
+        node = stack.pop()
+        if node["level"] in LEVELS:
+            rows.append((node["adcode"], node["name"]))
+            stack.extend(node.get("districts", []))
+    return rows
+
+
+def build(rows: List[Tuple[str, str]]) -> List[list]:
+    """由 (adcode, name) 列表生成数据文件的 places 条目"""
+    names = {adcode: name for adcode, name in rows
+             if name not in _PLACEHOLDER_NAMES and not name.endswith(("城区", "郊县"))}
+    converters = _converters()
+    places = []
+    for adcode in sorted(names):
+        name = names[adcode]
+        level = _level_of(adcode)
+        parent = ""
+        if level != "province":
+            city, province = adcode[:4] + "00", adcode[:2] + "0000"
+            parent = city if level == "district" and city in names else province
+            parent = parent if parent in names else ""
+        aliases = make_aliases(name, level, _NATIONS)
+        aliases += [form for form in _traditional_forms([name] + aliases, converters) if form not in aliases]
+        places.append([adcode, name, level, parent, aliases])
+    return places
+
+
+def write_gazetteer(places: List[list], path: str = GAZETTEER_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lines = [json.dumps(place, ensure_ascii=False) for place in places]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"places": [\n' + ",\n".join(lines) + "\n]}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线行政区划索引")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="重新生成数据文件")
+    build_parser.add_argument("--csv", help="adcode,name 格式的区划代码表，不指定时使用高德接口")
+    build_parser.add_argument("--output", default=GAZETTEER_PATH)
+    lookup_parser = subparsers.add_parser("lookup", help="查询文本中的地名")
+    lookup_parser.add_argument("text")
+    args = parser.parse_args()
+
+    if args.command == "lookup":
+        for place in get_gazetteer().find_all(args.text):
+            print(f"{place.adcode} {place.name} ({place.level})")
+        return
+
+    if args.csv:
+        rows = _rows_from_csv(args.csv)
+    else:
+        from config.settings import settings
+        rows = _rows_from_amap(settings.AMAP_API_KEY)
+    places = build(rows)
+    write_gazetteer(places, args.output)
+    print(f"已写入 {len(places)} 个行政区划到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+from config.settings import settings
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，请求被快速拒绝"""
+
+
+class CircuitBreaker:
+    """熔断器：closed -> open -> half_open -> closed
+
+    连续失败达到阈值后打开，recovery_timeout 秒内直接拒绝请求；
+    之后进入半开状态，放行少量探测请求，成功则关闭，失败则重新打开。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0, half_open_max_calls: int = 1):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self.stats = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+        return self._state
+
+    def allow(self) -> bool:
+        """是否放行请求"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return True
+            self.stats["rejected"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.stats["successes"] += 1
+            self._consecutive_failures = 0
+            self._state = self.CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self.stats["failures"] += 1
+            self._consecutive_failures += 1
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.stats["opened"] += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """滑动窗口延迟统计"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """样本不足时返回 None"""
+        with self._lock:
+            if len(self.samples) < self.min_samples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+class ResilientService:
+    """外部服务调用的弹性层：熔断、带抖动的有限重试、基于 P95 的对冲请求"""
+
+    def __init__(self, name: str, config: Dict[str, Any],
+                 retry_on: Tuple[Type[BaseException], ...] = (Exception,)):
+        self.name = name
+        self.retry_on = retry_on
+        self.max_attempts = config.get("max_attempts", 3)
+        self.base_delay = config.get("base_delay", 0.2)
+        self.max_delay = config.get("max_delay", 2.0)
+        self.hedge = config.get("hedge", False)
+        self.hedge_min_delay = config.get("hedge_min_delay", 0.2)
+        self.breaker = CircuitBreaker(
+            failure_threshold=config.get("failure_threshold", 5),
+            recovery_timeout=config.get("recovery_timeout", 30.0),
+            half_open_max_calls=config.get("half_open_max_calls", 1)
+        )
+        self.latency = LatencyTracker()
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "retries": 0, "hedges": 0, "hedge_wins": 0}
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _backoff(self, attempt: int) -> float:
+        """指数退避 + 全抖动"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def _atimed(self, fn: Callable, *args, **kwargs):
+        start = time.perf_counter()
+        result = await fn(*args, **kwargs)
+        self.latency.record(time.perf_counter() - start)
+        return result
+
+    async def _acall_hedged(self, fn: Callable, *args, **kwargs):
+        """主请求超过 P95 延迟仍未返回时，再发一个对冲请求，取先成功的结果并取消另一个"""
+        p95 = self.latency.percentile(0.95)
+        if p95 is None:
+            return await self._atimed(fn, *args, **kwargs)
+
+        primary = asyncio.ensure_future(self._atimed(fn, *args, **kwargs))
+        done, _ = await asyncio.wait({primary}, timeout=max(p95, self.hedge_min_delay))
+        if done:
+            return primary.result()
+
+        self._count("hedges")
+        hedge = asyncio.ensure_future(self._atimed(fn, *args, **kwargs))
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        if future is hedge:
+                            self._count("hedge_wins")
+                        return future.result()
+                    error = future.exception()
+            raise error
+        finally:
+            for future in pending:
+                future.cancel()
+
+    async def acall(self, fn: Callable, *args, **kwargs) -> Any:
+        """调用外部服务（fn 为协程函数）；熔断打开时抛出 CircuitOpenError"""
+        self._count("calls")
+        last_error = None
+        for attempt in range(self.max_attempts):
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"{self.name} 服务熔断中") from last_error
+            try:
+                if self.hedge:
+                    result = await self._acall_hedged(fn, *args, **kwargs)
+                else:
+                    result = await self._atimed(fn, *args, **kwargs)
+                self.breaker.record_success()
+                return result
+            except self.retry_on as e:
+                self.breaker.record_failure()
+                last_error = e
+                if attempt + 1 < self.max_attempts:
+                    self._count("retries")
+                    await asyncio.sleep(self._backoff(attempt))
+        raise last_error
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """熔断状态、调用统计和延迟分位数"""
+        with self._lock:
+            stats = dict(self.stats)
+        p50 = self.latency.percentile(0.5)
+        p95 = self.latency.percentile(0.95)
+        return dict(
+            stats,
+            state=self.breaker.state,
+            breaker=dict(self.breaker.stats),
+            p50=round(p50, 4) if p50 is not None else None,
+            p95=round(p95, 4) if p95 is not None else None
+        )
+
+
+_services: Dict[str, ResilientService] = {}
+_services_lock = threading.Lock()
+
+
+def get_service(name: str, retry_on: Tuple[Type[BaseException], ...] = (Exception,)) -> ResilientService:
+    """获取（或按 settings.RESILIENCE 创建）指定外部服务的弹性层"""
+    with _services_lock:
+        if name not in _services:
+            _services[name] = ResilientService(name, settings.RESILIENCE.get(name, {}), retry_on)
+        return _services[name]
+
+
+def get_metrics() -> Dict[str, Dict[str, Any]]:
+    """所有外部服务的弹性层指标"""
+    return {name: service.get_metrics() for name, service in list(_services.items())}
@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+# 高德 reporttime 为北京时间
+_BEIJING = timezone(timedelta(hours=8))
+
+
+def report_timestamp(reporttime: str) -> Optional[float]:
+    """将高德 reporttime 转为时间戳，格式不正确时返回 None"""
+    try:
+        return datetime.strptime(reporttime, "%Y-%m-%d %H:%M:%S").replace(tzinfo=_BEIJING).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class WeatherCache:
+    """天气与 IP 定位缓存
+
+    实况天气按城市名或 adcode 缓存，过期时间由 reporttime 加上高德的更新周期推算，
+    下一次发布前的查询都不访问网络；IP 到 adcode 的映射几乎不变，按客户端 IP 长期缓存。
+    同时统计各城市的查询次数，供后台刷新热门城市使用。
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.update_interval = config["update_interval"]
+        self.min_ttl = config["min_ttl"]
+        self.max_ttl = config["max_ttl"]
+        self.location_ttl = config["location_ttl"]
+        self.max_entries = config["max_entries"]
+        self._lock = threading.Lock()
+        self._weather: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._locations: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._hits: Counter = Counter()
+        self.stats = {"weather_hits": 0, "weather_misses": 0, "location_hits": 0, "location_misses": 0}
+
+    def _expires_at(self, live: Dict[str, Any]) -> float:
+        """下一次发布时间；reporttime 已过期（高德尚未更新）时按 min_ttl 重试"""
+        now = time.time()
+        reported = report_timestamp(live.get("reporttime"))
+        if reported is None:
+            return now + self.min_ttl
+        return min(max(reported + self.update_interval, now + self.min_ttl), now + self.max_ttl)
+
+    def _put(self, entries: OrderedDict, key: str, value):
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def get_weather(self, key: str, stale: bool = False) -> Optional[Dict[str, Any]]:
+        """获取缓存的实况天气；stale 为 True 时也返回已过期的数据（用于服务不可用时降级）"""
+        with self._lock:
+            item = self._weather.get(key)
+            if stale:
+                return item[1] if item else None
+            self._hits[key] += 1
+            if len(self._hits) > self.max_entries * 4:
+                self._hits = Counter(dict(self._hits.most_common(self.max_entries)))
+            if item is None or item[0] < time.time():
+                self.stats["weather_misses"] += 1
+                return None
+            self.stats["weather_hits"] += 1
+            return item[1]
+
+    def put_weather(self, key: str, live: Dict[str, Any]):
+        """缓存实况天气，同时以 adcode 为键缓存一份"""
+        value = (self._expires_at(live), live)
+        with self._lock:
+            self._put(self._weather, key, value)
+            adcode = live.get("adcode")
+            if isinstance(adcode, str) and adcode and adcode != key:
+                self._put(self._weather, adcode, value)
+
+    def get_location(self, ip: str) -> Optional[str]:
+        """获取缓存的 IP 定位结果"""
+        with self._lock:
+            item = self._locations.get(ip)
+            if item is None or item[0] < time.time():
+                self.stats["location_misses"] += 1
+                return None
+            self.stats["location_hits"] += 1
+            return item[1]
+
+    def put_location(self, ip: str, adcode: str):
+        with self._lock:
+            self._put(self._locations, ip, (time.time() + self.location_ttl, adcode))
+
+    def hot_keys(self, top_n: int, refresh_ahead: float) -> List[str]:
+        """查询最多的 top_n 个已缓存城市中，即将过期或已过期的城市"""
+        deadline = time.time() + refresh_ahead
+        with self._lock:
+            return [
+                key for key, _ in self._hits.most_common(top_n)
+                if key in self._weather and self._weather[key][0] <= deadline
+            ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, weather_entries=len(self._weather), location_entries=len(self._locations))
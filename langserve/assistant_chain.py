@@ -1,49 +1,122 @@
-from langchain_core.runnables import RunnableLambda
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain_community.chat_models import ChatOllama
+import asyncio
+import weakref
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 
 from core.assistant import VoiceAssistant
-from config import settings
+from config.settings import settings
 
 
 class AssistantChain:
-    """LangServe 链定义"""
+    """LangServe 链定义
+
+    链只包含助手工作流本身（意图识别 -> 工具或 LLM），每个请求只进行一次 LLM 生成。
+    异步调用（ainvoke / abatch / astream / astream_events）直接在事件循环中执行；所有请求（包括批量请求中的
+    每一项）共用同一个并发上限 max_concurrency，超出的请求排队等待。
+    """
 
-    def __init__(self):
-        self.assistant = VoiceAssistant()
+    def __init__(self, assistant: Optional[VoiceAssistant] = None, max_concurrency: Optional[int] = None):
+        self.assistant = assistant or VoiceAssistant()
+        self.max_concurrency = max_concurrency or settings.LANGSERVE["max_concurrency"]
+        # 每个事件循环一个信号量（同步 invoke 会在新的事件循环中执行）
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = \
+            weakref.WeakKeyDictionary()
+        self.stats = {"running": 0, "waiting": 0, "completed": 0}
 
         # 创建 LangChain 链
         self.chain = self._create_chain()
 
     def _create_chain(self):
         """创建 LangChain 链"""
-        # 系统提示
-        system_prompt = ChatPromptTemplate.from_messages([
-            ("system", "你是一个智能语音助手，可以帮助用户完成各种任务。"),
-            ("user", "{input}")
-        ])
-
-        # 创建链
-        chain = (
-                system_prompt
-                | ChatOllama(model=settings.LLM_MODEL, temperature=0.7)
-                | StrOutputParser()
-        )
-
-        # 包装处理函数
-        return RunnableLambda(self._process_input) | chain
-
-    def _process_input(self, input_data: dict) -> dict:
-        """处理输入数据"""
-        user_input = input_data.get("input", "")
-        context = input_data.get("context", {})
+        return RunnableLambda(self._process_input_sync, afunc=self._process_input, name="voice_assistant")
 
-        # 使用助手处理输入
-        response = self.assistant.process_text(user_input)
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
 
-        return {"input": response}
+    async def _run(self, user_input: str, listener=None) -> str:
+        """在并发上限内执行一次助手工作流"""
+        semaphore = self._semaphore()
+        self.stats["waiting"] += 1
+        try:
+            # 排队时被取消（客户端断开）也要恢复计数
+            await semaphore.acquire()
+        finally:
+            self.stats["waiting"] -= 1
+        self.stats["running"] += 1
+        try:
+            return await self.assistant.process_text(user_input, listener=listener)
+        finally:
+            self.stats["running"] -= 1
+            self.stats["completed"] += 1
+            semaphore.release()
 
-    def invoke(self, input_data: dict) -> dict:
+    async def _process_input(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """处理输入数据"""
+        output = await self._run(input_data.get("input", ""))
+        return {"output": output, "context": input_data.get("context", {})}
+
+    def _process_input_sync(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """同步调用：在新的事件循环中执行（不能在已有事件循环的线程中调用）"""
+        return asyncio.run(self._process_input(input_data))
+
+    def invoke(self, input_data: dict, config: Optional[RunnableConfig] = None) -> dict:
         """调用链"""
-        return self.chain.invoke(input_data)
\ No newline at end of file
+        return self.chain.invoke(input_data, config)
+
+    async def ainvoke(self, input_data: dict, config: Optional[RunnableConfig] = None) -> dict:
+        return await self.chain.ainvoke(input_data, config)
+
+    async def abatch(self, inputs: List[dict], config: Optional[RunnableConfig] = None) -> List[dict]:
+        """批量调用，各项并发执行并受共用的并发上限约束；单项失败不影响其他项"""
+        config = dict(config or {})
+        config.setdefault("max_concurrency", self.max_concurrency)
+        results = await self.chain.abatch(inputs, config, return_exceptions=True)
+        return [
+            {"output": f"处理请求时出错: {str(result)}", "context": item.get("context", {})}
+            if isinstance(result, Exception) else result
+            for item, result in zip(inputs, results)
+        ]
+
+    async def astream(self, input_data: dict, config: Optional[RunnableConfig] = None) -> AsyncIterator[dict]:
+        async for chunk in self.chain.astream(input_data, config):
+            yield chunk
+
+    async def astream_events(self, input_data: dict,
+                             heartbeat: Optional[float] = None) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """逐个产出 (事件, 数据)：intent、tool_start、tool_end、token、think、final
+
+        指定 heartbeat 时，超过该秒数没有事件会产出 ("ping", {})，便于调用方检查连接状态。
+        调用方停止迭代（如客户端断开）时取消仍在进行的生成；工具在工作进程中执行，
+        已开始的工具调用会运行完，但其结果不再被等待。
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def listener(event: str, data: Dict[str, Any]):
+            await queue.put((event, data))
+
+        task = asyncio.ensure_future(self._run(input_data.get("input", ""), listener))
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        final_sent = False
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield "ping", {}
+                    continue
+                if item is None:
+                    break
+                final_sent = final_sent or item[0] == "final"
+                yield item
+            output = task.result()
+            if not final_sent:
+                # 工作流在生成回复前出错，process_text 返回的是错误信息
+                yield "final", {"text": output}
+        finally:
+            if not task.done():
+                task.cancel()
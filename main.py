@@ -26,7 +26,7 @@ class TextModeAssistant:
         """运行文本模式"""
         print("语音助手已启动（文本模式）")
         print("输入'退出'或'quit'结束程序")
-        print("支持的功能：", ", ".join(self.assistant.agent.tools.keys()))
+        print("支持的功能：", ", ".join(tool.name for tool in self.assistant.tools))
 
         while True:
             try:
@@ -89,14 +89,12 @@ class ToolManagementMode:
 
     def _list_tools(self):
         """列出所有工具"""
-        tools = self.assistant.agent.tools
         print("\n已注册工具:")
-        for name, tool in tools.items():
-            print(f"- {name}: {tool.description}")
+        for tool in self.assistant.tools:
+            print(f"- {tool.name}: {tool.description}")
 
-        active_tools = tool_registry.get_all_tools()
         print("\n已启用工具:")
-        for name in active_tools:
+        for name in tool_registry.get_enabled_specs():
             print(f"- {name}")
 
     def _add_tool(self):
@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic import BaseModel
 
 class AssistantRequest(BaseModel):
@@ -9,4 +11,31 @@ class AssistantRequest(BaseModel):
 class AssistantResponse(BaseModel):
     """API 响应模型"""
     output: str
-    context: dict = {}
\ No newline at end of file
+    context: dict = {}
+
+class InvokeRequest(BaseModel):
+    """/invoke 请求（与 LangServe 的格式相同）"""
+    input: AssistantRequest
+    config: dict = {}
+
+
+class InvokeResponse(BaseModel):
+    """/invoke 响应"""
+    output: AssistantResponse
+
+
+class BatchRequest(BaseModel):
+    """/batch 请求"""
+    inputs: List[AssistantRequest]
+    config: dict = {}
+
+
+class BatchResponse(BaseModel):
+    """/batch 响应，顺序与请求中的 inputs 相同"""
+    output: List[AssistantResponse]
+
+
+class StreamRequest(BaseModel):
+    """/stream 请求；include_think 为空时使用服务端默认设置"""
+    input: AssistantRequest
+    include_think: Optional[bool] = None
@@ -1,13 +1,24 @@
 #!/usr/bin/env python
 """
 LangServe 服务入口
+
+项目中的 langserve 包（链定义）与 LangServe 库同名，无法导入 langserve.add_routes，
+因此按 LangServe 的请求/响应格式显式定义 /assistant/invoke 和 /assistant/batch；
+/assistant/stream 以 SSE 推送处理阶段事件和生成的 token。
 """
 
-from fastapi import FastAPI
+import asyncio
+import json
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
 
+from config.settings import settings
+from external_services.amap_service import client_ip
 from langserve.assistant_chain import AssistantChain
-from config import settings
-from schemes.models import AssistantRequest, AssistantResponse
+from schemes.models import (
+    AssistantRequest, BatchRequest, BatchResponse, InvokeRequest, InvokeResponse, StreamRequest
+)
 
 # 创建应用
 app = FastAPI(
@@ -19,16 +30,75 @@ app = FastAPI(
 # 创建助手链
 assistant_chain = AssistantChain()
 
-add_routes(
-    app,
-    assistant_chain.chain,
-    path="/assistant",
-    input_type=AssistantRequest,
-    output_type=AssistantResponse,
-    enable_feedback_endpoint=True,
-    enable_public_trace_link_endpoint=True,
-    playground_type="chat"
-)
+
+def _run_config(request: Request, config: dict) -> dict:
+    """客户端只能指定不超过服务端上限的 max_concurrency；工具调用按客户端 IP 定位"""
+    if request.client:
+        client_ip.set(request.client.host)
+    max_concurrency = config.get("max_concurrency") or assistant_chain.max_concurrency
+    return {"max_concurrency": max(1, min(int(max_concurrency), assistant_chain.max_concurrency))}
+
+
+def _chain_input(item: AssistantRequest) -> dict:
+    return item.dict()
+
+
+@app.post("/assistant/invoke", response_model=InvokeResponse)
+async def invoke(body: InvokeRequest, request: Request):
+    """处理单个请求"""
+    result = await assistant_chain.ainvoke(_chain_input(body.input), _run_config(request, body.config))
+    return {"output": result}
+
+
+@app.post("/assistant/batch", response_model=BatchResponse)
+async def batch(body: BatchRequest, request: Request):
+    """批量处理请求，各项并发执行，与其他请求共用并发上限"""
+    if len(body.inputs) > settings.LANGSERVE["max_batch_size"]:
+        raise HTTPException(status_code=413, detail=f"批量请求最多 {settings.LANGSERVE['max_batch_size']} 项")
+    results = await assistant_chain.abatch([_chain_input(item) for item in body.inputs],
+                                           _run_config(request, body.config))
+    return {"output": results}
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/assistant/stream")
+async def stream(body: StreamRequest, request: Request):
+    """以 SSE 推送 intent、tool_start、tool_end、token、think（可选）、final 事件，最后发送 end
+
+    客户端断开后停止推送并取消生成；长时间没有事件时发送注释行作为心跳。
+    """
+    if request.client:
+        client_ip.set(request.client.host)
+    include_think = settings.LANGSERVE["stream_think"] if body.include_think is None else body.include_think
+
+    async def event_source():
+        events = assistant_chain.astream_events(_chain_input(body.input),
+                                                heartbeat=settings.LANGSERVE["stream_keepalive"])
+        try:
+            async for event, data in events:
+                if await request.is_disconnected():
+                    return
+                if event == "ping":
+                    yield ": ping\n\n"
+                elif event != "think" or include_think:
+                    yield _sse(event, data)
+            yield _sse("end", {})
+        finally:
+            # 关闭事件生成器会取消仍在进行的生成
+            await events.aclose()
+
+    return StreamingResponse(event_source(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.get("/assistant/stats")
+def chain_stats():
+    """正在处理、排队和已完成的请求数"""
+    return dict(assistant_chain.stats, max_concurrency=assistant_chain.max_concurrency)
+
 
 @app.get("/health")
 def health_check():
@@ -41,4 +111,4 @@ if __name__ == "__main__":
         app,
         host=settings.LANGSERVE_HOST,
         port=settings.LANGSERVE_PORT
-    )
\ No newline at end of file
+    )
@@ -1,8 +1,22 @@
+import re
+import unicodedata
 from abc import ABC, abstractmethod
 
 from pydantic import BaseModel, Field
 
 
+_PUNCTUATION = re.compile(r"[\s\W_]+", re.UNICODE)
+
+
+def normalize_query(query: str) -> str:
+    """规范化查询文本：全角转半角、小写、去除空白和标点"""
+    return _PUNCTUATION.sub("", unicodedata.normalize("NFKC", query).lower())
+
+
+class ToolError(Exception):
+    """工具执行失败，消息直接作为回复，结果不会被缓存"""
+
+
 class ToolInput(BaseModel):
     """工具输入模型"""
     query:str = Field(description="用户查询内容")
@@ -19,6 +33,8 @@ class BaseAssistantTool(ABC):
             self.description = ""
         self.config = config
         self.enabled = True
+        self._events = []
+        self._cacheable = True
 
     @abstractmethod
     def run(self, query:str) -> str:
@@ -32,6 +48,37 @@ class BaseAssistantTool(ABC):
             return f"执行{self.name} 时出错：{str(e)}"
 
 
+    @classmethod
+    def cache_key(cls, query: str):
+        """返回结果缓存的键；None 表示该查询结果不能缓存（不创建实例即可调用）
+
+        默认按规范化后的查询文本缓存，标点和空白不同的同一句话共用结果
+        """
+        return normalize_query(query)
+
+    def skip_cache(self):
+        """本次结果不缓存（如索引尚未建立完成、部分查询失败）"""
+        self._cacheable = False
+
+    def drain_cacheable(self) -> bool:
+        """取出并重置本次结果是否可缓存"""
+        cacheable, self._cacheable = self._cacheable, True
+        return cacheable
+
+    def emit(self, event: str):
+        """发出事件（如数据写入），用于使相关工具的缓存失效"""
+        self._events.append(event)
+
+    def drain_events(self) -> list:
+        """取出并清空已发出的事件"""
+        events, self._events = self._events, []
+        return events
+
+    @classmethod
+    def speculation_key(cls, query: str):
+        """返回可推测执行的调用标识；None 表示该查询不能提前执行（非只读或不幂等）"""
+        return None
+
     # def _run(self) -> str:
     #     """工具执行逻辑"""
     #     pass
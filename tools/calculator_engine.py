@@ -0,0 +1,197 @@
+"""
+计算器表达式引擎
+
+把中文数字和运算词（加减乘除、百分之、的平方、根号、万/亿）规范化为算式，
+用 ast 解析后逐节点求值，只允许数字、四则运算、乘方、取模和白名单中的函数，
+并限制整数位数、指数大小和求值步数，"9**9**9" 之类的输入会立即被拒绝。
+解析结果按规范化后的算式缓存。
+"""
+
+import ast
+import math
+import operator
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, Union
+
+from .time_parser import parse_chinese_number
+
+Number = Union[int, float]
+
+
+class CalculationError(ValueError):
+    """算式无效或超出计算限制"""
+
+
+@dataclass(frozen=True)
+class Limits:
+    """计算限制"""
+    max_length: int = 200  # 算式最大长度
+    max_digits: int = 1000  # 整数运算数和结果的最大位数
+    max_exponent: int = 10000  # 乘方指数的最大绝对值
+    max_steps: int = 1000  # 最多求值的节点数
+
+
+_CHINESE_NUMBER = "[零〇一二两三四五六七八九十百千万亿]+"
+
+# 按顺序替换的运算词
+_WORDS = [
+    (re.compile(r"（"), "("), (re.compile(r"）"), ")"),
+    (re.compile(r"×|(?<=[\d)])\s*[xX]\s*(?=[\d(])"), "*"), (re.compile(r"÷"), "/"),
+    (re.compile(r"加上|加"), "+"), (re.compile(r"减去|减"), "-"),
+    (re.compile(r"乘以|乘上|乘"), "*"), (re.compile(r"除以|除"), "/"),
+    (re.compile(r"\^"), "**"),
+]
+_OPERAND = r"(\d+(?:\.\d+)?|\([^()]*\))"
+_POSTFIX = [
+    (re.compile(_OPERAND + r"的平方根"), r"sqrt(\1)"),
+    (re.compile(_OPERAND + r"的立方根"), r"cbrt(\1)"),
+    (re.compile(_OPERAND + r"的平方"), r"(\1**2)"),
+    (re.compile(_OPERAND + r"的立方"), r"(\1**3)"),
+    (re.compile(_OPERAND + r"的(\d+)次(?:方|幂)"), r"(\1**\2)"),
+    (re.compile(r"(?:根号|开根号|开平方)" + _OPERAND), r"sqrt(\1)"),
+    (re.compile(_OPERAND + "%"), r"(\1/100)"),
+]
+# 在转换中文数字之前处理，避免"百"、"万"被单独当作数字
+_SCALES = {"百": 100, "千": 1000, "万": 10 ** 4, "亿": 10 ** 8}
+_SCALED = re.compile(r"(\d+(?:\.\d+)?)(万|亿|千|百)")
+_PERCENT = re.compile(r"百分之")
+
+# 从查询中去掉的口语词（先去掉包含"一"的词，避免被当作数字）
+_FILLERS = re.compile(r"请|帮我|帮忙|计算一下|算一下|算算|计算|一下|等于多少|等于几|是多少|得多少|多少|等于|结果|是|呢|吧|啊|[？?。！!=，,]")
+_EXPRESSION = re.compile(r"[0-9a-z.+\-*/%()\s]*[0-9][0-9a-z.+\-*/%()\s]*")
+
+
+def _chinese_decimal(match: re.Match) -> str:
+    integer = parse_chinese_number(match.group(1))
+    fraction = "".join(str(parse_chinese_number(char)) for char in match.group(2))
+    return f"{integer}.{fraction}"
+
+
+def normalize(text: str) -> str:
+    """中文数字和运算词转为算式，如 "三点五乘以两百" -> "3.5*200" """
+    text = _FILLERS.sub("", text)
+    text = _SCALED.sub(lambda m: f"({m.group(1)}*{_SCALES[m.group(2)]})", text)
+    text = _PERCENT.sub("%", text)
+    text = re.sub(rf"({_CHINESE_NUMBER})点([零〇一二两三四五六七八九]+)", _chinese_decimal, text)
+    text = re.sub(_CHINESE_NUMBER, lambda m: str(parse_chinese_number(m.group(0))), text)
+    for pattern, replacement in _WORDS:
+        text = pattern.sub(replacement, text)
+    text = re.sub(r"%(\d+(?:\.\d+)?)", r"\1%", text)
+    for pattern, replacement in _POSTFIX:
+        text = pattern.sub(replacement, text)
+    return text.replace(" ", "")
+
+
+def extract(text: str) -> str:
+    """从查询中取出算式；没有算式时返回空字符串"""
+    candidates = _EXPRESSION.findall(normalize(text).lower())
+    expression = max(candidates, key=len, default="").strip()
+    return expression if any(char in expression for char in "+-*/%(") or expression.isdigit() else ""
+
+
+_BINARY: Dict[type, Callable[[Number, Number], Number]] = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: operator.pow,
+}
+_UNARY = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+_CONSTANTS = {"pi": math.pi, "e": math.e}
+
+
+@lru_cache(maxsize=1024)
+def parse(expression: str) -> ast.Expression:
+    """解析算式（带缓存）"""
+    try:
+        return ast.parse(expression, mode="eval")
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        raise CalculationError(f"无法解析算式: {expression}")
+
+
+class Evaluator:
+    """逐节点求值，超出限制时抛出 CalculationError"""
+
+    def __init__(self, limits: Limits = Limits(), degrees: bool = True):
+        self.limits = limits
+        self.max_bits = int(limits.max_digits * math.log2(10)) + 1
+        to_radians = math.radians if degrees else float
+        self.functions: Dict[str, Callable[..., Number]] = {
+            "sqrt": self._sqrt, "cbrt": lambda x: math.copysign(abs(x) ** (1 / 3), x),
+            "abs": abs, "round": round, "ln": math.log, "log": self._log, "exp": math.exp,
+            "sin": lambda x: math.sin(to_radians(x)), "cos": lambda x: math.cos(to_radians(x)),
+            "tan": lambda x: math.tan(to_radians(x)),
+        }
+
+    @staticmethod
+    def _sqrt(x: Number) -> Number:
+        if x < 0:
+            raise CalculationError("负数不能开平方")
+        root = math.isqrt(x) if isinstance(x, int) else None
+        return root if root is not None and root * root == x else math.sqrt(x)
+
+    @staticmethod
+    def _log(x: Number, base: Number = 10) -> float:
+        return math.log(x, base)
+
+    def evaluate(self, expression: str) -> Number:
+        if len(expression) > self.limits.max_length:
+            raise CalculationError(f"算式过长（超过 {self.limits.max_length} 个字符）")
+        self._steps = 0
+        return self._eval(parse(expression).body)
+
+    def _check_int(self, value: Number) -> Number:
+        if isinstance(value, int) and value.bit_length() > self.max_bits:
+            raise CalculationError(f"数字超过 {self.limits.max_digits} 位")
+        if isinstance(value, float) and not math.isfinite(value):
+            raise CalculationError("结果超出范围")
+        return value
+
+    def _power(self, base: Number, exponent: Number) -> Number:
+        if abs(exponent) > self.limits.max_exponent:
+            raise CalculationError(f"指数超过 {self.limits.max_exponent}")
+        if isinstance(base, int) and isinstance(exponent, int) and exponent > 0 \
+                and abs(base) > 1 and (abs(base).bit_length() - 1) * exponent > self.max_bits:
+            raise CalculationError(f"结果超过 {self.limits.max_digits} 位")
+        try:
+            if isinstance(base, int) and isinstance(exponent, int) and exponent >= 0:
+                return base ** exponent
+            return math.pow(base, exponent)
+        except OverflowError:
+            raise CalculationError("结果超出范围")
+        except (ValueError, ZeroDivisionError):
+            raise CalculationError("结果不是实数")
+
+    def _eval(self, node: ast.AST) -> Number:
+        self._steps += 1
+        if self._steps > self.limits.max_steps:
+            raise CalculationError(f"算式过于复杂（超过 {self.limits.max_steps} 步）")
+
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            return self._check_int(node.value)
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY:
+            left, right = self._eval(node.left), self._eval(node.right)
+            if isinstance(node.op, ast.Pow):
+                return self._check_int(self._power(left, right))
+            if isinstance(node.op, ast.Mult) and isinstance(left, int) and isinstance(right, int) \
+                    and left.bit_length() + right.bit_length() > self.max_bits + 1:
+                raise CalculationError(f"结果超过 {self.limits.max_digits} 位")
+            try:
+                return self._check_int(_BINARY[type(node.op)](left, right))
+            except ZeroDivisionError:
+                raise CalculationError("除数不能为零")
+            except OverflowError:
+                raise CalculationError("结果超出范围")
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY:
+            return _UNARY[type(node.op)](self._eval(node.operand))
+        if isinstance(node, ast.Name) and node.id in _CONSTANTS:
+            return _CONSTANTS[node.id]
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in self.functions \
+                and not node.keywords:
+            args = [self._eval(arg) for arg in node.args]
+            try:
+                return self._check_int(self.functions[node.func.id](*args))
+            except (TypeError, ValueError, OverflowError) as e:
+                if isinstance(e, CalculationError):
+                    raise
+                raise CalculationError(f"{node.func.id} 的参数无效")
+        raise CalculationError("算式包含不支持的内容")
@@ -1,6 +1,5 @@
-import re
-
-from .base_tool import BaseAssistantTool
+from .base_tool import BaseAssistantTool, ToolError
+from .calculator_engine import Evaluator, Limits, extract
 
 
 class CalculatorTool(BaseAssistantTool):
@@ -8,17 +7,27 @@ class CalculatorTool(BaseAssistantTool):
 
     def __init__(self, name: str, config: dict):
         super().__init__(name, config)
-        self.precision = 2
+        self.precision = config.get("precision", 2)
+        limits = config.get("limits", {})
+        self.evaluator = Evaluator(
+            Limits(**{key: limits[key] for key in Limits.__dataclass_fields__ if key in limits}),
+            degrees=config.get("angle_unit", "degrees") == "degrees"
+        )
+
+    @classmethod
+    def cache_key(cls, query: str):
+        """按提取出的算式（保留运算符和小数点）缓存，没有算式时不缓存"""
+        return extract(query) or None
 
     def run(self, query: str) -> str:
         try:
             # 清理查询并提取表达式
-            expression = self._extract_expression(query)
+            expression = self.extract_expression(query)
             if not expression:
                 return "未找到有效的数学表达式"
 
             # 安全评估表达式
-            result = self._safe_eval(expression)
+            result = self.safe_eval(expression)
 
             # 格式化结果
             if isinstance(result, float):
@@ -28,62 +37,12 @@ class CalculatorTool(BaseAssistantTool):
 
             return f"计算结果: {expression} = {result}"
         except Exception as e:
-            return f"计算失败: {str(e)}"
+            raise ToolError(f"计算失败: {str(e)}")
 
     def extract_expression(self, query: str) -> str:
-        """从查询中提取数学表达式"""
-        # 尝试匹配常见数学表达式
-        patterns = [
-            r'(\d+\.?\d*)\s*([\+\-\*\/\^])\s*(\d+\.?\d*)',  # 基本运算
-            r'计算(.+?)等于多少',  # 中文查询
-            r'算一下(.+?)是多少',  # 中文查询
-            r'(\d+\.?\d*)\s*的平方',  # 平方
-            r'(\d+\.?\d*)\s*的立方',  # 立方
-            r'(\d+\.?\d*)\s*的平方根',  # 平方根
-            r'(\d+\.?\d*)\s*的立方根'  # 立方根
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, query)
-            if match:
-                if pattern in patterns[0]:
-                    # 基本运算
-                    return f"{match.group(1)} {match.group(2)} {match.group(3)}"
-                elif pattern in patterns[1:3]:
-                    # 中文查询
-                    return match.group(1)
-                elif pattern == patterns[3]:
-                    # 平方
-                    return f"{match.group(1)} ** 2"
-                elif pattern == patterns[4]:
-                    # 立方
-                    return f"{match.group(1)} ** 3"
-                elif pattern == patterns[5]:
-                    # 平方根
-                    return f"{match.group(1)} ** 0.5"
-                elif pattern == patterns[6]:
-                    # 立方根
-                    return f"{match.group(1)} ** (1/3)"
-
-        # 尝试提取纯数学表达式
-        math_chars = set('0123456789.+-*/^() ')
-        if all(char in math_chars for char in query):
-            return query
-
-        return ""
+        """从查询中提取数学表达式（支持中文数字和运算词）"""
+        return extract(query)
 
     def safe_eval(self, expression: str):
-        """安全评估数学表达式"""
-        # 替换中文运算符
-        expression = expression.replace('×', '*').replace('÷', '/')
-
-        # 移除空格
-        expression = expression.replace(' ', '')
-
-        # 验证表达式安全性
-        allowed_chars = set('0123456789.+-*/^() ')
-        if not all(char in allowed_chars for char in expression):
-            raise ValueError("表达式包含不安全字符")
-
-        # 使用eval计算（在受限环境中）
-        return eval(expression, {"__builtins__": None}, {})
\ No newline at end of file
+        """按 AST 逐节点求值，限制数字位数、指数和步数"""
+        return self.evaluator.evaluate(expression)
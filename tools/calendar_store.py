@@ -0,0 +1,285 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL DEFAULT '',
+    title TEXT NOT NULL DEFAULT '',
+    description TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS events_by_date ON events (date, time);
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER PRIMARY KEY,
+    dtstart TEXT NOT NULL,
+    until TEXT,
+    freq TEXT NOT NULL,
+    interval INTEGER NOT NULL DEFAULT 1,
+    byweekday TEXT NOT NULL DEFAULT '',
+    time TEXT NOT NULL DEFAULT '',
+    title TEXT NOT NULL DEFAULT '',
+    description TEXT NOT NULL DEFAULT ''
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS series_span USING rtree_i32(id, start_day, end_day);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_EVENT_FIELDS = ("date", "time", "title", "description")
+_INSERT_EVENT = "INSERT INTO events (date, time, title, description) VALUES (?, ?, ?, ?)"
+
+FREQUENCIES = ("daily", "weekly", "monthly")
+
+# 没有结束日期的重复事件在区间索引中的结束位置
+_OPEN_END = date.max.toordinal()
+
+
+def expand_series(series: Dict[str, Any], start: date, end: date) -> Iterator[date]:
+    """产生重复事件在 [start, end] 内的发生日期
+
+    直接计算窗口内的第一次发生，不从 dtstart 逐次推算，耗时只与窗口长度有关。
+    """
+    dtstart = date.fromisoformat(series["dtstart"])
+    until = date.fromisoformat(series["until"]) if series.get("until") else date.max
+    start, end = max(start, dtstart), min(end, until)
+    if start > end:
+        return
+    interval = series.get("interval") or 1
+
+    if series["freq"] == "daily":
+        day = start + timedelta(days=-(start - dtstart).days % interval)
+        while day <= end:
+            yield day
+            day += timedelta(days=interval)
+
+    elif series["freq"] == "weekly":
+        weekdays = sorted({int(d) for d in series["byweekday"].split(",")}) if series.get("byweekday") \
+            else [dtstart.weekday()]
+        anchor = dtstart - timedelta(days=dtstart.weekday())
+        week = start - timedelta(days=start.weekday())
+        week += timedelta(weeks=-((week - anchor).days // 7) % interval)
+        while week <= end:
+            for weekday in weekdays:
+                day = week + timedelta(days=weekday)
+                if start <= day <= end:
+                    yield day
+            week += timedelta(weeks=interval)
+
+    elif series["freq"] == "monthly":
+        months = (start.year - dtstart.year) * 12 + start.month - dtstart.month
+        months += -months % interval
+        while True:
+            year, month = divmod(dtstart.month - 1 + months, 12)
+            year += dtstart.year
+            if (year, month + 1) > (end.year, end.month):
+                break
+            try:
+                day = date(year, month + 1, dtstart.day)
+            except ValueError:
+                day = None  # 当月没有这一天（如 31 日）
+            if day and start <= day <= end:
+                yield day
+            months += interval
+
+
+class CalendarStore:
+    """SQLite 日历存储
+
+    使用 WAL 模式，读写互不阻塞；写入在 BEGIN IMMEDIATE 事务中完成，
+    多个进程（如工具工作进程）同时写入也不会互相覆盖。事件按 (date, time) 建索引，
+    日期范围查询只读取命中的行。重复事件以规则保存，起止日期存入 R-Tree 区间索引，
+    查询时只展开与窗口相交的规则。首次打开时自动导入旧的 JSON 事件文件。
+    """
+
+    def __init__(self, path: str, legacy_json: Optional[str] = None):
+        self.path = path
+        self._local = threading.local()
+        self._connect().executescript(_SCHEMA)
+        if legacy_json:
+            self.migrate_json(legacy_json)
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程一个连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """写事务，BEGIN IMMEDIATE 立即获取写锁，其他进程的写入在 busy timeout 内排队
+
+        每次写入递增 meta 表中的版本号，其他进程据此发现日历变化。
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("INSERT INTO meta (key, value) VALUES ('version', '1') "
+                         "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _to_row(event: Dict[str, str]) -> tuple:
+        return tuple(event.get(field) or "" for field in _EVENT_FIELDS)
+
+    def add(self, event: Dict[str, str]) -> int:
+        """添加事件，返回事件 id"""
+        with self._transaction() as conn:
+            return conn.execute(_INSERT_EVENT, self._to_row(event)).lastrowid
+
+    def add_many(self, events: Iterable[Dict[str, str]]):
+        """在一个事务中批量添加事件"""
+        with self._transaction() as conn:
+            conn.executemany(_INSERT_EVENT, (self._to_row(event) for event in events))
+
+    def add_series(self, series: Dict[str, Any]) -> int:
+        """添加重复事件规则，返回规则 id
+
+        series 包含 dtstart、freq（daily/weekly/monthly），可选 interval、byweekday（0 为周一，
+        逗号分隔）、until 或 count 以及 time、title、description。count 会换算为 until。
+        """
+        if series.get("freq") not in FREQUENCIES:
+            raise ValueError(f"不支持的重复频率: {series.get('freq')}")
+        series = dict(series)
+        if series.get("count") and not series.get("until"):
+            occurrences = expand_series(series, date.fromisoformat(series["dtstart"]), date.max)
+            for index, day in enumerate(occurrences, 1):
+                if index >= series["count"]:
+                    series["until"] = day.isoformat()
+                    break
+
+        start_day = date.fromisoformat(series["dtstart"]).toordinal()
+        end_day = date.fromisoformat(series["until"]).toordinal() if series.get("until") else _OPEN_END
+        with self._transaction() as conn:
+            series_id = conn.execute(
+                "INSERT INTO series (dtstart, until, freq, interval, byweekday, time, title, description) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (series["dtstart"], series.get("until"), series["freq"], series.get("interval") or 1,
+                 series.get("byweekday") or "", series.get("time") or "", series.get("title") or "",
+                 series.get("description") or "")
+            ).lastrowid
+            conn.execute("INSERT INTO series_span (id, start_day, end_day) VALUES (?, ?, ?)",
+                         (series_id, start_day, end_day))
+        return series_id
+
+    def remove(self, event_id: int) -> bool:
+        """删除事件"""
+        with self._transaction() as conn:
+            return conn.execute("DELETE FROM events WHERE id = ?", (event_id,)).rowcount > 0
+
+    def remove_series(self, series_id: int) -> bool:
+        """删除重复事件规则"""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM series_span WHERE id = ?", (series_id,))
+            return conn.execute("DELETE FROM series WHERE id = ?", (series_id,)).rowcount > 0
+
+    def _series_overlapping(self, start: date, end: date) -> List[Dict[str, Any]]:
+        """通过区间索引找出与 [start, end] 有交集的重复事件规则"""
+        rows = self._connect().execute(
+            "SELECT series.* FROM series_span JOIN series ON series.id = series_span.id "
+            "WHERE series_span.start_day <= ? AND series_span.end_day >= ?",
+            (end.toordinal(), start.toordinal())
+        )
+        return [dict(row) for row in rows]
+
+    def between(self, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        """查询 [start_date, end_date] 日期范围内的事件（YYYY-MM-DD），按日期和时间排序
+
+        重复事件只在该范围内展开，展开的事件带有 series_id。
+        """
+        rows = self._connect().execute(
+            "SELECT id, date, time, title, description FROM events "
+            "WHERE date BETWEEN ? AND ? ORDER BY date, time",
+            (start_date, end_date)
+        )
+        events = [dict(row) for row in rows]
+
+        start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+        occurrences = [
+            {"series_id": series["id"], "date": day.isoformat(), "time": series["time"],
+             "title": series["title"], "description": series["description"]}
+            for series in self._series_overlapping(start, end)
+            for day in expand_series(series, start, end)
+        ]
+        if not occurrences:
+            return events
+        return sorted(events + occurrences, key=lambda event: (event["date"], event["time"]))
+
+    def on(self, date: str) -> List[Dict[str, str]]:
+        """查询某一天的事件"""
+        return self.between(date, date)
+
+    def list(self, start_date: str = "", limit: int = 50) -> List[Dict[str, str]]:
+        """从 start_date 起按时间顺序列出事件"""
+        rows = self._connect().execute(
+            "SELECT id, date, time, title, description FROM events "
+            "WHERE date >= ? ORDER BY date, time LIMIT ?",
+            (start_date, limit)
+        )
+        return [dict(row) for row in rows]
+
+    def list_series(self, start_date: str = "") -> List[Dict[str, Any]]:
+        """列出在 start_date 当天或之后仍有发生的重复事件规则"""
+        start_day = date.fromisoformat(start_date).toordinal() if start_date else 0
+        rows = self._connect().execute(
+            "SELECT series.* FROM series_span JOIN series ON series.id = series_span.id "
+            "WHERE series_span.end_day >= ? ORDER BY series.time",
+            (start_day,)
+        )
+        return [dict(row) for row in rows]
+
+    def version(self) -> int:
+        """数据版本号，任何进程写入后都会变化"""
+        row = self._connect().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return int(row[0]) if row else 0
+
+    def count(self, start_date: str = "") -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM events WHERE date >= ?", (start_date,)).fetchone()[0]
+
+    def migrate_json(self, json_path: str) -> int:
+        """导入旧的 JSON 事件文件，导入后将其重命名为 .migrated，返回导入的事件数"""
+        if not os.path.exists(json_path):
+            return 0
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                events = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"读取旧日历文件失败: {str(e)}")
+            return 0
+
+        events = [event for event in events if isinstance(event, dict) and event.get("date")]
+        with self._transaction() as conn:
+            # 另一个进程可能已经完成了迁移
+            migrated = conn.execute("SELECT value FROM meta WHERE key = 'migrated_json'").fetchone()
+            if migrated is None:
+                conn.executemany(_INSERT_EVENT, [self._to_row(event) for event in events])
+                conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_json', ?)",
+                             (os.path.abspath(json_path),))
+
+        if migrated is not None:
+            return 0
+        os.replace(json_path, json_path + ".migrated")
+        print(f"已将 {len(events)} 个日历事件从 {json_path} 迁移到 {self.path}")
+        return len(events)
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -1,7 +1,63 @@
-from datetime import datetime, timedelta
+import re
+from datetime import datetime, date, timedelta
+from typing import Optional, Tuple
 from .base_tool import BaseAssistantTool
-import json
-import os
+from .calendar_store import CalendarStore
+from .time_parser import NUMBER, parse_chinese_number, parse_time_expression
+
+ADD_KEYWORDS = ["添加", "创建", "新建"]
+DELETE_KEYWORDS = ["删除", "取消", "删掉"]
+TODAY_KEYWORDS = ["今天", "今日", "现在", "当前"]
+RANGE_KEYWORDS = ["明天", "后天", "下周", "本周", "这周", "未来", "接下来"]
+LIST_KEYWORDS = ["所有", "列表", "显示"]
+
+WEEKDAY_NAMES = "一二三四五六日"
+
+_RECURRENCE = re.compile(rf"每(?:隔)?({NUMBER})?个?(天|周|星期|礼拜|月)(?:的?(?:周|星期|礼拜))?([一二三四五六日天](?:[、和,，]?[一二三四五六日天])*)?")
+# 添加事件时从标题中去掉的指令词
+_COMMAND_WORDS = re.compile(r"请|帮我|给我|麻烦|添加|创建|新建|删除|删掉|取消|安排|记录|设置|提醒我|提醒|一个|一下|日程|事件|到日历中?|在日历中?|日历")
+_TITLE_STRIP = re.compile(r"^[\s\0，。,.、：:的在和跟与]+|[\s\0，。,.、！!？?的]+$")
+
+
+def parse_range(query: str, today: date) -> Optional[Tuple[date, date, str]]:
+    """解析查询中的日期范围，返回 (开始日期, 结束日期, 描述)"""
+    match = re.search(rf"(?:未来|接下来)\s*({NUMBER})\s*天", query)
+    if match:
+        days = parse_chinese_number(match.group(1)) or 7
+        return today, today + timedelta(days=days - 1), f"未来{days}天"
+    if "下周" in query:
+        start = today + timedelta(days=7 - today.weekday())
+        return start, start + timedelta(days=6), "下周"
+    if "本周" in query or "这周" in query:
+        return today, today + timedelta(days=6 - today.weekday()), "本周"
+    if "大后天" in query:
+        day = today + timedelta(days=3)
+        return day, day, "大后天"
+    if "后天" in query:
+        day = today + timedelta(days=2)
+        return day, day, "后天"
+    if "明天" in query:
+        day = today + timedelta(days=1)
+        return day, day, "明天"
+    if "未来" in query or "接下来" in query:
+        return today, today + timedelta(days=6), "未来7天"
+    return None
+
+
+def parse_recurrence(query: str) -> Optional[dict]:
+    """解析查询中的重复规则（每天 / 每周X / 每隔N周 / 每月）"""
+    match = _RECURRENCE.search(query)
+    if not match:
+        return None
+    interval = (parse_chinese_number(match.group(1)) or 1) if match.group(1) else 1
+    unit = match.group(2)
+    if unit == "天":
+        return {"freq": "daily", "interval": interval}
+    if unit == "月":
+        return {"freq": "monthly", "interval": interval}
+    weekdays = [WEEKDAY_NAMES.index("日" if char == "天" else char)
+                for char in (match.group(3) or "") if char in WEEKDAY_NAMES or char == "天"]
+    return {"freq": "weekly", "interval": interval, "byweekday": ",".join(str(d) for d in weekdays)}
 
 
 class CalendarTool(BaseAssistantTool):
@@ -9,80 +65,185 @@ class CalendarTool(BaseAssistantTool):
 
     def __init__(self, name:str, config : dict):
         super().__init__(name, config)
-        self.events_file = "calendar_events.json"
-        self.events = self.load_events()
+        config = config or {}
+        self.events_file = config.get("events_file", "calendar_events.json")
+        self.store = CalendarStore(config.get("database", "calendar.db"), legacy_json=self.events_file)
+        self.list_limit = config.get("list_limit", 50)
 
     def run(self, query: str) -> str:
         query_lower = query.lower()
 
-        if any(keyword in query_lower for keyword in ["今天", "今日", "现在", "当前"]):
-            return self.get_today_schedule()
-        elif any(keyword in query_lower for keyword in ["添加", "创建", "新建"]):
+        if any(keyword in query_lower for keyword in DELETE_KEYWORDS):
+            return self.delete_event(query)
+        elif any(keyword in query_lower for keyword in ADD_KEYWORDS):
             return self.add_event(query)
-        elif any(keyword in query_lower for keyword in ["明天", "下周", "未来"]):
+        elif any(keyword in query_lower for keyword in RANGE_KEYWORDS):
             return self.get_future_schedule(query)
-        elif any(keyword in query_lower for keyword in ["所有", "列表", "显示"]):
+        elif any(keyword in query_lower for keyword in TODAY_KEYWORDS):
+            return self.get_today_schedule()
+        elif any(keyword in query_lower for keyword in LIST_KEYWORDS):
             return self.list_events()
         else:
             return self.get_today_schedule()
 
+    @classmethod
+    def speculation_key(cls, query: str):
+        """只有读取日程的查询可以推测执行，键中包含查询的日期范围"""
+        query_lower = query.lower()
+        today = date.today()
+        if any(keyword in query_lower for keyword in ADD_KEYWORDS + DELETE_KEYWORDS):
+            return None
+        if any(keyword in query_lower for keyword in RANGE_KEYWORDS):
+            start, end, _ = parse_range(query, today) or (today, today, "")
+            return f"range:{start}:{end}"
+        if any(keyword in query_lower for keyword in TODAY_KEYWORDS):
+            return f"range:{today}:{today}"
+        if any(keyword in query_lower for keyword in LIST_KEYWORDS):
+            return f"list:{today}"
+        return f"range:{today}:{today}"
+
+    @classmethod
+    def cache_key(cls, query: str):
+        """写入类查询不缓存，读取类查询按日期范围缓存
+
+        默认配置不缓存日历：其他进程（API 服务、其他 worker）的写入不会使本进程的缓存失效，
+        而按索引读取 SQLite 本身足够快
+        """
+        return cls.speculation_key(query)
+
     def get_today_schedule(self) -> str:
         """获取今天日程"""
         today = datetime.now().strftime("%Y-%m-%d")
-        today_events = [e for e in self.events if e.get("date") == today]
+        today_events = self.store.on(today)
 
         if today_events:
             schedule = f"今天({today})的安排：\n"
-            for event in sorted(today_events, key=lambda x: x.get("time", "")):
+            for event in today_events:
                 schedule += f"- {event.get('time', '')} {event.get('title', '')}\n"
             return schedule
         else:
             return f"今天({today})没有安排任何活动。"
 
     def add_event(self, query: str) -> str:
-        """添加事件"""
-        # 简化实现 - 实际应该解析查询中的时间、标题等信息
+        """添加事件，从查询中解析日期、时间和标题，"每天/每周一/每月"等重复事件保存为规则"""
+        recurrence = parse_recurrence(query)
+        text = _RECURRENCE.sub("", query) if recurrence else query
+        when = parse_time_expression(text)
+
+        event_date = when.date or date.today()
+        event_time = when.time.strftime("%H:%M") if when.time else "10:00"
+        end_time = when.end()
+        if when.time and end_time:
+            event_time += f"-{end_time.strftime('%H:%M')}"
         new_event = {
-            "date": datetime.now().strftime("%Y-%m-%d"),
-            "time": "10:00",
-            "title": "新事件",
+            "date": event_date.isoformat(),
+            "time": event_time,
+            "title": self.extract_title(when.remainder()),
             "description": query
         }
 
-        self.events.append(new_event)
-        self.save_events()
-        return "已为您添加到日历中。"
+        if recurrence:
+            self.store.add_series(dict(recurrence, dtstart=new_event.pop("date"), **new_event))
+            schedule = f"{self.describe_series(dict(recurrence, dtstart=event_date.isoformat()))} {event_time}"
+        else:
+            self.store.add(new_event)
+            schedule = f"{new_event['date']} 星期{WEEKDAY_NAMES[event_date.weekday()]} {event_time}"
+        self.emit("calendar.changed")
+        return f"已为您添加到日历中：{schedule} {new_event['title']}"
+
+    def delete_event(self, query: str) -> str:
+        """按日期、时间和标题删除事件，"删除每周一的站会"删除重复事件规则"""
+        recurrence = parse_recurrence(query)
+        text = _RECURRENCE.sub("", query) if recurrence else query
+        when = parse_time_expression(text)
+        title = self.extract_title(when.remainder())
+        title = "" if title == "新事件" else title
+        event_time = when.time.strftime("%H:%M") if when.time else None
+
+        def matches(event: dict) -> bool:
+            if title and title not in event["title"] and event["title"] not in title:
+                return False
+            return event_time is None or event["time"].startswith(event_time)
+
+        if recurrence:
+            candidates = [rule for rule in self.store.list_series(date.today().isoformat()) if matches(rule)]
+        else:
+            day = when.date or date.today()
+            candidates = [event for event in self.store.on(day.isoformat())
+                          if not event.get("series_id") and matches(event)]
+
+        if not candidates:
+            return "没有找到要删除的日程。"
+        if len(candidates) > 1 and not title:
+            listed = "".join(f"\n- {event.get('date', '')} {event['time']} {event['title']}" for event in candidates)
+            return f"找到多个日程，请说明要删除哪一个：{listed}"
+
+        for event in candidates:
+            if recurrence:
+                self.store.remove_series(event["id"])
+            else:
+                self.store.remove(event["id"])
+        self.emit("calendar.changed")
+        return "已删除：" + "、".join(event["title"] for event in candidates)
+
+    @staticmethod
+    def extract_title(text: str) -> str:
+        """去掉时间表达式后的文本中再去掉指令词，剩下的作为事件标题"""
+        title = _TITLE_STRIP.sub("", _COMMAND_WORDS.sub("", text))
+        return title or "新事件"
 
     def get_future_schedule(self, query: str) -> str:
-        """获取未来日程"""
-        # 简化实现
-        return "明天：上午项目评审；后天：团队建设活动。"
+        """获取明天、后天、本周、下周或未来N天的日程"""
+        today = date.today()
+        start, end, label = parse_range(query, today) or (today, today + timedelta(days=6), "未来7天")
+        events = self.store.between(start.isoformat(), end.isoformat())
+
+        span = f"{start}" if start == end else f"{start} 至 {end}"
+        if not events:
+            return f"{label}({span})没有安排任何活动。"
+
+        schedule = f"{label}({span})的安排：\n"
+        for event in events:
+            day = date.fromisoformat(event["date"])
+            prefix = "" if start == end else f"{event['date']} 星期{WEEKDAY_NAMES[day.weekday()]} "
+            schedule += f"- {prefix}{event.get('time', '')} {event.get('title', '')}\n"
+        return schedule
 
     def list_events(self) -> str:
-        """列出所有事件"""
-        if not self.events:
+        """列出今天起的事件和重复事件"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        events = self.store.list(today, self.list_limit)
+        series = self.store.list_series(today)
+        if not events and not series:
             return "日历中没有事件。"
 
         result = "所有日历事件：\n"
-        for event in self.events:
+        for event in events:
             result += f"- {event.get('date')} {event.get('time', '')} {event.get('title', '')}\n"
 
+        total = self.store.count(today)
+        if total > len(events):
+            result += f"……共 {total} 个事件，仅显示最近的 {len(events)} 个\n"
+
+        if series:
+            result += "重复事件：\n"
+            for rule in series:
+                result += f"- {self.describe_series(rule)} {rule['time']} {rule['title']}\n"
         return result
 
-    def load_events(self) -> list:
-        """加载事件"""
-        if os.path.exists(self.events_file):
-            try:
-                with open(self.events_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                pass
-        return []
-
-    def save_events(self):
-        """保存事件"""
-        try:
-            with open(self.events_file, 'w', encoding='utf-8') as f:
-                json.dump(self.events, f, ensure_ascii=False, indent=2)
-        except:
-            pass
\ No newline at end of file
+    @staticmethod
+    def describe_series(rule: dict) -> str:
+        """重复规则的中文描述"""
+        interval = rule.get("interval") or 1
+        every = "每" if interval == 1 else f"每{interval}"
+        if rule["freq"] == "daily":
+            text = f"{every}天"
+        elif rule["freq"] == "monthly":
+            text = f"{every}个月{date.fromisoformat(rule['dtstart']).day}日"
+        else:
+            weekdays = [int(d) for d in rule["byweekday"].split(",")] if rule.get("byweekday") \
+                else [date.fromisoformat(rule["dtstart"]).weekday()]
+            text = f"{every}周" + "、".join(WEEKDAY_NAMES[d] for d in weekdays)
+        if rule.get("until"):
+            text += f"（至{rule['until']}）"
+        return text
@@ -0,0 +1,502 @@
+"""
+文件内容索引
+
+对配置的根目录下的文本类文件建立倒排索引：中文按相邻字符二元组、英文和数字按单词切分，
+查询按 BM25 排序，不需要在查询时读取磁盘上的文件。
+
+索引由若干不可变的段组成。每次增量扫描把新增和修改过的文件写成一个新段；
+修改和删除的文件先标记为已删除，段数超过上限时合并所有段并清除已删除的文档。
+每个段的倒排表（文档 id 和词频）和文档长度表保存在文件中并以 mmap 方式读取，
+词典和文档信息保存在 SQLite 中，常驻内存只有打开的映射和已删除文档的集合。
+
+    python -m tools.content_index build 根目录 [...] [--directory content_index]
+    python -m tools.content_index search 关键词 [--directory content_index]
+"""
+
+import argparse
+import math
+import mmap
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import zipfile
+from array import array
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .file_index import DEFAULT_EXCLUDE
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    deleted INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    docs INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS terms (
+    term TEXT NOT NULL,
+    segment INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (term, segment)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+DEFAULT_EXTENSIONS = (".txt", ".md", ".markdown", ".rst", ".csv", ".log", ".json", ".html", ".htm", ".xml", ".docx")
+
+# 英文单词和数字整体作为词，其他文字（中文等）切成二元组
+_TOKEN = re.compile(r"[a-z0-9]+|[^\W\d_a-z]+")
+_TAG = re.compile(r"<[^>]+>")
+_MAX_WORD = 32
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+class ContentHit(NamedTuple):
+    """一条内容查询结果"""
+    path: str
+    score: float
+    matched: int  # 命中的查询词数
+    snippet: str
+
+
+def tokenize(text: str) -> List[str]:
+    """中文相邻字符二元组，英文单词和数字整体（全角转半角、小写）"""
+    tokens = []
+    for run in _TOKEN.findall(unicodedata.normalize("NFKC", text).lower()):
+        if run[0] < "\x80":
+            if len(run) <= _MAX_WORD:
+                tokens.append(run)
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def extract_text(path: str, max_bytes: int) -> str:
+    """读取文本类文件的内容；docx 取正文，html/xml 去掉标签"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".docx":
+        with zipfile.ZipFile(path) as archive:
+            xml = archive.read("word/document.xml")[:max_bytes].decode("utf-8", errors="ignore")
+        return _TAG.sub("", xml.replace("</w:p>", "\n"))
+
+    with open(path, "rb") as f:
+        data = f.read(max_bytes)
+    for encoding in ("utf-8", "gb18030"):
+        try:
+            text = data.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        text = data.decode("utf-8", errors="ignore")
+    return _TAG.sub(" ", text) if extension in (".html", ".htm", ".xml") else text
+
+
+class _Segment:
+    """一个只读段
+
+    倒排表是 (doc_id, tf) 交错存放的 uint32 数组；文档长度表第一个数是段内最小的 doc_id，
+    之后按 doc_id 连续存放长度（已删除的文档留空），按 id 直接取长度。
+    """
+
+    def __init__(self, directory: str, segment_id: int):
+        self.id = segment_id
+        self.postings = self._map(os.path.join(directory, f"seg_{segment_id}.post"))
+        docs = self._map(os.path.join(directory, f"seg_{segment_id}.docs"))
+        self.base, self.lengths = (docs[0], docs[1:]) if len(docs) else (0, docs)
+
+    @staticmethod
+    def _map(path: str) -> memoryview:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return memoryview(b"").cast("I")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(mapped).cast("I")
+
+    def documents(self) -> Iterable[Tuple[int, int]]:
+        """(doc_id, 长度)"""
+        return ((self.base + index, length) for index, length in enumerate(self.lengths) if length)
+
+
+def _write_segment(directory: str, segment_id: int, postings: Dict[str, List[Tuple[int, int]]],
+                   lengths: Dict[int, int]) -> List[tuple]:
+    """写入段文件，返回词典行 (term, segment, offset, count)"""
+    data = array("I")
+    terms = []
+    for term in sorted(postings):
+        entries = postings[term]
+        terms.append((term, segment_id, len(data) // 2, len(entries)))
+        for doc_id, tf in entries:
+            data.append(doc_id)
+            data.append(tf)
+    docs = array("I")
+    if lengths:
+        base = min(lengths)
+        docs.append(base)
+        docs.extend(lengths.get(doc_id, 0) for doc_id in range(base, max(lengths) + 1))
+
+    for suffix, content in (("post", data), ("docs", docs)):
+        path = os.path.join(directory, f"seg_{segment_id}.{suffix}")
+        with open(path + ".tmp", "wb") as f:
+            content.tofile(f)
+        os.replace(path + ".tmp", path)
+    return terms
+
+
+class ContentIndex:
+    """增量更新的文件内容倒排索引"""
+
+    def __init__(self, directory: str, roots: Iterable[str], extensions: Iterable[str] = DEFAULT_EXTENSIONS,
+                 exclude: Iterable[str] = DEFAULT_EXCLUDE, max_file_bytes: int = 2_000_000,
+                 segment_docs: int = 2000, max_segments: int = 8):
+        self.directory = directory
+        self.roots = [os.path.abspath(os.path.expanduser(root)) for root in roots]
+        self.extensions = {ext.lower() for ext in extensions}
+        self.exclude = set(exclude)
+        self.max_file_bytes = max_file_bytes
+        self.segment_docs = segment_docs
+        self.max_segments = max_segments
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "content.db")
+        self._local = threading.local()
+        self._segments: Dict[int, _Segment] = {}
+        self._segments_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程一个连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @property
+    def ready(self) -> bool:
+        """是否已完成过一次完整扫描"""
+        return self._connect().execute("SELECT 1 FROM meta WHERE key = 'last_scan'").fetchone() is not None
+
+    # ---- 更新 ----
+
+    def _walk(self) -> Iterable[Tuple[str, float, int]]:
+        """遍历根目录下需要索引的文件：(路径, 修改时间, 大小)"""
+        stack = list(reversed(self.roots))
+        while stack:
+            path = stack.pop()
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.name in self.exclude or entry.name.startswith("."):
+                            continue
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            elif os.path.splitext(entry.name)[1].lower() in self.extensions:
+                                stat = entry.stat(follow_symlinks=False)
+                                yield entry.path, stat.st_mtime, stat.st_size
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+
+    def _next_segment_id(self, conn: sqlite3.Connection) -> int:
+        return (conn.execute("SELECT MAX(id) FROM segments").fetchone()[0] or 0) + 1
+
+    def _flush(self, postings: Dict[str, List[Tuple[int, int]]], docs: List[tuple], stale: List[int]):
+        """把缓冲的文档写成一个新段（文档 id 在写入时分配），同时删除这些文件的旧版本"""
+        if not docs:
+            return
+        with self._transaction() as conn:
+            conn.executemany("UPDATE docs SET deleted = 1 WHERE id = ?", [(doc_id,) for doc_id in stale])
+            segment_id = self._next_segment_id(conn)
+            conn.execute("INSERT INTO segments (id, docs) VALUES (?, 0)", (segment_id,))
+            first_id = (conn.execute("SELECT MAX(id) FROM docs").fetchone()[0] or 0) + 1
+            lengths = {first_id + index: doc[3] for index, doc in enumerate(docs)}
+            remapped = {term: [(first_id + local, tf) for local, tf in entries] for term, entries in postings.items()}
+            terms = _write_segment(self.directory, segment_id, remapped, lengths)
+            conn.executemany("INSERT INTO docs (id, path, mtime, size, length) VALUES (?, ?, ?, ?, ?)",
+                             [(first_id + index,) + doc for index, doc in enumerate(docs)])
+            conn.executemany("INSERT INTO terms (term, segment, offset, count) VALUES (?, ?, ?, ?)", terms)
+            conn.execute("UPDATE segments SET docs = ? WHERE id = ?", (len(docs), segment_id))
+
+    def update(self) -> Dict[str, float]:
+        """增量扫描：新增和修改过的文件写成新段，修改和删除的文件标记为已删除"""
+        start = time.perf_counter()
+        conn = self._connect()
+        known = {path: (doc_id, mtime, size) for doc_id, path, mtime, size in
+                 conn.execute("SELECT id, path, mtime, size FROM docs WHERE deleted = 0")}
+        stats = {"added": 0, "updated": 0, "removed": 0, "tokens": 0}
+
+        seen = set()
+        stale: List[int] = []
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        docs: List[tuple] = []
+        for path, mtime, size in self._walk():
+            seen.add(path)
+            old = known.get(path)
+            if old and (old[1], old[2]) == (mtime, size):
+                continue
+            try:
+                tokens = tokenize(extract_text(path, self.max_file_bytes))
+            except (OSError, zipfile.BadZipFile, KeyError) as e:
+                print(f"读取 {path} 失败: {str(e)}")
+                continue
+            if old:
+                stale.append(old[0])
+                stats["updated"] += 1
+            else:
+                stats["added"] += 1
+            local_id = len(docs)
+            for term, tf in Counter(tokens).items():
+                postings[term].append((local_id, tf))
+            docs.append((path, mtime, size, len(tokens)))
+            stats["tokens"] += len(tokens)
+            if len(docs) >= self.segment_docs:
+                self._flush(postings, docs, stale)
+                postings, docs, stale = defaultdict(list), [], []
+
+        self._flush(postings, docs, stale)
+        removed = [doc_id for path, (doc_id, _, _) in known.items() if path not in seen]
+        stats["removed"] = len(removed)
+        with self._transaction() as conn:
+            conn.executemany("UPDATE docs SET deleted = 1 WHERE id = ?", [(doc_id,) for doc_id in removed])
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_scan', ?)", (str(time.time()),))
+
+        if conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0] > self.max_segments:
+            self.merge()
+        stats["seconds"] = time.perf_counter() - start
+        return stats
+
+    def merge(self):
+        """把所有段合并为一个，清除已删除的文档"""
+        conn = self._connect()
+        deleted = {row[0] for row in conn.execute("SELECT id FROM docs WHERE deleted = 1")}
+        segment_ids = [row[0] for row in conn.execute("SELECT id FROM segments ORDER BY id")]
+        segments = {segment_id: self._segment(segment_id) for segment_id in segment_ids}
+
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for term, segment_id, offset, count in conn.execute(
+                "SELECT term, segment, offset, count FROM terms ORDER BY term, segment"):
+            data = segments[segment_id].postings[offset * 2:(offset + count) * 2]
+            entries = [(data[i], data[i + 1]) for i in range(0, len(data), 2) if data[i] not in deleted]
+            if entries:
+                postings.setdefault(term, []).extend(entries)
+        lengths = {doc_id: length for segment in segments.values()
+                   for doc_id, length in segment.documents() if doc_id not in deleted}
+
+        with self._transaction() as conn:
+            merged_id = self._next_segment_id(conn)
+            terms = _write_segment(self.directory, merged_id, postings, lengths)
+            conn.execute("DELETE FROM terms")
+            conn.execute("DELETE FROM segments")
+            conn.execute("INSERT INTO segments (id, docs) VALUES (?, ?)", (merged_id, len(lengths)))
+            conn.executemany("INSERT INTO terms (term, segment, offset, count) VALUES (?, ?, ?, ?)", terms)
+            conn.executemany("DELETE FROM docs WHERE id = ?", [(doc_id,) for doc_id in deleted])
+
+        self._drop_segments(segment_ids)
+        for segment_id in segment_ids:
+            for suffix in ("post", "docs"):
+                try:
+                    os.remove(os.path.join(self.directory, f"seg_{segment_id}.{suffix}"))
+                except OSError:
+                    pass
+
+    def _claim_scan(self, interval: float) -> bool:
+        """获取扫描租约，距上次开始扫描不足 interval 秒时放弃"""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'scan_claimed'").fetchone()
+            now = time.time()
+            if row and now - float(row[0]) < interval:
+                return False
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('scan_claimed', ?)", (str(now),))
+            return True
+
+    def start_background(self, interval: float = 900):
+        """启动后台更新线程，每 interval 秒增量扫描一次"""
+        if self._thread is not None:
+            return
+
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    if self._claim_scan(interval):
+                        stats = self.update()
+                        if stats["added"] or stats["updated"] or stats["removed"]:
+                            print(f"内容索引已更新：新增 {stats['added']}，更新 {stats['updated']}，"
+                                  f"删除 {stats['removed']}，耗时 {stats['seconds']:.2f} 秒")
+                except Exception as e:
+                    print(f"内容索引更新失败: {str(e)}")
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=loop, name="content-index", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    # ---- 查询 ----
+
+    def _segment(self, segment_id: int) -> _Segment:
+        segment = self._segments.get(segment_id)
+        if segment is None:
+            with self._segments_lock:
+                segment = self._segments.get(segment_id)
+                if segment is None:
+                    segment = _Segment(self.directory, segment_id)
+                    self._segments = {**self._segments, segment_id: segment}
+        return segment
+
+    def _drop_segments(self, segment_ids: Iterable[int]):
+        """不再使用的段只从表中移除，映射留给正在进行的查询，随对象回收释放"""
+        with self._segments_lock:
+            self._segments = {key: value for key, value in self._segments.items() if key not in set(segment_ids)}
+
+    def search(self, query: str, limit: int = 10) -> List[ContentHit]:
+        """BM25 排序的内容查询，命中查询词更多的文档排在前面"""
+        try:
+            return self._search(query, limit)
+        except FileNotFoundError:
+            # 查询期间其他进程合并了段，按新的段重新查询
+            return self._search(query, limit)
+
+    def _search(self, query: str, limit: int) -> List[ContentHit]:
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        conn = self._connect()
+        live, total_length = conn.execute("SELECT COUNT(*), SUM(length) FROM docs WHERE deleted = 0").fetchone()
+        if not live:
+            return []
+        # BM25 的长度归一化 k1 * (1 - b + b * dl / avgdl)
+        fixed_norm = BM25_K1 * (1 - BM25_B)
+        length_norm = BM25_K1 * BM25_B / (total_length / live or 1)
+        deleted = {row[0] for row in conn.execute("SELECT id FROM docs WHERE deleted = 1")}
+        live_segments = {row[0] for row in conn.execute("SELECT id FROM segments")}
+        self._drop_segments([segment_id for segment_id in self._segments if segment_id not in live_segments])
+
+        scores: Dict[int, float] = defaultdict(float)
+        matched: Dict[int, int] = defaultdict(int)
+        for term in terms:
+            lists = []
+            for segment_id, offset, count in conn.execute(
+                    "SELECT segment, offset, count FROM terms WHERE term = ?", (term,)):
+                segment = self._segment(segment_id)
+                lists.append((segment, segment.postings[offset * 2:(offset + count) * 2]))
+            frequency = sum(len(data) // 2 for _, data in lists)
+            if not frequency:
+                continue
+            idf = math.log(1 + (live - frequency + 0.5) / (frequency + 0.5))
+            weight = idf * (BM25_K1 + 1)
+            for segment, data in lists:
+                lengths, base = segment.lengths, segment.base
+                for doc_id, tf in zip(data[0::2], data[1::2]):
+                    if doc_id in deleted:
+                        continue
+                    scores[doc_id] += weight * tf / (tf + fixed_norm + length_norm * lengths[doc_id - base])
+                    matched[doc_id] += 1
+
+        ranked = sorted(scores, key=lambda doc_id: (-matched[doc_id], -scores[doc_id]))[:limit]
+        if not ranked:
+            return []
+        paths = dict(conn.execute(
+            f"SELECT id, path FROM docs WHERE id IN ({','.join('?' * len(ranked))})", ranked).fetchall())
+        return [ContentHit(paths[doc_id], scores[doc_id], matched[doc_id], self._snippet(paths[doc_id], query))
+                for doc_id in ranked if doc_id in paths]
+
+    def _snippet(self, path: str, query: str, width: int = 20) -> str:
+        """结果摘要：查询中最长的一段文字在文件中第一次出现处的上下文"""
+        try:
+            text = re.sub(r"\s+", " ", extract_text(path, self.max_file_bytes))
+        except (OSError, zipfile.BadZipFile, KeyError):
+            return ""
+        folded = unicodedata.normalize("NFKC", text).lower()
+        for needle in sorted(_TOKEN.findall(unicodedata.normalize("NFKC", query).lower()), key=len, reverse=True):
+            position = folded.find(needle)
+            if position >= 0:
+                start = max(0, position - width)
+                return ("…" if start else "") + text[start:position + len(needle) + width].strip() + "…"
+        return ""
+
+    def get_stats(self) -> Dict[str, float]:
+        """文档数、段数和索引占用的磁盘空间"""
+        conn = self._connect()
+        docs, deleted = conn.execute("SELECT COUNT(*) - COALESCE(SUM(deleted), 0), COALESCE(SUM(deleted), 0) "
+                                     "FROM docs").fetchone()
+        segments = conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+        size = sum(os.path.getsize(os.path.join(self.directory, name)) for name in os.listdir(self.directory))
+        return {"docs": docs, "deleted": deleted, "segments": segments, "bytes": size}
+
+    def close(self):
+        self.stop()
+        self._drop_segments(list(self._segments))
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文件内容索引")
+    parser.add_argument("--directory", default="content_index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="扫描目录并增量更新索引")
+    build_parser.add_argument("roots", nargs="+")
+    search_parser = subparsers.add_parser("search", help="查询文件内容")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        index = ContentIndex(args.directory, args.roots)
+        stats = index.update()
+        info = index.get_stats()
+        print(f"新增 {stats['added']}，更新 {stats['updated']}，删除 {stats['removed']}，"
+              f"耗时 {stats['seconds']:.2f} 秒")
+        print(f"索引包含 {info['docs']} 个文档、{info['segments']} 个段，"
+              f"占用 {info['bytes'] / 1024 / 1024:.1f} MB")
+        return
+
+    index = ContentIndex(args.directory, [])
+    start = time.perf_counter()
+    hits = index.search(args.query, args.limit)
+    elapsed = (time.perf_counter() - start) * 1000
+    for hit in hits:
+        print(f"{hit.score:8.3f}  {hit.path}\n          {hit.snippet}")
+    print(f"{len(hits)} 个结果，耗时 {elapsed:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
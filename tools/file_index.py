@@ -0,0 +1,430 @@
+"""
+文件名索引
+
+后台扫描配置的根目录，把文件名保存在 SQLite 中：规范化的文件名建 B-Tree 索引用于前缀查询，
+文件名的字符二元组写入 FTS5 倒排索引用于子串和模糊查询，中英文文件名都在毫秒内返回。
+重新扫描时只列出修改时间变化的目录，按差异增删记录。
+
+    python -m tools.file_index build 根目录 [...] [--database file_index.db]
+    python -m tools.file_index search 关键词 [--database file_index.db]
+"""
+
+import argparse
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    mtime REAL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    dir_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    is_dir INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    UNIQUE (dir_id, name)
+);
+CREATE INDEX IF NOT EXISTS entries_by_key ON entries (key);
+CREATE VIRTUAL TABLE IF NOT EXISTS name_grams USING fts5(grams, content='', tokenize='ascii');
+CREATE VIRTUAL TABLE IF NOT EXISTS name_gram_counts USING fts5vocab(name_grams, 'row');
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+DEFAULT_EXCLUDE = (".git", ".svn", "node_modules", "__pycache__", ".cache", ".Trash", "Library")
+
+_RUN = re.compile(r"[^\W_]+")
+
+# 每个写事务处理的目录数
+_BATCH_DIRS = 200
+
+
+class FileEntry(NamedTuple):
+    """索引中的一个文件或目录"""
+    path: str
+    name: str
+    is_dir: bool
+    mtime: float
+    size: int
+
+
+def normalize_name(name: str) -> str:
+    """全角转半角并转为小写"""
+    return unicodedata.normalize("NFKC", name).lower()
+
+
+def name_grams(key: str) -> str:
+    """文件名的二元组序列
+
+    文件名按标点和空白切成若干段，每段产生相邻字符二元组，末尾再加最后一个字符，
+    如 "季度报告.docx" -> "季度 度报 报告 告 do oc cx x"。子串查询是二元组的短语查询，
+    单字查询是前缀查询。
+    """
+    grams = []
+    for run in _RUN.findall(key):
+        grams.extend(run[i:i + 2] for i in range(len(run) - 1))
+        grams.append(run[-1])
+    return " ".join(grams)
+
+
+def _bigrams(key: str) -> Set[str]:
+    return {run[i:i + 2] for run in _RUN.findall(key) for i in range(max(1, len(run) - 1))}
+
+
+def _substring_query(key: str) -> Optional[str]:
+    parts = []
+    for run in _RUN.findall(key):
+        if len(run) == 1:
+            parts.append(f'"{run}"*')
+        else:
+            parts.append('"' + " ".join(run[i:i + 2] for i in range(len(run) - 1)) + '"')
+    return " AND ".join(parts) or None
+
+
+def _subtree_bounds(path: str):
+    """path 之下的目录路径范围（"/" 的下一个字符是 "0"）"""
+    return path.rstrip(os.sep) + os.sep, path.rstrip(os.sep) + chr(ord(os.sep) + 1)
+
+
+class FileIndex:
+    """持久化的文件名索引
+
+    使用 WAL 模式，查询不受后台扫描影响。多个进程共用同一个数据库时，
+    通过 meta 表中的扫描租约保证同一时间只有一个进程在扫描。
+    """
+
+    def __init__(self, path: str, roots: Iterable[str], exclude: Iterable[str] = DEFAULT_EXCLUDE,
+                 max_depth: int = 8, extensions: Optional[Iterable[str]] = None, include_hidden: bool = False):
+        self.path = path
+        self.roots = [os.path.abspath(os.path.expanduser(root)) for root in roots]
+        self.exclude = set(exclude)
+        self.max_depth = max_depth
+        self.extensions = {ext.lower() for ext in extensions} if extensions else None
+        self.include_hidden = include_hidden
+        self._local = threading.local()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程一个连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._connect().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    @property
+    def ready(self) -> bool:
+        """是否已完成过一次完整扫描"""
+        return self._meta("last_scan") is not None
+
+    # ---- 扫描 ----
+
+    def _list_dir(self, path: str) -> Dict[str, tuple]:
+        """列出目录中需要索引的项：名称 -> (是否目录, 修改时间, 大小)"""
+        listing = {}
+        with os.scandir(path) as entries:
+            for entry in entries:
+                name = entry.name
+                if name in self.exclude or (name.startswith(".") and not self.include_hidden):
+                    continue
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    if not is_dir and self.extensions is not None \
+                            and os.path.splitext(name)[1].lower() not in self.extensions:
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                listing[name] = (is_dir, stat.st_mtime, 0 if is_dir else stat.st_size)
+        return listing
+
+    @staticmethod
+    def _delete_rows(conn: sqlite3.Connection, rows: List[tuple]):
+        """删除 (id, key) 行及其倒排索引"""
+        conn.executemany("INSERT INTO name_grams (name_grams, rowid, grams) VALUES ('delete', ?, ?)",
+                         [(row_id, name_grams(key)) for row_id, key in rows])
+        conn.executemany("DELETE FROM entries WHERE id = ?", [(row_id,) for row_id, _ in rows])
+
+    def _remove_subtree(self, conn: sqlite3.Connection, path: str):
+        """删除目录 path 及其下所有目录的记录和其中的文件记录（path 在上级目录中的记录由调用方处理）"""
+        low, high = _subtree_bounds(path)
+        dir_ids = [row[0] for row in conn.execute(
+            "SELECT id FROM dirs WHERE path = ? OR (path >= ? AND path < ?)", (path, low, high))]
+        for dir_id in dir_ids:
+            self._delete_rows(conn, conn.execute("SELECT id, key FROM entries WHERE dir_id = ?", (dir_id,)).fetchall())
+        conn.executemany("DELETE FROM dirs WHERE id = ?", [(dir_id,) for dir_id in dir_ids])
+
+    def _sync_dir(self, conn: sqlite3.Connection, dir_id: int, path: str, mtime: float,
+                  stats: Dict[str, int]) -> List[str]:
+        """按目录当前内容更新记录，返回子目录名"""
+        listing = self._list_dir(path)
+        existing = {name: (row_id, key, is_dir, old_mtime, size) for row_id, name, key, is_dir, old_mtime, size in
+                    conn.execute("SELECT id, name, key, is_dir, mtime, size FROM entries WHERE dir_id = ?", (dir_id,))}
+
+        removed = [name for name in existing if name not in listing or listing[name][0] != bool(existing[name][2])]
+        for name in removed:
+            row_id, key, is_dir = existing.pop(name)[:3]
+            if is_dir:
+                self._remove_subtree(conn, os.path.join(path, name))
+            self._delete_rows(conn, [(row_id, key)])
+        stats["removed"] += len(removed)
+
+        for name, (is_dir, entry_mtime, size) in listing.items():
+            old = existing.get(name)
+            if old is None:
+                key = normalize_name(name)
+                row_id = conn.execute(
+                    "INSERT INTO entries (dir_id, name, key, is_dir, mtime, size) VALUES (?, ?, ?, ?, ?, ?)",
+                    (dir_id, name, key, int(is_dir), entry_mtime, size)
+                ).lastrowid
+                conn.execute("INSERT INTO name_grams (rowid, grams) VALUES (?, ?)", (row_id, name_grams(key)))
+                stats["added"] += 1
+            elif (old[3], old[4]) != (entry_mtime, size):
+                conn.execute("UPDATE entries SET mtime = ?, size = ? WHERE id = ?", (entry_mtime, size, old[0]))
+
+        conn.execute("UPDATE dirs SET mtime = ? WHERE id = ?", (mtime, dir_id))
+        return [name for name, (is_dir, _, _) in listing.items() if is_dir]
+
+    def scan(self) -> Dict[str, float]:
+        """增量扫描所有根目录：只列出修改时间变化的目录，未变化的目录沿用已索引的子目录"""
+        start = time.perf_counter()
+        stats = {"dirs": 0, "changed": 0, "added": 0, "removed": 0}
+        conn = self._connect()
+        stack = [(root, 0) for root in reversed(self.roots)]
+        while stack:
+            with self._transaction():
+                for _ in range(_BATCH_DIRS):
+                    if not stack:
+                        break
+                    path, depth = stack.pop()
+                    try:
+                        mtime = os.stat(path).st_mtime
+                    except OSError:
+                        self._remove_subtree(conn, path)
+                        continue
+                    stats["dirs"] += 1
+
+                    known = conn.execute("SELECT id, mtime FROM dirs WHERE path = ?", (path,)).fetchone()
+                    if known and known[1] == mtime:
+                        children = [row[0] for row in conn.execute(
+                            "SELECT name FROM entries WHERE dir_id = ? AND is_dir = 1", (known[0],))]
+                    else:
+                        stats["changed"] += 1
+                        dir_id = known[0] if known else \
+                            conn.execute("INSERT INTO dirs (path) VALUES (?)", (path,)).lastrowid
+                        try:
+                            children = self._sync_dir(conn, dir_id, path, mtime, stats)
+                        except OSError:
+                            continue
+                    if depth < self.max_depth:
+                        stack.extend((os.path.join(path, name), depth + 1) for name in children)
+
+        stats["seconds"] = time.perf_counter() - start
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_scan', ?)", (str(time.time()),))
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_scan_seconds', ?)",
+                         (f"{stats['seconds']:.3f}",))
+        return stats
+
+    def _claim_scan(self, interval: float) -> bool:
+        """获取扫描租约，距上次开始扫描不足 interval 秒时放弃"""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'scan_claimed'").fetchone()
+            now = time.time()
+            if row and now - float(row[0]) < interval:
+                return False
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('scan_claimed', ?)", (str(now),))
+            return True
+
+    def start_background(self, interval: float = 600):
+        """启动后台扫描线程，每 interval 秒增量扫描一次"""
+        if self._thread is not None:
+            return
+
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    if self._claim_scan(interval):
+                        stats = self.scan()
+                        if stats["changed"]:
+                            print(f"文件索引已更新：扫描 {stats['dirs']} 个目录，新增 {stats['added']}，"
+                                  f"删除 {stats['removed']}，耗时 {stats['seconds']:.2f} 秒")
+                except Exception as e:
+                    print(f"文件索引扫描失败: {str(e)}")
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=loop, name="file-index", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    # ---- 查询 ----
+
+    _SELECT = "SELECT dirs.path, entries.name, entries.is_dir, entries.mtime, entries.size"
+
+    def _entries(self, sql: str, params: tuple, with_id: bool = False) -> list:
+        rows = self._connect().execute(sql, params)
+        if with_id:
+            return [(row[5], FileEntry(os.path.join(row[0], row[1]), row[1], bool(row[2]), row[3], row[4]))
+                    for row in rows]
+        return [FileEntry(os.path.join(parent, name), name, bool(is_dir), mtime, size)
+                for parent, name, is_dir, mtime, size in rows]
+
+    def prefix(self, term: str, limit: int = 20) -> List[FileEntry]:
+        """文件名以 term 开头"""
+        key = normalize_name(term)
+        return self._entries(
+            f"{self._SELECT} FROM entries JOIN dirs ON dirs.id = entries.dir_id "
+            "WHERE entries.key >= ? AND entries.key < ? LIMIT ?",
+            (key, key + "\U0010ffff", limit)
+        )
+
+    def substring(self, term: str, limit: int = 20) -> List[FileEntry]:
+        """文件名包含 term（按字母、数字和汉字段匹配，忽略标点和大小写）"""
+        query = _substring_query(normalize_name(term))
+        if query is None:
+            return []
+        return self._entries(
+            f"{self._SELECT} FROM name_grams JOIN entries ON entries.id = name_grams.rowid "
+            "JOIN dirs ON dirs.id = entries.dir_id WHERE name_grams MATCH ? LIMIT ?",
+            (query, limit)
+        )
+
+    def fuzzy(self, term: str, limit: int = 20, threshold: float = 0.4, candidates: int = 2000) -> List[FileEntry]:
+        """查找拼写相近的文件名：查询的二元组中至少有 threshold 比例出现在文件名中
+
+        满足条件的文件名至少包含 m 个查询二元组，因此只需在最少见的 n - m + 1 个二元组的
+        倒排表中取候选，再按包含的二元组比例和文件名长度排序。
+        """
+        key = normalize_name(term)
+        grams = _bigrams(key)
+        if not grams:
+            return []
+        conn = self._connect()
+        counts = {gram: (conn.execute("SELECT doc FROM name_gram_counts WHERE term = ?", (gram,)).fetchone()
+                         or (0,))[0] for gram in grams}
+        required = max(1, math.ceil(threshold * len(grams)))
+        rare = sorted((gram for gram in grams if counts[gram]), key=counts.get)[:len(grams) - required + 1]
+        if not rare:
+            return []
+
+        rows = conn.execute(
+            "SELECT rowid, (SELECT key FROM entries WHERE id = name_grams.rowid) FROM name_grams "
+            "WHERE name_grams MATCH ? LIMIT ?",
+            (" OR ".join(f'"{gram}"' for gram in rare), candidates)
+        ).fetchall()
+        scored = []
+        for row_id, entry_key in rows:
+            shared = sum(gram in entry_key for gram in grams)
+            if shared >= required:
+                scored.append((-shared, len(entry_key), row_id))
+        scored.sort()
+        ids = [row_id for _, _, row_id in scored[:limit]]
+        if not ids:
+            return []
+        order = {row_id: rank for rank, row_id in enumerate(ids)}
+        placeholders = ",".join("?" * len(ids))
+        entries = self._entries(
+            f"{self._SELECT}, entries.id FROM entries JOIN dirs ON dirs.id = entries.dir_id "
+            f"WHERE entries.id IN ({placeholders})", tuple(ids), with_id=True)
+        return [entry for _, entry in sorted(entries, key=lambda item: order[item[0]])]
+
+    def search(self, term: str, limit: int = 20, dirs_only: bool = False) -> List[FileEntry]:
+        """前缀匹配在前，其次子串匹配，都没有时模糊匹配"""
+        def keep(entries):
+            return [entry for entry in entries if entry.is_dir] if dirs_only else entries
+
+        fetch = limit * 5 if dirs_only else limit
+        results = keep(self.prefix(term, fetch))
+        seen = {entry.path for entry in results}
+        if len(results) < limit:
+            results += [entry for entry in keep(self.substring(term, fetch + len(results)))
+                        if entry.path not in seen]
+        if not results:
+            results = keep(self.fuzzy(term, fetch))
+        return results[:limit]
+
+    def get_stats(self) -> Dict[str, float]:
+        """索引规模、数据库大小和上次扫描耗时"""
+        conn = self._connect()
+        files, dirs = conn.execute(
+            "SELECT COUNT(*) - COALESCE(SUM(is_dir), 0), COALESCE(SUM(is_dir), 0) FROM entries").fetchone()
+        size = sum(os.path.getsize(path) for path in (self.path, self.path + "-wal") if os.path.exists(path))
+        last_seconds = self._meta("last_scan_seconds")
+        return {"files": files, "dirs": dirs, "bytes": size,
+                "last_scan_seconds": float(last_seconds) if last_seconds else None}
+
+    def close(self):
+        self.stop()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文件名索引")
+    parser.add_argument("--database", default="file_index.db")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="扫描目录并更新索引")
+    build_parser.add_argument("roots", nargs="+")
+    build_parser.add_argument("--max-depth", type=int, default=8)
+    search_parser = subparsers.add_parser("search", help="查询文件名")
+    search_parser.add_argument("term")
+    search_parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        index = FileIndex(args.database, args.roots, max_depth=args.max_depth)
+        stats = index.scan()
+        info = index.get_stats()
+        print(f"扫描 {stats['dirs']} 个目录（{stats['changed']} 个有变化），新增 {stats['added']}，"
+              f"删除 {stats['removed']}，耗时 {stats['seconds']:.2f} 秒")
+        print(f"索引包含 {info['files']} 个文件、{info['dirs']} 个目录，数据库 {info['bytes'] / 1024 / 1024:.1f} MB")
+        return
+
+    index = FileIndex(args.database, [])
+    start = time.perf_counter()
+    results = index.search(args.term, args.limit)
+    elapsed = (time.perf_counter() - start) * 1000
+    for entry in results:
+        print(("[目录] " if entry.is_dir else "") + entry.path)
+    print(f"{len(results)} 个结果，耗时 {elapsed:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
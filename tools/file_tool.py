@@ -1,7 +1,13 @@
 import subprocess
 import os
 import re
-from .base_tool import BaseAssistantTool
+import sys
+from .base_tool import BaseAssistantTool, ToolError
+from .content_index import DEFAULT_EXTENSIONS, ContentIndex
+from .file_index import DEFAULT_EXCLUDE, FileIndex
+
+_CONTENT_QUERY = re.compile(r"(?:包含|含有|内容(?:里)?(?:有|是|包含)?|提到|提及|写着|涉及)了?[“\"'《]?(.+?)[”\"'》]?(?:这几个字)?的?(?:文件|文档|资料|笔记)")
+_SEARCH_TERM = re.compile(r"(?:查找|搜索|找一下|找找|找)(?:一下)?(?:名为|叫|名字是|名称是)?(.+?)(?:的)?(?:文件|文档)?$")
 
 
 class FileTool(BaseAssistantTool):
@@ -9,75 +15,131 @@ class FileTool(BaseAssistantTool):
 
     def __init__(self, name:str, config : dict):
         super().__init__(name, config)
+        config = config or {}
+        index_config = config.get("index", {})
+        self.result_limit = config.get("result_limit", 5)
+        self.index = FileIndex(
+            index_config.get("database", "file_index.db"),
+            index_config.get("roots", ["~"]),
+            exclude=index_config.get("exclude", DEFAULT_EXCLUDE),
+            max_depth=config.get("search_depth", 8),
+            extensions=config.get("supported_extensions")
+        )
+        self.index.start_background(index_config.get("rescan_interval", 600))
+        self.content_index = self._create_content_index(config.get("content_index", {}))
+
+    @staticmethod
+    def _create_content_index(content_config: dict):
+        """启用时创建文件内容索引"""
+        if not content_config.get("enabled"):
+            return None
+        index = ContentIndex(
+            content_config.get("directory", "content_index"),
+            content_config.get("roots", ["~/Documents"]),
+            extensions=content_config.get("extensions", DEFAULT_EXTENSIONS),
+            exclude=content_config.get("exclude", DEFAULT_EXCLUDE),
+            max_file_bytes=content_config.get("max_file_bytes", 2_000_000)
+        )
+        index.start_background(content_config.get("rescan_interval", 900))
+        return index
+
+    @classmethod
+    def cache_key(cls, query: str):
+        """打开文件夹、文件等有副作用的请求不缓存，只缓存搜索结果"""
+        if not _CONTENT_QUERY.search(query) and ("文件夹" in query or "目录" in query or "打开" in query):
+            return None
+        return super().cache_key(query)
 
     def run(self, query: str) -> str:
-        if "文件夹" in query or "目录" in query:
+        content_match = _CONTENT_QUERY.search(query)
+        if content_match:
+            return self.search_content(content_match.group(1).strip())
+        elif "文件夹" in query or "目录" in query:
             return self.open_folder(query)
         else:
             return self.search_files(query)
 
+    @staticmethod
+    def _open(path: str):
+        """用系统默认程序打开"""
+        subprocess.run(["open" if sys.platform == "darwin" else "xdg-open", path])
+
     def open_folder(self, query: str) -> str:
         """打开文件夹"""
         folder_name = self.extract_folder_name(query)
 
         if folder_name and os.path.exists(folder_name):
-            # macOS
-            subprocess.run(["open", folder_name])
-            return f"已在Finder中打开 {folder_name} 文件夹"
+            self._open(folder_name)
+            return f"已打开 {folder_name} 文件夹"
         elif folder_name:
-            # 尝试在常见位置查找
+            # 尝试在常见位置查找，再查文件索引
             common_paths = [
                 os.path.expanduser(f"~/{folder_name}"),
                 os.path.expanduser(f"~/Desktop/{folder_name}"),
                 os.path.expanduser(f"~/Documents/{folder_name}"),
                 f"/{folder_name}"
             ]
+            common_paths += [entry.path for entry in self.index.search(folder_name, 1, dirs_only=True)]
 
             for path in common_paths:
                 if os.path.exists(path):
-                    subprocess.run(["open", path])
-                    return f"已在Finder中打开 {path}"
+                    self._open(path)
+                    return f"已打开 {path}"
 
             return f"未找到名为 {folder_name} 的文件夹"
         else:
             # 打开当前目录
-            subprocess.run(["open", "."])
+            self._open(".")
             return "已打开当前文件夹"
 
     def search_files(self, query: str) -> str:
-        """搜索文件"""
+        """在文件名索引中搜索文件"""
         try:
-            # 提取搜索关键词
-            pattern = r'查找|搜索|找(.+?)(文件|文档)?$'
-            match = re.search(pattern, query)
-            if match:
-                search_term = match.group(1).strip()
-            else:
-                search_term = query
-
-            # 在macOS上使用mdfind搜索
-            result = subprocess.run(
-                ["mdfind", search_term],
-                capture_output=True,
-                text=True
-            )
-
-            files = [f for f in result.stdout.strip().split('\n') if f]
+            search_term = self.extract_search_term(query)
+            files = self.index.search(search_term, self.result_limit)
+            note = "" if self.index.ready else "（文件索引正在建立中，结果可能不完整）"
+            if note:
+                self.skip_cache()
 
             if files:
-                # 只显示前5个结果
-                display_files = files[:5]
-                result_text = f"找到 {len(files)} 个相关文件。前{len(display_files)}个：\n"
-                for i, file_path in enumerate(display_files, 1):
-                    file_name = os.path.basename(file_path)
-                    result_text += f"{i}. {file_name}\n"
+                result_text = f"找到 {len(files)} 个相关文件{note}：\n"
+                for i, entry in enumerate(files, 1):
+                    result_text += f"{i}. {entry.name}（{os.path.dirname(entry.path)}）\n"
 
                 result_text += "\n说'打开第一个'来打开文件。"
                 return result_text
             else:
-                return f"没有找到包含 '{search_term}' 的文件。"
+                return f"没有找到包含 '{search_term}' 的文件。{note}"
+        except Exception as e:
+            raise ToolError(f"文件搜索失败: {str(e)}")
+
+    def search_content(self, text: str) -> str:
+        """在文件内容索引中搜索包含 text 的文档"""
+        if self.content_index is None:
+            return f"文件内容索引未启用，只能按文件名查找。\n{self.search_files('找' + text)}"
+        try:
+            hits = self.content_index.search(text, self.result_limit)
+            note = "" if self.content_index.ready else "（文件内容索引正在建立中，结果可能不完整）"
+            if note:
+                self.skip_cache()
+            if not hits:
+                return f"没有找到内容包含 '{text}' 的文档。{note}"
+
+            result_text = f"找到 {len(hits)} 个内容相关的文档{note}：\n"
+            for i, hit in enumerate(hits, 1):
+                result_text += f"{i}. {os.path.basename(hit.path)}（{os.path.dirname(hit.path)}）\n"
+                if hit.snippet:
+                    result_text += f"   {hit.snippet}\n"
+            return result_text
         except Exception as e:
-            return f"文件搜索失败: {str(e)}"
+            raise ToolError(f"文件内容搜索失败: {str(e)}")
+
+    @staticmethod
+    def extract_search_term(query: str) -> str:
+        """从查询中提取搜索关键词"""
+        match = _SEARCH_TERM.search(query.strip(" 。？?！!"))
+        term = match.group(1).strip() if match else query.strip()
+        return term.strip("“”\"'《》 ") or query.strip()
 
     def extract_folder_name(self, query: str) -> str:
         """从查询中提取文件夹名称"""
@@ -0,0 +1,649 @@
+"""
+本地音乐库索引
+
+扫描配置的音乐目录，读取标签（安装了 mutagen 时读取 ID3/FLAC/MP4 标签，否则按
+"歌手/专辑/01 歌名.mp3" 或 "歌手 - 歌名.mp3" 的目录和文件名推断），把歌名、歌手、专辑
+及其拼音保存在 SQLite 中。歌手和专辑单独建表，歌曲只保存其 id；歌名、歌手名和拼音都有
+B-Tree 索引，歌名的字符二元组写入 FTS5 倒排索引用于子串和模糊查询。
+重新扫描时只重新读取修改时间或大小变化的文件，并按差异增删记录。
+
+拼音：安装了 pypinyin 时保存全拼和首字母，否则根据 GB2312 一级汉字的拼音顺序得到首字母。
+识别结果中的同音字（如"周杰轮"）按拼音匹配。
+
+    python -m tools.music_library build 目录 [...] [--database music_library.db]
+    python -m tools.music_library search 关键词 [--database music_library.db]
+"""
+
+import argparse
+import bisect
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .file_index import DEFAULT_EXCLUDE, _bigrams, _substring_query, name_grams, normalize_name
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    parent_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS dirs_by_parent ON dirs (parent_id);
+CREATE TABLE IF NOT EXISTS artists (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    key TEXT NOT NULL UNIQUE,
+    pinyin TEXT NOT NULL,
+    initials TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artists_by_pinyin ON artists (pinyin);
+CREATE INDEX IF NOT EXISTS artists_by_initials ON artists (initials);
+CREATE TABLE IF NOT EXISTS albums (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    artist_id INTEGER NOT NULL,
+    UNIQUE (key, artist_id)
+);
+CREATE TABLE IF NOT EXISTS tracks (
+    id INTEGER PRIMARY KEY,
+    dir_id INTEGER NOT NULL,
+    file TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    key TEXT NOT NULL,
+    pinyin TEXT NOT NULL,
+    initials TEXT NOT NULL,
+    artist_id INTEGER NOT NULL,
+    album_id INTEGER NOT NULL,
+    track_no INTEGER,
+    duration REAL,
+    UNIQUE (dir_id, file)
+);
+CREATE INDEX IF NOT EXISTS tracks_by_key ON tracks (key);
+CREATE INDEX IF NOT EXISTS tracks_by_pinyin ON tracks (pinyin);
+CREATE INDEX IF NOT EXISTS tracks_by_initials ON tracks (initials);
+CREATE INDEX IF NOT EXISTS tracks_by_artist ON tracks (artist_id);
+CREATE INDEX IF NOT EXISTS tracks_by_album ON tracks (album_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS title_grams USING fts5(grams, content='', tokenize='ascii');
+CREATE VIRTUAL TABLE IF NOT EXISTS title_gram_counts USING fts5vocab(title_grams, 'row');
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+DEFAULT_EXTENSIONS = (".mp3", ".flac", ".m4a", ".aac", ".ogg", ".opus", ".wav", ".wma", ".ape")
+
+# 每个写事务处理的目录数
+_BATCH_DIRS = 100
+
+_TRACK_NUMBER = re.compile(r"^\s*(?:cd\s*\d+\s*[-_.]?\s*)?(\d{1,3})\s*(?:[-_.、]\s*|\s+)", re.IGNORECASE)
+_ARTIST_TITLE = re.compile(r"^(.+?)\s+-\s+(.+)$")
+_DECORATION = re.compile(r"\s*[(（\[【].*?[)）\]】]\s*")
+
+# GB2312 一级汉字按拼音排序，每个首字母的起始编码
+_GB2312_INITIALS = [
+    (0xB0A1, "a"), (0xB0C5, "b"), (0xB2C1, "c"), (0xB4EE, "d"), (0xB6EA, "e"), (0xB7A2, "f"),
+    (0xB8C1, "g"), (0xB9FE, "h"), (0xBBF7, "j"), (0xBFA6, "k"), (0xC0AC, "l"), (0xC2E8, "m"),
+    (0xC4C3, "n"), (0xC5B6, "o"), (0xC5BE, "p"), (0xC6DA, "q"), (0xC8BB, "r"), (0xC8F6, "s"),
+    (0xCBFA, "t"), (0xCDDA, "w"), (0xCEF4, "x"), (0xD1B9, "y"), (0xD4D1, "z"),
+]
+_GB2312_STARTS = [code for code, _ in _GB2312_INITIALS]
+_GB2312_LEVEL1_END = 0xD7F9
+
+_WORD = re.compile(r"[a-z0-9]+|[^\W_]")
+
+try:
+    from pypinyin import lazy_pinyin
+except ImportError:
+    lazy_pinyin = None
+
+try:
+    import mutagen
+except ImportError:
+    mutagen = None
+
+
+class Track(NamedTuple):
+    """库中的一首歌"""
+    path: str
+    title: str
+    artist: str
+    album: str
+    duration: Optional[float]
+
+
+class Match(NamedTuple):
+    """查询结果：kind 为 "artist"、"album" 或 "title"，name 为匹配到的歌手、专辑或歌名"""
+    kind: str
+    name: str
+    tracks: List[Track]
+
+
+def _gb2312_initial(char: str) -> str:
+    try:
+        encoded = char.encode("gb2312")
+    except UnicodeEncodeError:
+        return char
+    if len(encoded) != 2:
+        return char
+    code = encoded[0] << 8 | encoded[1]
+    if code < _GB2312_STARTS[0] or code > _GB2312_LEVEL1_END:
+        return char
+    return _GB2312_INITIALS[bisect.bisect_right(_GB2312_STARTS, code) - 1][1]
+
+
+def pinyin_mode() -> str:
+    """"full"（pypinyin 全拼）或 "initials"（仅首字母）"""
+    return "full" if lazy_pinyin else "initials"
+
+
+def pinyin_keys(key: str) -> Tuple[str, str]:
+    """规范化名称的 (拼音, 首字母)，如 "周杰伦" -> ("zhoujielun", "zjl")
+
+    英文单词和数字保留原样，首字母取单词的首字母；未安装 pypinyin 时拼音即首字母。
+    """
+    if lazy_pinyin:
+        words = [word for word in lazy_pinyin(key, errors=lambda text: _WORD.findall(text)) if _WORD.fullmatch(word)]
+        return "".join(words), "".join(word[0] for word in words)
+    initials = "".join(word[0] if word.isascii() else _gb2312_initial(word) for word in _WORD.findall(key))
+    return initials, initials
+
+
+def _search_key(name: str) -> str:
+    """去掉括号中的修饰（如 "(Live)"）并规范化"""
+    return normalize_name(_DECORATION.sub(" ", name)).strip() or normalize_name(name).strip()
+
+
+def _read_embedded_tags(path: str) -> Dict[str, object]:
+    """用 mutagen 读取标签，未安装或无法识别时返回空字典"""
+    if mutagen is None:
+        return {}
+    try:
+        audio = mutagen.File(path, easy=True)
+    except Exception:
+        return {}
+    if audio is None:
+        return {}
+
+    tags: Dict[str, object] = {}
+    for field in ("title", "artist", "albumartist", "album", "tracknumber"):
+        values = audio.tags.get(field) if audio.tags is not None else None
+        if values and str(values[0]).strip():
+            tags[field] = str(values[0]).strip()
+    number = str(tags.pop("tracknumber", "")).split("/")[0]
+    if number.isdigit():
+        tags["track_no"] = int(number)
+    if "artist" not in tags and "albumartist" in tags:
+        tags["artist"] = tags["albumartist"]
+    tags.pop("albumartist", None)
+    length = getattr(getattr(audio, "info", None), "length", None)
+    if length:
+        tags["duration"] = float(length)
+    return tags
+
+
+def read_tags(path: str, root: str) -> Dict[str, object]:
+    """读取歌名、歌手、专辑、音轨号和时长；标签缺失的部分按目录和文件名推断"""
+    tags = _read_embedded_tags(path)
+
+    stem = os.path.splitext(os.path.basename(path))[0]
+    match = _TRACK_NUMBER.match(stem)
+    if match:
+        tags.setdefault("track_no", int(match.group(1)))
+        stem = stem[match.end():]
+    pair = _ARTIST_TITLE.match(stem)
+    if pair:
+        tags.setdefault("artist", pair.group(1).strip())
+        stem = pair.group(2)
+    tags.setdefault("title", stem.strip() or os.path.basename(path))
+
+    # 歌手/专辑/歌曲 的目录结构
+    parents = [part for part in os.path.dirname(path)[len(root):].split(os.sep) if part]
+    tags.setdefault("album", parents[-1] if parents else "")
+    tags.setdefault("artist", parents[-2] if len(parents) >= 2 else "")
+    return tags
+
+
+class MusicLibrary:
+    """持久化的音乐库索引
+
+    与文件名索引相同，使用 WAL 模式和 meta 表中的扫描租约，多个进程可以共用同一个数据库。
+    """
+
+    def __init__(self, path: str, roots: Iterable[str], exclude: Iterable[str] = DEFAULT_EXCLUDE,
+                 extensions: Iterable[str] = DEFAULT_EXTENSIONS, max_depth: int = 8):
+        self.path = path
+        self.roots = [os.path.abspath(os.path.expanduser(root)) for root in roots]
+        self.exclude = set(exclude)
+        self.extensions = {ext.lower() for ext in extensions}
+        self.max_depth = max_depth
+        self._local = threading.local()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._connect().executescript(_SCHEMA)
+        if self._meta("pinyin_mode") not in (None, pinyin_mode()):
+            self._rebuild_pinyin()
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程一个连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._connect().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    @property
+    def ready(self) -> bool:
+        """是否已完成过一次完整扫描"""
+        return self._meta("last_scan") is not None
+
+    def _rebuild_pinyin(self):
+        """安装或卸载 pypinyin 后重新计算拼音列"""
+        with self._transaction() as conn:
+            for table, column in (("artists", "name"), ("tracks", "title")):
+                rows = conn.execute(f"SELECT id, {column} FROM {table}").fetchall()
+                conn.executemany(f"UPDATE {table} SET pinyin = ?, initials = ? WHERE id = ?",
+                                 [(*pinyin_keys(_search_key(name)), row_id) for row_id, name in rows])
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('pinyin_mode', ?)", (pinyin_mode(),))
+
+    # ---- 扫描 ----
+
+    def _list_dir(self, path: str) -> Tuple[List[str], Dict[str, Tuple[float, int]]]:
+        """列出子目录和音频文件：文件名 -> (修改时间, 大小)"""
+        subdirs, files = [], {}
+        with os.scandir(path) as entries:
+            for entry in entries:
+                name = entry.name
+                if name in self.exclude or name.startswith("."):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(name)
+                    elif os.path.splitext(name)[1].lower() in self.extensions:
+                        stat = entry.stat(follow_symlinks=False)
+                        files[name] = (stat.st_mtime, stat.st_size)
+                except OSError:
+                    continue
+        return subdirs, files
+
+    def _artist_id(self, conn: sqlite3.Connection, name: str, cache: Dict[str, int]) -> int:
+        key = _search_key(name)
+        if key in cache:
+            return cache[key]
+        row = conn.execute("SELECT id FROM artists WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            row = (conn.execute("INSERT INTO artists (name, key, pinyin, initials) VALUES (?, ?, ?, ?)",
+                                (name, key, *pinyin_keys(key))).lastrowid,)
+        cache[key] = row[0]
+        return row[0]
+
+    def _album_id(self, conn: sqlite3.Connection, name: str, artist_id: int, cache: Dict[tuple, int]) -> int:
+        key = (_search_key(name), artist_id)
+        if key in cache:
+            return cache[key]
+        row = conn.execute("SELECT id FROM albums WHERE key = ? AND artist_id = ?", key).fetchone()
+        if row is None:
+            row = (conn.execute("INSERT INTO albums (name, key, artist_id) VALUES (?, ?, ?)",
+                                (name, key[0], artist_id)).lastrowid,)
+        cache[key] = row[0]
+        return row[0]
+
+    @staticmethod
+    def _delete_tracks(conn: sqlite3.Connection, rows: List[tuple]):
+        """删除 (id, key) 行及其倒排索引"""
+        conn.executemany("INSERT INTO title_grams (title_grams, rowid, grams) VALUES ('delete', ?, ?)",
+                         [(row_id, name_grams(key)) for row_id, key in rows])
+        conn.executemany("DELETE FROM tracks WHERE id = ?", [(row_id,) for row_id, _ in rows])
+
+    def _remove_subtree(self, conn: sqlite3.Connection, path: str) -> int:
+        """删除目录 path 及其下所有目录中的歌曲，返回删除的歌曲数"""
+        low, high = path.rstrip(os.sep) + os.sep, path.rstrip(os.sep) + chr(ord(os.sep) + 1)
+        dir_ids = [row[0] for row in conn.execute(
+            "SELECT id FROM dirs WHERE path = ? OR (path >= ? AND path < ?)", (path, low, high))]
+        removed = 0
+        for dir_id in dir_ids:
+            rows = conn.execute("SELECT id, key FROM tracks WHERE dir_id = ?", (dir_id,)).fetchall()
+            self._delete_tracks(conn, rows)
+            removed += len(rows)
+        conn.executemany("DELETE FROM dirs WHERE id = ?", [(dir_id,) for dir_id in dir_ids])
+        return removed
+
+    def _sync_dir(self, conn: sqlite3.Connection, dir_id: int, path: str, root: str,
+                  files: Dict[str, Tuple[float, int]], caches: Tuple[dict, dict], stats: Dict[str, int]):
+        """按目录当前内容更新歌曲，只读取新增和变化的文件"""
+        existing = {file: (row_id, key, mtime, size) for row_id, file, key, mtime, size in conn.execute(
+            "SELECT id, file, key, mtime, size FROM tracks WHERE dir_id = ?", (dir_id,))}
+
+        stale = [file for file, old in existing.items() if files.get(file) != (old[2], old[3])]
+        self._delete_tracks(conn, [existing[file][:2] for file in stale])
+        stats["removed"] += sum(file not in files for file in stale)
+
+        for file in [file for file in files if file not in existing or file in stale]:
+            tags = read_tags(os.path.join(path, file), root)
+            artist_id = self._artist_id(conn, tags["artist"], caches[0])
+            album_id = self._album_id(conn, tags["album"], artist_id, caches[1])
+            key = _search_key(tags["title"])
+            row_id = conn.execute(
+                "INSERT INTO tracks (dir_id, file, mtime, size, title, key, pinyin, initials, artist_id, album_id, "
+                "track_no, duration) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (dir_id, file, *files[file], tags["title"], key, *pinyin_keys(key), artist_id, album_id,
+                 tags.get("track_no"), tags.get("duration"))
+            ).lastrowid
+            conn.execute("INSERT INTO title_grams (rowid, grams) VALUES (?, ?)", (row_id, name_grams(key)))
+            stats["added" if file not in existing else "updated"] += 1
+
+    def scan(self) -> Dict[str, float]:
+        """增量扫描所有音乐目录：列出每个目录，只读取新增、修改过的文件的标签
+
+        原地修改标签不会改变目录的修改时间，因此每个目录都要列出并比较文件的修改时间和大小；
+        列目录的开销远小于读取标签。
+        """
+        start = time.perf_counter()
+        stats = {"dirs": 0, "added": 0, "updated": 0, "removed": 0}
+        conn = self._connect()
+        caches: Tuple[dict, dict] = ({}, {})
+        stack = [(root, root, None, 0) for root in reversed(self.roots)]
+        while stack:
+            with self._transaction():
+                for _ in range(_BATCH_DIRS):
+                    if not stack:
+                        break
+                    path, root, parent_id, depth = stack.pop()
+                    try:
+                        subdirs, files = self._list_dir(path)
+                    except OSError:
+                        stats["removed"] += self._remove_subtree(conn, path)
+                        continue
+                    stats["dirs"] += 1
+
+                    row = conn.execute("SELECT id FROM dirs WHERE path = ?", (path,)).fetchone()
+                    dir_id = row[0] if row else conn.execute(
+                        "INSERT INTO dirs (path, parent_id) VALUES (?, ?)", (path, parent_id)).lastrowid
+                    self._sync_dir(conn, dir_id, path, root, files, caches, stats)
+
+                    children = {os.path.join(path, name) for name in subdirs} if depth < self.max_depth else set()
+                    for (child,) in conn.execute("SELECT path FROM dirs WHERE parent_id = ?", (dir_id,)).fetchall():
+                        if child not in children:
+                            stats["removed"] += self._remove_subtree(conn, child)
+                    stack.extend((child, root, dir_id, depth + 1) for child in sorted(children, reverse=True))
+
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM albums WHERE id NOT IN (SELECT album_id FROM tracks)")
+            conn.execute("DELETE FROM artists WHERE id NOT IN (SELECT artist_id FROM tracks)")
+            stats["seconds"] = time.perf_counter() - start
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_scan', ?)", (str(time.time()),))
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_scan_seconds', ?)",
+                         (f"{stats['seconds']:.3f}",))
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('pinyin_mode', ?)", (pinyin_mode(),))
+        return stats
+
+    def _claim_scan(self, interval: float) -> bool:
+        """获取扫描租约，距上次开始扫描不足 interval 秒时放弃"""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'scan_claimed'").fetchone()
+            now = time.time()
+            if row and now - float(row[0]) < interval:
+                return False
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('scan_claimed', ?)", (str(now),))
+            return True
+
+    def start_background(self, interval: float = 1800):
+        """启动后台扫描线程，每 interval 秒增量扫描一次"""
+        if self._thread is not None:
+            return
+
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    if self._claim_scan(interval):
+                        stats = self.scan()
+                        if stats["added"] or stats["updated"] or stats["removed"]:
+                            print(f"音乐库已更新：新增 {stats['added']}，更新 {stats['updated']}，"
+                                  f"删除 {stats['removed']}，耗时 {stats['seconds']:.2f} 秒")
+                except Exception as e:
+                    print(f"音乐库扫描失败: {str(e)}")
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=loop, name="music-library", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    # ---- 查询 ----
+
+    _SELECT = ("SELECT dirs.path, tracks.file, tracks.title, artists.name, albums.name, tracks.duration FROM tracks "
+               "JOIN dirs ON dirs.id = tracks.dir_id JOIN artists ON artists.id = tracks.artist_id "
+               "JOIN albums ON albums.id = tracks.album_id ")
+
+    def _tracks(self, where: str, params: tuple) -> List[Track]:
+        return [Track(os.path.join(parent, file), title, artist, album, duration)
+                for parent, file, title, artist, album, duration in self._connect().execute(self._SELECT + where, params)]
+
+    def _first(self, queries: Iterable[Tuple[str, tuple]]) -> Optional[tuple]:
+        """依次执行查询，返回第一个有结果的行"""
+        conn = self._connect()
+        for sql, params in queries:
+            row = conn.execute(sql, params).fetchone()
+            if row:
+                return row
+        return None
+
+    def find_artist(self, term: str) -> Optional[Tuple[int, str]]:
+        """按名称、拼音（同音字）、名称前缀查找歌手；多个候选时取歌曲最多的"""
+        key = _search_key(term)
+        if not key:
+            return None
+        pinyin, initials = pinyin_keys(key)
+        by_tracks = " ORDER BY (SELECT COUNT(*) FROM tracks WHERE artist_id = artists.id) DESC LIMIT 1"
+        queries = [("SELECT id, name FROM artists WHERE key = ?", (key,))]
+        if len(pinyin) >= 2:
+            queries.append(("SELECT id, name FROM artists WHERE pinyin = ?" + by_tracks, (pinyin,)))
+        if key.isascii() and len(key) >= 2:
+            queries.append(("SELECT id, name FROM artists WHERE initials = ?" + by_tracks, (key.replace(" ", ""),)))
+        if len(key) >= 2:
+            queries.append(("SELECT id, name FROM artists WHERE key >= ? AND key < ?" + by_tracks,
+                            (key, key + "\U0010ffff")))
+        return self._first(queries)
+
+    def find_album(self, term: str) -> Optional[Tuple[int, str]]:
+        """按名称或名称前缀查找专辑"""
+        key = _search_key(term)
+        if len(key) < 2:
+            return None
+        return self._first([
+            ("SELECT id, name FROM albums WHERE key = ?", (key,)),
+            ("SELECT id, name FROM albums WHERE key >= ? AND key < ? ORDER BY length(key) LIMIT 1",
+             (key, key + "\U0010ffff")),
+        ])
+
+    def artist_tracks(self, artist_id: int, limit: int = 200) -> List[Track]:
+        return self._tracks("WHERE tracks.artist_id = ? ORDER BY albums.key, tracks.track_no, tracks.key LIMIT ?",
+                            (artist_id, limit))
+
+    def album_tracks(self, album_id: int, limit: int = 200) -> List[Track]:
+        return self._tracks("WHERE tracks.album_id = ? ORDER BY tracks.track_no, tracks.key LIMIT ?", (album_id, limit))
+
+    def random_tracks(self, limit: int = 200) -> List[Track]:
+        return self._tracks("WHERE tracks.id IN (SELECT id FROM tracks ORDER BY random() LIMIT ?) ORDER BY random()",
+                            (limit,))
+
+    def find_titles(self, term: str, limit: int = 20, artist_id: Optional[int] = None,
+                    exact_only: bool = False) -> List[Track]:
+        """按歌名查找：完全相同、拼音相同（全拼，或首字母且不少于 3 个字）、前缀、子串，都没有时模糊匹配"""
+        key = _search_key(term)
+        if not key:
+            return []
+        artist = " AND tracks.artist_id = ?" if artist_id is not None else ""
+        scope = (artist_id,) if artist_id is not None else ()
+
+        results = self._tracks(f"WHERE tracks.key = ?{artist} LIMIT ?", (key, *scope, limit))
+        pinyin, initials = pinyin_keys(key)
+        if not results and pinyin and (pinyin_mode() == "full" or len(key) >= 3):
+            results = self._tracks(f"WHERE tracks.pinyin = ?{artist} LIMIT ?", (pinyin, *scope, limit))
+        if results or exact_only:
+            return results
+
+        results = self._tracks(f"WHERE tracks.key >= ? AND tracks.key < ?{artist} LIMIT ?",
+                               (key, key + "\U0010ffff", *scope, limit))
+        if not results:
+            query = _substring_query(key)
+            if query:
+                results = self._tracks(
+                    f"WHERE tracks.id IN (SELECT rowid FROM title_grams WHERE title_grams MATCH ?){artist} LIMIT ?",
+                    (query, *scope, limit))
+        if not results:
+            ids = self._fuzzy_ids(key, limit, artist_id)
+            if ids:
+                order = {row_id: rank for rank, row_id in enumerate(ids)}
+                rows = self._connect().execute(
+                    self._SELECT.replace("SELECT ", "SELECT tracks.id, ", 1) +
+                    f"WHERE tracks.id IN ({','.join('?' * len(ids))})", tuple(ids)).fetchall()
+                rows.sort(key=lambda row: order[row[0]])
+                results = [Track(os.path.join(row[1], row[2]), *row[3:]) for row in rows]
+        return results
+
+    def _fuzzy_ids(self, key: str, limit: int, artist_id: Optional[int] = None, threshold: float = 0.5,
+                   candidates: int = 2000) -> List[int]:
+        """歌名中包含查询二元组的比例不低于 threshold 的歌曲（与文件名索引的模糊查询相同）"""
+        grams = _bigrams(key)
+        if not grams:
+            return []
+        conn = self._connect()
+        counts = {gram: (conn.execute("SELECT doc FROM title_gram_counts WHERE term = ?", (gram,)).fetchone()
+                         or (0,))[0] for gram in grams}
+        required = max(1, math.ceil(threshold * len(grams)))
+        rare = sorted((gram for gram in grams if counts[gram]), key=counts.get)[:len(grams) - required + 1]
+        if not rare:
+            return []
+        rows = conn.execute(
+            "SELECT tracks.id, tracks.key, tracks.artist_id FROM tracks WHERE tracks.id IN "
+            "(SELECT rowid FROM title_grams WHERE title_grams MATCH ? LIMIT ?)",
+            (" OR ".join(f'"{gram}"' for gram in rare), candidates)
+        ).fetchall()
+        scored = []
+        for row_id, title_key, track_artist in rows:
+            if artist_id is not None and track_artist != artist_id:
+                continue
+            shared = sum(gram in title_key for gram in grams)
+            if shared >= required:
+                scored.append((-shared, len(title_key), row_id))
+        scored.sort()
+        return [row_id for _, _, row_id in scored[:limit]]
+
+    def lookup(self, term: str, limit: int = 50) -> Optional[Match]:
+        """解析 "歌手"、"歌名"、"专辑名"、"专辑 + 专辑名" 或 "歌手的歌名"，返回要播放的歌曲"""
+        term = term.strip()
+        if not term:
+            return None
+
+        if term.startswith("专辑"):
+            album = self.find_album(term[2:])
+            return Match("album", album[1], self.album_tracks(album[0], limit)) if album else None
+
+        # 歌手的歌名 / 歌手的歌
+        if "的" in term:
+            head, _, tail = term.rpartition("的")
+            artist = self.find_artist(head)
+            if artist:
+                if tail in ("", "歌", "歌曲", "音乐", "专辑"):
+                    return Match("artist", artist[1], self.artist_tracks(artist[0], limit))
+                tracks = self.find_titles(tail, limit, artist_id=artist[0])
+                if tracks:
+                    return Match("title", tracks[0].title, tracks)
+                album = self.find_album(tail)
+                if album:
+                    return Match("album", album[1], self.album_tracks(album[0], limit))
+
+        artist = self.find_artist(term)
+        if artist:
+            return Match("artist", artist[1], self.artist_tracks(artist[0], limit))
+        tracks = self.find_titles(term, limit, exact_only=True)
+        if tracks:
+            return Match("title", tracks[0].title, tracks)
+        album = self.find_album(term)
+        if album:
+            return Match("album", album[1], self.album_tracks(album[0], limit))
+        tracks = self.find_titles(term, limit)
+        if tracks:
+            return Match("title", tracks[0].title, tracks)
+        return None
+
+    def get_stats(self) -> Dict[str, float]:
+        """歌曲、歌手、专辑数量，数据库大小和上次扫描耗时"""
+        conn = self._connect()
+        counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                  for table in ("tracks", "artists", "albums")}
+        size = sum(os.path.getsize(path) for path in (self.path, self.path + "-wal") if os.path.exists(path))
+        last_seconds = self._meta("last_scan_seconds")
+        return dict(counts, bytes=size, last_scan_seconds=float(last_seconds) if last_seconds else None)
+
+    def close(self):
+        self.stop()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地音乐库索引")
+    parser.add_argument("--database", default="music_library.db")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="扫描音乐目录并更新索引")
+    build_parser.add_argument("roots", nargs="+")
+    search_parser = subparsers.add_parser("search", help="查找歌手、歌名或专辑")
+    search_parser.add_argument("term")
+    search_parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        library = MusicLibrary(args.database, args.roots)
+        stats = library.scan()
+        info = library.get_stats()
+        print(f"扫描 {stats['dirs']} 个目录，新增 {stats['added']}，更新 {stats['updated']}，"
+              f"删除 {stats['removed']}，耗时 {stats['seconds']:.2f} 秒")
+        print(f"音乐库包含 {info['tracks']} 首歌、{info['artists']} 位歌手、{info['albums']} 张专辑，"
+              f"数据库 {info['bytes'] / 1024 / 1024:.1f} MB")
+        return
+
+    library = MusicLibrary(args.database, [])
+    start = time.perf_counter()
+    match = library.lookup(args.term, args.limit)
+    elapsed = (time.perf_counter() - start) * 1000
+    if match is None:
+        print(f"没有找到，耗时 {elapsed:.2f} ms")
+        return
+    print(f"[{match.kind}] {match.name}")
+    for track in match.tracks:
+        print(f"  {track.artist} - {track.title}（{track.album}）  {track.path}")
+    print(f"{len(match.tracks)} 首，耗时 {elapsed:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
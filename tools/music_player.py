@@ -0,0 +1,257 @@
+"""
+音乐播放后端
+
+MusicTool 通过 PlayerBackend 控制播放，后端在配置中选择：
+
+- mpv：以 --idle 模式常驻，通过 JSON IPC 套接字控制播放列表、暂停和音量。
+  mpv 进程独立于工具工作进程，工作进程被替换后重新连接同一个套接字即可继续控制。
+- command：每首歌启动一次命令行播放器（ffplay、mpg123、paplay 等），
+  由后台线程在一首结束后播放下一首，暂停通过 SIGSTOP/SIGCONT 实现。
+"""
+
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+
+class PlayerError(RuntimeError):
+    """播放器不可用或命令失败"""
+
+
+class PlayerBackend(ABC):
+    """播放后端基类"""
+
+    name = ""
+    default_command: List[str] = []
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.volume = config.get("default_volume", 80)
+
+    @abstractmethod
+    def play(self, paths: List[str]):
+        """替换播放列表并从第一首开始播放"""
+
+    @abstractmethod
+    def pause(self):
+        """暂停"""
+
+    @abstractmethod
+    def resume(self):
+        """继续播放"""
+
+    @abstractmethod
+    def stop(self):
+        """停止并清空播放列表"""
+
+    @abstractmethod
+    def next(self):
+        """下一首"""
+
+    @abstractmethod
+    def previous(self):
+        """上一首"""
+
+    def change_volume(self, delta: int) -> Optional[int]:
+        """调整音量，返回调整后的音量；不支持时返回 None"""
+        return None
+
+    @classmethod
+    def available(cls, config: dict) -> bool:
+        """播放器程序是否已安装"""
+        command = config.get("command") or cls.default_command
+        return shutil.which(command[0]) is not None
+
+
+class MpvBackend(PlayerBackend):
+    """mpv（JSON IPC）"""
+
+    name = "mpv"
+    default_command = ["mpv"]
+
+    def __init__(self, config: dict):
+        super().__init__(config)
+        self.command = config.get("command") or self.default_command
+        self.socket_path = os.path.expanduser(config.get("socket", "/tmp/assistant-mpv.sock"))
+        self._request_id = 0
+
+    def _request(self, command: list):
+        """发送一条命令并等待对应的回复（忽略期间收到的事件）"""
+        try:
+            return self._send(command)
+        except OSError as e:
+            raise PlayerError(f"无法连接 mpv（{self.socket_path}）: {str(e)}")
+
+    def _send(self, command: list):
+        self._request_id += 1
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(2.0)
+            conn.connect(self.socket_path)
+            conn.sendall(json.dumps({"command": command, "request_id": self._request_id}).encode() + b"\n")
+            buffer = b""
+            while True:
+                chunk = conn.recv(4096)
+                if not chunk:
+                    raise PlayerError("mpv 连接已关闭")
+                buffer += chunk
+                while b"\n" in buffer:
+                    line, buffer = buffer.split(b"\n", 1)
+                    reply = json.loads(line)
+                    if reply.get("request_id") == self._request_id:
+                        if reply.get("error") != "success":
+                            raise PlayerError(f"mpv 命令失败: {reply.get('error')}")
+                        return reply.get("data")
+
+    def _ensure_running(self):
+        """没有可连接的 mpv 时启动一个"""
+        try:
+            self._request(["get_property", "idle-active"])
+            return
+        except PlayerError:
+            pass
+        if shutil.which(self.command[0]) is None:
+            raise PlayerError(f"未安装 {self.command[0]}")
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        subprocess.Popen(
+            [*self.command, "--idle=yes", "--no-video", "--no-terminal",
+             f"--input-ipc-server={self.socket_path}", f"--volume={self.volume}"],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+        deadline = time.monotonic() + 3.0
+        while time.monotonic() < deadline:
+            try:
+                self._request(["get_property", "idle-active"])
+                return
+            except PlayerError:
+                time.sleep(0.05)
+        raise PlayerError("mpv 启动超时")
+
+    def play(self, paths: List[str]):
+        self._ensure_running()
+        for i, path in enumerate(paths):
+            self._request(["loadfile", path, "replace" if i == 0 else "append"])
+        self._request(["set_property", "pause", False])
+
+    def pause(self):
+        self._request(["set_property", "pause", True])
+
+    def resume(self):
+        self._request(["set_property", "pause", False])
+
+    def stop(self):
+        self._request(["stop"])
+
+    def next(self):
+        self._request(["playlist-next", "force"])
+
+    def previous(self):
+        self._request(["playlist-prev", "force"])
+
+    def change_volume(self, delta: int) -> Optional[int]:
+        self._request(["add", "volume", delta])
+        self.volume = int(self._request(["get_property", "volume"]))
+        return self.volume
+
+
+class CommandBackend(PlayerBackend):
+    """每首歌启动一次命令行播放器"""
+
+    name = "command"
+    default_command = ["ffplay", "-nodisp", "-autoexit", "-loglevel", "quiet"]
+
+    def __init__(self, config: dict):
+        super().__init__(config)
+        self.command = config.get("command") or self.default_command
+        self._playlist: List[str] = []
+        self._position = 0
+        self._process: Optional[subprocess.Popen] = None
+        self._paused = False
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def _start(self, position: int):
+        """播放列表中第 position 首；调用方持有锁"""
+        self._kill()
+        self._generation += 1
+        if not 0 <= position < len(self._playlist):
+            return
+        if shutil.which(self.command[0]) is None:
+            raise PlayerError(f"未安装 {self.command[0]}")
+        self._position = position
+        self._paused = False
+        self._process = subprocess.Popen(
+            [*self.command, self._playlist[position]],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        threading.Thread(target=self._advance, args=(self._process, self._generation),
+                         name="music-player", daemon=True).start()
+
+    def _advance(self, process: subprocess.Popen, generation: int):
+        """一首正常结束后播放下一首"""
+        process.wait()
+        with self._lock:
+            if generation == self._generation and process.returncode == 0:
+                self._start(self._position + 1)
+
+    def _kill(self):
+        if self._process and self._process.poll() is None:
+            if self._paused:
+                self._process.send_signal(signal.SIGCONT)
+            self._process.terminate()
+        self._process = None
+
+    def play(self, paths: List[str]):
+        with self._lock:
+            self._playlist = list(paths)
+            self._start(0)
+
+    def _signal(self, sig: int, paused: bool):
+        with self._lock:
+            if self._process and self._process.poll() is None:
+                self._process.send_signal(sig)
+                self._paused = paused
+
+    def pause(self):
+        self._signal(signal.SIGSTOP, True)
+
+    def resume(self):
+        self._signal(signal.SIGCONT, False)
+
+    def stop(self):
+        with self._lock:
+            self._generation += 1
+            self._kill()
+            self._playlist = []
+
+    def next(self):
+        with self._lock:
+            self._start(self._position + 1)
+
+    def previous(self):
+        with self._lock:
+            self._start(max(0, self._position - 1))
+
+
+PLAYER_BACKENDS = {
+    MpvBackend.name: MpvBackend,
+    CommandBackend.name: CommandBackend
+}
+
+
+def create_player(config: Dict) -> PlayerBackend:
+    """按配置创建播放后端；backend 为 "auto" 时选择第一个已安装的"""
+    backend = config.get("backend", "auto")
+    if backend == "auto":
+        backend = next((name for name, cls in PLAYER_BACKENDS.items() if cls.available(config)), MpvBackend.name)
+    if backend not in PLAYER_BACKENDS:
+        raise ValueError(f"未知的播放后端: {backend}，可选: {', '.join(PLAYER_BACKENDS)}")
+    return PLAYER_BACKENDS[backend](config)
@@ -1,5 +1,13 @@
-import subprocess
-from .base_tool import BaseAssistantTool
+import re
+from typing import Optional
+
+from .base_tool import BaseAssistantTool, ToolError
+from .file_index import DEFAULT_EXCLUDE
+from .music_library import MusicLibrary
+from .music_player import PlayerError, create_player
+
+_PLAY_VERBS = re.compile(r"^(?:请|帮我|给我)*(?:继续播放|开始播放|播放|放一?首|放一下|放点|放|来一?首|来点|我想听|想听|听一?首|听一下|听)(?:一下|一首|一些|一点)?")
+_GENERIC = {"", "音乐", "歌", "歌曲", "首歌", "点歌", "点音乐", "随便", "随机"}
 
 
 class MusicTool(BaseAssistantTool):
@@ -7,61 +15,101 @@ class MusicTool(BaseAssistantTool):
 
     def __init__(self, name:str, config : dict):
         super().__init__(name, config)
+        config = config or {}
+        library_config = config.get("library", {})
+        self.playlist_limit = config.get("playlist_limit", 200)
+        self.library = MusicLibrary(
+            library_config.get("database", "music_library.db"),
+            library_config.get("roots", ["~/Music"]),
+            exclude=library_config.get("exclude", DEFAULT_EXCLUDE),
+            extensions=["." + ext.lstrip(".") for ext in config.get("supported_formats", ["mp3", "flac"])]
+        )
+        self.library.start_background(library_config.get("rescan_interval", 1800))
+        self.player = create_player(dict(config.get("player", {}), default_volume=config.get("default_volume", 80)))
         self.is_playing = False
 
     def run(self, query: str) -> str:
         query_lower = query.lower()
 
-        if any(keyword in query_lower for keyword in ["播放", "开始", "继续"]):
-            return self._play_music(query)
-        elif any(keyword in query_lower for keyword in ["暂停", "停止"]):
-            return self._pause_music()
-        elif any(keyword in query_lower for keyword in ["下一首", "下一曲"]):
-            return self._next_track()
-        elif any(keyword in query_lower for keyword in ["上一首", "上一曲"]):
-            return self._previous_track()
-        elif any(keyword in query_lower for keyword in ["音量", "声音"]):
-            return self._adjust_volume(query)
-        else:
-            status = "正在播放" if self.is_playing else "已暂停"
-            return f"音乐播放器：{status}。说'播放音乐'开始播放，'暂停'停止播放。"
+        try:
+            if any(keyword in query_lower for keyword in ["暂停", "停止", "别放了"]):
+                return self.pause_music()
+            elif any(keyword in query_lower for keyword in ["下一首", "下一曲", "切歌"]):
+                return self.next_track()
+            elif any(keyword in query_lower for keyword in ["上一首", "上一曲"]):
+                return self.previous_track()
+            elif any(keyword in query_lower for keyword in ["音量", "声音"]):
+                return self.adjust_volume(query)
+            elif any(keyword in query_lower for keyword in ["播放", "开始", "继续", "放", "听", "来一首"]):
+                return self.play_music(query)
+            else:
+                status = "正在播放" if self.is_playing else "已暂停"
+                return f"音乐播放器：{status}。说'播放音乐'开始播放，'暂停'停止播放。"
+        except PlayerError as e:
+            raise ToolError(f"播放器不可用: {str(e)}")
+
+    @staticmethod
+    def extract_music_term(query: str) -> Optional[str]:
+        """从查询中提取歌手、歌名或专辑；没有指定时返回 None"""
+        term = _PLAY_VERBS.sub("", query.strip(" 。！!？?"))
+        term = re.sub(r"(?:吧|好吗|一下)$", "", term).strip(" “”\"'《》")
+        return None if term in _GENERIC else term
 
     def play_music(self, query: str) -> str:
-        """播放音乐"""
-        try:
-            # 尝试打开音乐应用 (macOS)
-            subprocess.run(["open", "-a", "Music"])
+        """在音乐库中查找并播放"""
+        term = self.extract_music_term(query)
+        if term is None and "继续" in query and not self.is_playing:
+            self.player.resume()
             self.is_playing = True
+            return "继续播放"
 
-            # 检查是否有特定歌曲请求
-            if "周杰伦" in query or "jay" in query:
-                return "开始播放周杰伦的音乐"
-            elif "轻音乐" in query or "轻松" in query:
-                return "开始播放轻音乐"
-            else:
-                return "开始播放音乐"
-        except:
+        note = "" if self.library.ready else "（音乐库正在建立索引，结果可能不完整）"
+        if note:
+            self.skip_cache()
+        if term is None:
+            tracks = self.library.random_tracks(self.playlist_limit)
+            if not tracks:
+                return f"音乐库中还没有歌曲{note}"
+            self.player.play([track.path for track in tracks])
             self.is_playing = True
-            return "开始播放音乐"
+            return f"开始随机播放 {len(tracks)} 首歌，第一首是 {tracks[0].artist} 的《{tracks[0].title}》"
+
+        match = self.library.lookup(term, self.playlist_limit)
+        if match is None:
+            return f"音乐库中没有找到 {term}{note}"
+        self.player.play([track.path for track in match.tracks])
+        self.is_playing = True
+        first = match.tracks[0]
+        if match.kind == "artist":
+            return f"开始播放{match.name}的 {len(match.tracks)} 首歌，第一首是《{first.title}》"
+        if match.kind == "album":
+            return f"开始播放专辑《{match.name}》，共 {len(match.tracks)} 首"
+        artist = f"{first.artist}的" if first.artist else ""
+        return f"开始播放{artist}《{first.title}》"
 
     def pause_music(self) -> str:
         """暂停音乐"""
+        self.player.pause()
         self.is_playing = False
         return "音乐已暂停"
 
     def next_track(self) -> str:
         """下一首"""
+        self.player.next()
         return "切换到下一首歌曲"
 
     def previous_track(self) -> str:
         """上一首"""
+        self.player.previous()
         return "切换到上一首歌曲"
 
     def adjust_volume(self, query: str) -> str:
         """调整音量"""
         if "大" in query or "高" in query or "增加" in query:
-            return "已调高音量"
+            volume = self.player.change_volume(10)
+            return "已调高音量" + (f"（{volume}）" if volume is not None else "")
         elif "小" in query or "低" in query or "减少" in query:
-            return "已调低音量"
+            volume = self.player.change_volume(-10)
+            return "已调低音量" + (f"（{volume}）" if volume is not None else "")
         else:
-            return "当前音量适中"
\ No newline at end of file
+            return f"当前音量 {self.player.volume}"
@@ -1,5 +1,5 @@
 import subprocess
-from .base_tool import BaseAssistantTool
+from .base_tool import BaseAssistantTool, ToolError
 from datetime import datetime
 
 
@@ -13,16 +13,23 @@ class SystemTool(BaseAssistantTool):
         query_lower = query.lower()
 
         if any(keyword in query_lower for keyword in ["锁屏", "锁定"]):
-            return self._lock_screen()
+            return self.lock_screen()
         elif any(keyword in query_lower for keyword in ["关机", "关闭", "睡眠"]):
             return "出于安全考虑，请手动执行关机操作。"
         elif any(keyword in query_lower for keyword in ["应用", "程序", "打开"]):
-            return self._open_application(query)
+            return self.open_application(query)
         elif any(keyword in query_lower for keyword in ["时间", "几点"]):
-            return self._get_time()
+            return self.get_time()
         else:
             return "我可以帮您锁屏、打开应用程序或查看时间，请明确您的需求。"
 
+    @classmethod
+    def speculation_key(cls, query: str):
+        """只有查询时间可以推测执行"""
+        if any(keyword in query.lower() for keyword in ["时间", "几点"]):
+            return "time"
+        return None
+
     def lock_screen(self) -> str:
         """锁屏"""
         try:
@@ -30,7 +37,7 @@ class SystemTool(BaseAssistantTool):
             subprocess.run(["pmset", "displaysleepnow"])
             return "屏幕已锁定"
         except:
-            return "锁屏功能当前不可用"
+            raise ToolError("锁屏功能当前不可用")
 
     def open_application(self, query: str) -> str:
         """打开应用程序"""
@@ -53,7 +60,7 @@ class SystemTool(BaseAssistantTool):
                     subprocess.run(["open", "-a", app_name])
                     return f"已打开 {app_name}"
                 except:
-                    return f"无法打开 {app_name}"
+                    raise ToolError(f"无法打开 {app_name}")
 
         return "请指定要打开的应用程序名称"
 
@@ -0,0 +1,290 @@
+"""
+中文时间表达式解析
+
+基于预编译正则的确定性解析，覆盖相对日期（今天、明天、三天后）、星期（下周三）、
+绝对日期（10月1日、2026-10-01）、时段（上午、下午、晚上）、中文数字、
+时间范围（下午两点到四点）和时长（一个半小时），单次解析在微秒级完成，无需调用大模型。
+"""
+
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional, Tuple
+
+_DIGITS = {"零": 0, "〇": 0, "一": 1, "二": 2, "两": 2, "三": 3, "四": 4,
+           "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+_UNITS = {"十": 10, "百": 100, "千": 1000}
+_BIG_UNITS = {"万": 10 ** 4, "亿": 10 ** 8}
+
+NUMBER = r"[0-9]+|[零〇一二两三四五六七八九十百千]+"
+_WEEKDAYS = {"一": 0, "二": 1, "三": 2, "四": 3, "五": 4, "六": 5, "日": 6, "天": 6, "末": 5,
+             "1": 0, "2": 1, "3": 2, "4": 3, "5": 4, "6": 5, "7": 6}
+
+# 时段 -> (未给出具体时间时的默认时刻, 是否为下午/晚上)
+_PERIODS = {
+    "凌晨": (time(5, 0), False), "早上": (time(8, 0), False), "早晨": (time(8, 0), False),
+    "清晨": (time(7, 0), False), "上午": (time(9, 0), False), "中午": (time(12, 0), False),
+    "下午": (time(14, 0), True), "傍晚": (time(18, 0), True), "晚上": (time(20, 0), True),
+    "夜里": (time(22, 0), True), "今晚": (time(20, 0), True), "明早": (time(8, 0), False),
+    "明晚": (time(20, 0), True)
+}
+_PERIOD = "|".join(sorted(_PERIODS, key=len, reverse=True))
+
+_RELATIVE_DAYS = {"今天": 0, "今日": 0, "今晚": 0, "明天": 1, "明日": 1, "明早": 1, "明晚": 1,
+                  "后天": 2, "大后天": 3, "昨天": -1, "前天": -2}
+
+_ISO_DATE = re.compile(r"(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})")
+_ABSOLUTE_DATE = re.compile(rf"(?:([0-9]{{4}}|[零〇一二三四五六七八九]{{4}})年)?({NUMBER})月({NUMBER})[日号]")
+_RELATIVE_DAY = re.compile("|".join(sorted(_RELATIVE_DAYS, key=len, reverse=True)))
+_DAYS_LATER = re.compile(rf"({NUMBER}|半)个?(天|日|周|星期|礼拜|月)(?:以|之)?后")
+_WEEKDAY = re.compile(r"(下下个?|下个?|这个?|本|上个?)?(?:周|星期|礼拜)([一二三四五六日天末1-7])")
+_DAY_OF_MONTH = re.compile(rf"(下个?月|本月|这个?月)?({NUMBER})[日号]")
+_CLOCK = re.compile(rf"({_PERIOD})?\s*({NUMBER})\s*(?:[点时:：])\s*(半|一刻|三刻|{NUMBER})?\s*分?钟?")
+_RANGE_END = re.compile(rf"\s*(?:到|至|-|~|—)\s*({_PERIOD})?\s*({NUMBER})\s*(?:[点时:：])\s*(半|一刻|三刻|{NUMBER})?\s*分?钟?")
+_PERIOD_ONLY = re.compile(_PERIOD)
+_DURATION = re.compile(rf"({NUMBER}|半)个?(半)?(?:小时|钟头)(?:({NUMBER})分钟?)?|({NUMBER})分钟")
+_TIME_LATER = re.compile(rf"({NUMBER}|半)个?(半)?(小时|钟头|分钟)(?:以|之)?后")
+
+
+def parse_chinese_number(text: str) -> Optional[int]:
+    """解析阿拉伯数字或中文数字（十二、二十五、一百零八、三千五、两万三、一亿二千万、二〇二六）"""
+    if text.isdigit():
+        return int(text)
+    if not text or any(char not in _DIGITS and char not in _UNITS and char not in _BIG_UNITS for char in text):
+        return None
+    if not any(char in _UNITS or char in _BIG_UNITS for char in text):
+        # 逐位读法，如 二〇二六
+        return int("".join(str(_DIGITS[char]) for char in text))
+
+    total, section, digit, last_unit = 0, 0, None, None
+    for char in text:
+        if char in _DIGITS:
+            digit = _DIGITS[char]
+            if char in "零〇":
+                last_unit = None
+        elif char in _UNITS:
+            section += (1 if digit is None else digit) * _UNITS[char]
+            digit, last_unit = None, _UNITS[char]
+        elif char == "万":
+            total += (section + (digit or 0)) * _BIG_UNITS[char]
+            section, digit, last_unit = 0, None, _BIG_UNITS[char]
+        else:
+            total = (total + section + (digit or 0)) * _BIG_UNITS[char]
+            section, digit, last_unit = 0, None, _BIG_UNITS[char]
+    if digit and last_unit and last_unit >= 100 and text[-2] not in "零〇":
+        # 口语省略末位单位：三千五 = 3500，两万三 = 23000
+        digit *= last_unit // 10
+    return total + section + (digit or 0)
+
+
+@dataclass
+class TimeExpression:
+    """解析结果；未出现的部分为 None"""
+    date: Optional[date] = None
+    time: Optional[time] = None
+    end_time: Optional[time] = None
+    duration: Optional[timedelta] = None
+    spans: List[Tuple[int, int]] = field(default_factory=list)
+    text: str = ""
+
+    @property
+    def found(self) -> bool:
+        return bool(self.spans)
+
+    def end(self) -> Optional[time]:
+        """结束时刻：明确给出的结束时间，或开始时间加时长"""
+        if self.end_time or not (self.time and self.duration):
+            return self.end_time
+        return (datetime.combine(date.min, self.time) + self.duration).time()
+
+    def remainder(self) -> str:
+        """去掉时间表达式后剩余的文本"""
+        parts, last = [], 0
+        for start, end in sorted(self.spans):
+            parts.append(self.text[last:start])
+            last = max(last, end)
+        parts.append(self.text[last:])
+        return "".join(parts)
+
+
+def _clock(period: Optional[str], hour_text: str, minute_text: Optional[str],
+           inherit_pm: bool = False) -> Optional[time]:
+    hour = parse_chinese_number(hour_text)
+    if hour is None or hour > 24:
+        return None
+    if minute_text in (None, ""):
+        minute = 0
+    elif minute_text == "半":
+        minute = 30
+    elif minute_text == "一刻":
+        minute = 15
+    elif minute_text == "三刻":
+        minute = 45
+    else:
+        minute = parse_chinese_number(minute_text)
+        if minute is None or minute > 59:
+            return None
+
+    # 没有时段时，口语中的"三点开会"通常指下午
+    pm = _PERIODS[period][1] if period else inherit_pm or 1 <= hour <= 6
+    if pm and hour < 12:
+        hour += 12
+    elif period == "中午" and hour < 3:
+        hour += 12
+    elif period in ("凌晨", "夜里", "晚上") and hour in (12, 24):
+        hour = 0
+    return time(hour % 24, minute)
+
+
+def _is_colloquial(match: re.Match, masked: str, day: Optional[date], period: Optional[str]) -> bool:
+    """"快一点"、"一点点"中的"一点"不是时刻：没有时段、日期、分钟和"钟"时不作为时刻"""
+    if match.group(2) != "一" or match.group(1) or period or day or match.group(3):
+        return False
+    return not match.group(0).endswith("钟")
+
+
+def _duration(hours_text: Optional[str], half: Optional[str], minutes_text: Optional[str]) -> Optional[timedelta]:
+    hours = 0.5 if hours_text == "半" else (parse_chinese_number(hours_text) if hours_text else 0)
+    minutes = parse_chinese_number(minutes_text) if minutes_text else 0
+    if hours is None or minutes is None:
+        return None
+    return timedelta(hours=hours + (0.5 if half else 0), minutes=minutes) or None
+
+
+def parse_time_expression(text: str, now: Optional[datetime] = None) -> TimeExpression:
+    """解析文本中的日期、时刻、时间范围和时长"""
+    now = now or datetime.now()
+    today = now.date()
+    result = TimeExpression(text=text)
+    masked = text
+
+    def consume(match: re.Match):
+        nonlocal masked
+        result.spans.append(match.span())
+        masked = masked[:match.start()] + "\0" * (match.end() - match.start()) + masked[match.end():]
+
+    # 日期
+    match = _ISO_DATE.search(masked)
+    if match:
+        try:
+            result.date = date(*(int(group) for group in match.groups()))
+            consume(match)
+        except ValueError:
+            pass
+
+    match = result.date is None and _ABSOLUTE_DATE.search(masked)
+    if match:
+        year_text, month_text, day_text = match.groups()
+        year = parse_chinese_number(year_text) if year_text else today.year
+        month, day = parse_chinese_number(month_text), parse_chinese_number(day_text)
+        try:
+            result.date = date(year, month, day)
+            # 没有写年份且日期已过，视为明年
+            if not year_text and result.date < today:
+                result.date = result.date.replace(year=today.year + 1)
+            consume(match)
+        except (TypeError, ValueError):
+            pass
+
+    period = None
+    match = _RELATIVE_DAY.search(masked)
+    if match:
+        word = match.group(0)
+        if result.date is None:
+            result.date = today + timedelta(days=_RELATIVE_DAYS[word])
+        if word in _PERIODS:
+            period = word
+        consume(match)
+
+    match = result.date is None and _DAYS_LATER.search(masked)
+    if match:
+        amount_text, unit = match.groups()
+        amount = 0.5 if amount_text == "半" else parse_chinese_number(amount_text)
+        if amount is not None:
+            if unit in ("天", "日"):
+                result.date = today + timedelta(days=amount)
+            elif unit == "月":
+                result.date = today + timedelta(days=round(30 * amount))
+            else:
+                result.date = today + timedelta(weeks=amount)
+            consume(match)
+
+    match = result.date is None and _WEEKDAY.search(masked)
+    if match:
+        prefix, weekday_text = match.groups()
+        weekday = _WEEKDAYS[weekday_text]
+        monday = today - timedelta(days=today.weekday())
+        if prefix and prefix.startswith("下下"):
+            monday += timedelta(weeks=2)
+        elif prefix and prefix.startswith("下"):
+            monday += timedelta(weeks=1)
+        elif prefix and prefix.startswith("上"):
+            monday -= timedelta(weeks=1)
+        result.date = monday + timedelta(days=weekday)
+        # 只说"周三"且本周已过，指下周
+        if not prefix and result.date < today:
+            result.date += timedelta(weeks=1)
+        consume(match)
+
+    match = result.date is None and _DAY_OF_MONTH.search(masked)
+    if match:
+        prefix, day_text = match.groups()
+        day = parse_chinese_number(day_text)
+        year, month = today.year, today.month
+        if prefix and prefix.startswith("下"):
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        try:
+            result.date = date(year, month, day)
+            if not prefix and result.date < today:
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+                result.date = date(year, month, day)
+            consume(match)
+        except (TypeError, ValueError):
+            pass
+
+    # N小时后 / N分钟后：同时确定日期和时刻
+    match = result.date is None and _TIME_LATER.search(masked)
+    if match:
+        amount_text, half, unit = match.groups()
+        delta = _duration(amount_text, half, None) if unit != "分钟" else _duration(None, None, amount_text)
+        if delta:
+            moment = now + delta
+            result.date, result.time = moment.date(), time(moment.hour, moment.minute)
+            consume(match)
+
+    # 时刻和时间范围
+    match = result.time is None and _CLOCK.search(masked)
+    if match and _is_colloquial(match, masked, result.date, period):
+        match = None
+    if match:
+        start_period = match.group(1) or period
+        result.time = _clock(start_period, match.group(2), match.group(3))
+        if result.time:
+            consume(match)
+            end_match = _RANGE_END.match(masked, match.end())
+            if end_match:
+                end_period = end_match.group(1)
+                inherit_pm = not end_period and start_period is not None and _PERIODS[start_period][1]
+                result.end_time = _clock(end_period, end_match.group(2), end_match.group(3), inherit_pm)
+                if result.end_time:
+                    # "十一点到一点"：结束时刻早于开始时刻时按下午计
+                    if result.end_time < result.time and result.end_time.hour < 12:
+                        result.end_time = result.end_time.replace(hour=result.end_time.hour + 12)
+                    consume(end_match)
+    if result.time is None:
+        match = _PERIOD_ONLY.search(masked)
+        if match or period:
+            result.time = _PERIODS[match.group(0) if match else period][0]
+            if match:
+                consume(match)
+
+    # 时长
+    match = _DURATION.search(masked)
+    if match:
+        hours_text, half, minutes_text, only_minutes_text = match.groups()
+        duration = _duration(hours_text, half, minutes_text or only_minutes_text)
+        if duration:
+            result.duration = duration
+            consume(match)
+
+    return result
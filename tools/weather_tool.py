@@ -1,7 +1,8 @@
-from typing import Optional, Any
-import re
-from external_services.amap_service import getLocation, getWeatherInfo
-from tools.base_tool import BaseAssistantTool
+from typing import List, Optional, Tuple
+from config.settings import settings
+from external_services.amap_service import WeatherUnavailable, getLocation, getWeatherInfo, getWeatherReports
+from external_services.gazetteer import get_gazetteer
+from tools.base_tool import BaseAssistantTool, ToolError
 
 class WeatherTool(BaseAssistantTool):
     """天气查询工具"""
@@ -10,44 +11,59 @@ class WeatherTool(BaseAssistantTool):
         super().__init__(name, config)
 
     def run(self, query: str) -> str | None:
-        # 提取城市名称
-        city = self.extract_city(query)
-
-        if not city:
-            # 尝试获取当前位置
-            current_city = self.get_current_city()
-            if current_city:
-                city = current_city
+        # 提取所有地名，多个城市并发查询
+        cities = self.extract_cities(query)
+        unsupported = get_gazetteer().find_unsupported(query)
+        if unsupported and not cities:
+            # 用户指定了地点，不能退回查询当前位置的天气
+            raise ToolError(f"暂不支持查询{'、'.join(unsupported)}的天气")
+        try:
+            if len(cities) > 1:
+                report, complete = self.get_weather_reports(cities)
+                if not complete:
+                    self.skip_cache()
             else:
-                return "无法确定您的位置，请明确指定要查询的城市"
+                if not cities:
+                    # 尝试获取当前位置
+                    current_city = self.get_current_city()
+                    if current_city:
+                        cities = [current_city]
+                    else:
+                        raise ToolError("无法确定您的位置，请明确指定要查询的城市")
+                report = self.get_weather_data(cities[0])
+        except WeatherUnavailable as e:
+            raise ToolError(str(e))
+
+        if unsupported:
+            report += f"\n暂不支持查询{'、'.join(unsupported)}的天气"
+        return report
 
-        return self.get_weather_data(city)
+    @classmethod
+    def speculation_key(cls, query: str) -> Optional[str]:
+        """天气查询只读且幂等，以地名 adcode 作为推测标识；含不支持的地名时不推测"""
+        if get_gazetteer().find_unsupported(query):
+            return None
+        return ",".join(cls.extract_cities(query))
 
-    def extract_city(self, query : str) -> str | None | Any:
-        """从查询中提取城市名称"""
-        cities = ['北京', '上海', '广州', '深圳', '杭州', '南京', '成都', '武汉',
-                  '西安', '重庆', '天津', '苏州', '郑州', '长沙', '沈阳', '青岛',
-                  '大连', '宁波', '厦门', '福州', '无锡', '合肥', '太原', '南昌',
-                  '石家庄', '哈尔滨', '长春', '兰州', '银川', '西宁', '乌鲁木齐',
-                  '拉萨', '南宁', '贵阳', '昆明', '海口', '香港', '澳门', '台北']
+    @classmethod
+    def cache_key(cls, query: str) -> Optional[str]:
+        """按地名 adcode 缓存天气结果；含不支持的地名时回复与 adcode 无关，不缓存"""
+        return cls.speculation_key(query)
 
-        for city in cities:
-            if city in query:
-                return city
+    @staticmethod
+    def extract_cities(query: str) -> List[str]:
+        """按出现顺序提取查询中的所有地名，返回 adcode 列表
 
-        # 尝试匹配模式
-        patterns = [
-            r'([\u4e00-\u9fa5]{2,4}?)市.*天气',
-            r'([\u4e00-\u9fa5]{2,4}?)天气',
-            r'天气.*([\u4e00-\u9fa5]{2,4}?)市',
-            r'查询.*([\u4e00-\u9fa5]{2,4}?)的天气'
-        ]
-        for pattern in patterns:
-            match = re.search(pattern, query)
-            if match:
-                return match.group(1)
+        使用离线行政区划索引一次扫描匹配省、市、区县的全称、简称和繁体写法，
+        直接以 adcode 查询天气，避免把"今天"之类的词误当成城市名去请求高德。
+        """
+        places = get_gazetteer().find_all(query)
+        return [place.adcode for place in places[:settings.TOOL_CONFIG["weather"]["max_cities"]]]
 
-        return None
+    def extract_city(self, query : str) -> str | None:
+        """从查询中提取第一个地名，返回其 adcode"""
+        cities = self.extract_cities(query)
+        return cities[0] if cities else None
 
     def get_current_city(self) -> Optional[str]:
         """获取当前城市"""
@@ -57,6 +73,10 @@ class WeatherTool(BaseAssistantTool):
         """获取天气数据"""
         return getWeatherInfo(city)
 
+    def get_weather_reports(self, cities: List[str]) -> Tuple[str, bool]:
+        """并发获取多个城市的天气数据，返回 (播报, 是否全部成功)"""
+        return getWeatherReports(cities)
+
 if __name__ == '__main__':
     config = {
         "name": "weather_tool",
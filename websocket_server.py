@@ -9,7 +9,7 @@ import websockets
 import json
 import logging
 from core.assistant import VoiceAssistant
-from config import settings
+from config.settings import settings
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -28,15 +28,18 @@ class VoiceWebSocketServer:
         logger.info(f"新的WebSocket连接: {path}")
         await self.assistant.start_realtime_mode(websocket)
 
-    async def start_server(self):
-        """启动WebSocket服务器"""
+    async def start_server(self, sock=None):
+        """启动WebSocket服务器；sock 为多进程模式下已创建好的监听套接字"""
         logger.info(f"启动WebSocket服务器，端口: {self.port}")
 
-        server = await websockets.serve(
-            self.handle_websocket,
-            settings.WEBSOCKET_HOST,
-            self.port
-        )
+        if sock is not None:
+            server = await websockets.serve(self.handle_websocket, sock=sock)
+        else:
+            server = await websockets.serve(
+                self.handle_websocket,
+                settings.WEBSOCKET_HOST,
+                self.port
+            )
 
         logger.info("WebSocket服务器已启动")
 